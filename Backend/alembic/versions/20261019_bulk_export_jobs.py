@@ -0,0 +1,59 @@
+"""Add bulk_export_jobs table.
+
+Revision ID: 20261019_bulk_export_jobs
+Revises: 20261019_export_dedup
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_bulk_export_jobs"
+down_revision = "20261019_export_dedup"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 应用启动时 create_all 可能已建表
+    if sa.inspect(op.get_bind()).has_table("bulk_export_jobs"):
+        return
+
+    op.create_table(
+        "bulk_export_jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False
+        ),
+        sa.Column("ppt_ids", postgresql.JSONB(), nullable=False, comment="要导出的 PPT ID 列表"),
+        sa.Column("format", sa.String(length=10), nullable=False, comment="格式: pptx, pdf"),
+        sa.Column("quality", sa.String(length=20), nullable=True, comment="质量: standard, high"),
+        sa.Column(
+            "status",
+            sa.String(length=20),
+            nullable=True,
+            comment="状态: pending, processing, completed, failed"
+        ),
+        sa.Column("total", sa.Integer(), nullable=True, comment="PPT 总数"),
+        sa.Column("completed", sa.Integer(), nullable=True, comment="已打包数量"),
+        sa.Column("failed", sa.Integer(), nullable=True, comment="导出失败数量"),
+        sa.Column("errors", postgresql.JSONB(), nullable=True, comment="失败明细: [{ppt_id, error}]"),
+        sa.Column("file_path", sa.String(length=500), nullable=True, comment="zip 文件路径"),
+        sa.Column("file_size", sa.Integer(), nullable=True, comment="文件大小（字节）"),
+        sa.Column("error_message", sa.String(length=500), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True, comment="下载链接过期时间"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_bulk_export_jobs_user_id", "bulk_export_jobs", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bulk_export_jobs_user_id", table_name="bulk_export_jobs")
+    op.drop_table("bulk_export_jobs")
@@ -0,0 +1,57 @@
+"""Add export task deduplication columns.
+
+Revision ID: 20261019_export_dedup
+Revises: 20261019_export_slide_range
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_export_dedup"
+down_revision = "20261019_export_slide_range"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "export_tasks",
+        sa.Column("ppt_version", sa.Integer(), nullable=True, comment="提交时的 PPT 版本号")
+    )
+    op.add_column(
+        "export_tasks",
+        sa.Column(
+            "dedup_key",
+            sa.String(length=64),
+            nullable=True,
+            comment="去重键：PPT、版本、格式、质量、页面范围的哈希"
+        )
+    )
+    op.add_column(
+        "export_tasks",
+        sa.Column("idempotency_key", sa.String(length=100), nullable=True, comment="客户端提供的幂等键")
+    )
+    op.create_index(
+        "uq_export_tasks_inflight",
+        "export_tasks",
+        ["user_id", "dedup_key"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('pending', 'processing')")
+    )
+    op.create_index(
+        "uq_export_tasks_idempotency_key",
+        "export_tasks",
+        ["user_id", "idempotency_key"],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_export_tasks_idempotency_key", table_name="export_tasks")
+    op.drop_index("uq_export_tasks_inflight", table_name="export_tasks")
+    op.drop_column("export_tasks", "idempotency_key")
+    op.drop_column("export_tasks", "dedup_key")
+    op.drop_column("export_tasks", "ppt_version")
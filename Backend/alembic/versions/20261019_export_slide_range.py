@@ -0,0 +1,32 @@
+"""Add slide_range column to export_tasks.
+
+Revision ID: 20261019_export_slide_range
+Revises: 20261019_generation_checkpoint
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_export_slide_range"
+down_revision = "20261019_generation_checkpoint"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "export_tasks",
+        sa.Column(
+            "slide_range",
+            sa.String(length=100),
+            nullable=True,
+            comment="页面范围，如 1-5；为空表示全部"
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("export_tasks", "slide_range")
@@ -0,0 +1,33 @@
+"""Add checkpoint column to generation_tasks.
+
+Revision ID: 20261019_generation_checkpoint
+Revises: 20260209_add_description
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_generation_checkpoint"
+down_revision = "20260209_add_description"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "generation_tasks",
+        sa.Column(
+            "checkpoint",
+            postgresql.JSONB(),
+            nullable=True,
+            comment="断点数据：已完成阶段的大纲与图片引用，重试时从此恢复"
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("generation_tasks", "checkpoint")
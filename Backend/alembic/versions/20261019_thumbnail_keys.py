@@ -0,0 +1,33 @@
+"""Add thumbnail_keys column to presentations.
+
+Revision ID: 20261019_thumbnail_keys
+Revises: 20261019_bulk_export_jobs
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_thumbnail_keys"
+down_revision = "20261019_bulk_export_jobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "presentations",
+        sa.Column(
+            "thumbnail_keys",
+            postgresql.JSONB(),
+            nullable=True,
+            comment="已渲染的缩略图：幻灯片 ID -> 内容哈希"
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("presentations", "thumbnail_keys")
@@ -46,6 +46,29 @@ class Settings(BaseSettings):
     STORAGE_LOCAL_PATH: str = "./storage"
     STORAGE_MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     
+    # 导出配置
+    EXPORT_IMAGE_CONCURRENCY: int = 8  # 导出时并发下载图片的上限
+    EXPORT_RENDER_WORKERS: int = 2  # 图片导出时并行运行的 pdftoppm 进程数（PPTX 渲染并行度由导出 Worker 的 --concurrency 决定）
+    DOWNLOAD_URL_SECRET: str = ""  # 下载链接签名密钥，须与 JWT_SECRET_KEY 不同；为空时不生成预签名链接
+    EXPORT_URL_EXPIRE_SECONDS: int = 3600  # 下载链接有效期
+    EXPORT_PUBLIC_BASE_URL: str = ""  # 下载链接前缀，如 https://cdn.example.com
+    EXPORT_ACCEL_REDIRECT_PREFIX: str = ""  # 设置后交给 nginx 内部 location 发送文件，如 /protected-exports/
+    EXPORT_STALLED_MINUTES: int = 90  # 导出任务提交后超过该时长仍未结束视为卡住（须大于 Celery 任务硬超时）
+    EXPORT_SLIDE_CACHE_ENABLED: bool = True  # 缓存已渲染的幻灯片，重新导出时复用未修改的页面
+    EXPORT_SLIDE_CACHE_TTL_HOURS: int = 72  # 幻灯片缓存未使用多久后清理
+    
+    # 缩略图配置
+    THUMBNAIL_WIDTH: int = 480  # 缩略图宽度（像素），高度按 16:9 计算
+    THUMBNAIL_FONT_PATH: str = "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc"  # 缩略图字体，不存在时使用 Pillow 内置字体（不含中文）
+    THUMBNAIL_SWEEP_SECONDS: int = 60  # 定时为最近编辑的 PPT 补生成缩略图的间隔
+    THUMBNAIL_TTL_DAYS: int = 30  # 缩略图未被访问多久后清理
+    
+    # 模板目录缓存
+    TEMPLATE_CACHE_TTL: int = 3600  # Redis 共享缓存有效期（秒），模板写入时立即失效；使用次数带来的排序变化最长延迟这么久
+    TEMPLATE_CACHE_LOCAL_TTL: int = 30  # 进程内缓存有效期（秒），即其他进程看到模板变更的最长延迟
+    TEMPLATE_HTTP_MAX_AGE: int = 60  # 模板接口 Cache-Control max-age，过期后以 ETag 校验
+    TEMPLATE_USAGE_FLUSH_SECONDS: int = 60  # 模板使用次数从 Redis 批量写入数据库的间隔
+    
     # 限流配置
     RATE_LIMIT_PER_MINUTE: int = 60
     
@@ -53,10 +76,32 @@ class Settings(BaseSettings):
     DEFAULT_AI_PROVIDER: str = "openai"
     AI_REQUEST_TIMEOUT: int = 60
     AI_MAX_RETRIES: int = 3
+    AI_RETRY_BASE_DELAY: float = 1.0  # 指数退避基数（秒，全抖动）
+    AI_RETRY_MAX_DELAY: float = 30.0
+    AI_IMAGE_TIMEOUT: int = 120
+    AI_IMAGE_HEDGE_ENABLED: bool = False  # 慢请求超过延迟分位时发送对冲请求
+    AI_IMAGE_HEDGE_PERCENTILE: float = 0.9
+    AI_OUTLINE_CHUNK_THRESHOLD: int = 15  # 超过该页数时分批并行生成大纲
+    AI_OUTLINE_BATCH_SIZE: int = 8  # 每批展开的幻灯片数量
+    AI_PROVIDER_CONCURRENCY: int = 4  # 每个事件循环对单个提供商的并发请求上限（prefork 下为每个任务），跨 Worker 限流见 AI_RATE_LIMIT_*
+    AI_ENRICH_MIN_CHARS: int = 80  # 正文少于该字数的页面视为内容单薄
+    AI_MAX_IMAGES: int = 10  # 每个 PPT 最多生成的配图数量
+    
+    # AI 出站限流（Redis 令牌桶，按提供商 + API Key，所有 Worker 共享）
+    AI_RATE_LIMIT_PER_SECOND: float = 1.0  # 初始速率，按 AIMD 自适应调整
+    AI_RATE_LIMIT_MIN: float = 0.1
+    AI_RATE_LIMIT_MAX: float = 10.0
+    AI_RATE_LIMIT_BURST: int = 5
+    AI_RATE_INCREASE: float = 0.1  # 成功后加性增加（次/秒）
+    AI_RATE_DECREASE_FACTOR: float = 0.5  # 429/5xx 后乘性减少
+    AI_RATE_DECREASE_COOLDOWN: float = 2.0  # 两次减速的最小间隔（秒）
     
     # 任务队列
     CELERY_BROKER_URL: str = "redis://localhost:6379/1"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/2"
+    # 异步 worker 模式：任务协程提交到进程内常驻事件循环，配合 --pool threads 使用
+    CELERY_ASYNC_WORKER: bool = False
+    CELERY_ASYNC_CONCURRENCY: int = 100  # 单进程同时运行的协程上限
     
     # CORS
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
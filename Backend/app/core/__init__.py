@@ -18,7 +18,9 @@ from app.core.security import (
     create_refresh_token,
     decode_token,
     get_password_hash,
+    sign_url_path,
     verify_password,
+    verify_url_signature,
 )
 
 __all__ = [
@@ -28,6 +30,8 @@ __all__ = [
     "create_access_token",
     "create_refresh_token",
     "decode_token",
+    "sign_url_path",
+    "verify_url_signature",
     # Dependencies
     "get_current_user",
     "get_optional_user",
@@ -4,6 +4,9 @@
 """
 
 from datetime import datetime, timedelta, timezone
+import base64
+import hashlib
+import hmac
 import logging
 from typing import Optional, Tuple
 
@@ -167,3 +170,45 @@ def decode_token(token: str, expected_type: str = "access") -> Tuple[Optional[st
     except JWTError as e:
         logger.warning(f"Token validation failed: {str(e)}")
         return None, "Invalid token"
+
+
+def sign_url_path(path: str, expires: int) -> str:
+    """
+    生成下载链接签名
+    
+    与 nginx 的 secure_link_md5 "$secure_link_expires$uri <secret>" 格式一致，
+    反向代理可以直接校验签名并发送文件，无需经过 Python
+    
+    Args:
+        path: URL 路径（不含查询参数）
+        expires: 过期时间（Unix 时间戳）
+        
+    Returns:
+        base64url 编码的签名（无填充）
+        
+    Raises:
+        RuntimeError: 未配置 DOWNLOAD_URL_SECRET
+    """
+    # 不回退到 JWT_SECRET_KEY：签名随链接公开，不能用令牌密钥计算
+    secret = settings.DOWNLOAD_URL_SECRET
+    if not secret:
+        raise RuntimeError("DOWNLOAD_URL_SECRET is not set")
+    digest = hashlib.md5(f"{expires}{path} {secret}".encode("utf-8")).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+
+def verify_url_signature(path: str, expires: int, signature: str) -> bool:
+    """
+    校验下载链接签名（不检查是否过期）
+    
+    Args:
+        path: URL 路径
+        expires: 过期时间（Unix 时间戳）
+        signature: 待校验的签名
+        
+    Returns:
+        签名是否有效；未配置 DOWNLOAD_URL_SECRET 时总是无效
+    """
+    if not settings.DOWNLOAD_URL_SECRET:
+        return False
+    return hmac.compare_digest(sign_url_path(path, expires), signature)
@@ -40,6 +40,8 @@ async def lifespan(app: FastAPI):
     """
     # 启动
     await init_db()
+    if not settings.DOWNLOAD_URL_SECRET:
+        print("[START] DOWNLOAD_URL_SECRET is not set, pre-signed download URLs are disabled")
     print(f"[START] {settings.APP_NAME} v{settings.APP_VERSION} started successfully")
     
     yield
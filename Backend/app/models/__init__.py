@@ -4,7 +4,7 @@
 """
 
 from app.models.api_key import UserAPIKey
-from app.models.export_task import ExportTask
+from app.models.export_task import BulkExportJob, ExportTask
 from app.models.operation_history import OperationHistory
 from app.models.presentation import GenerationTask, Presentation
 from app.models.template import Template
@@ -17,5 +17,6 @@ __all__ = [
     "GenerationTask",
     "OperationHistory",
     "ExportTask",
+    "BulkExportJob",
     "Template",
 ]
@@ -5,12 +5,12 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
 from app.utils.datetime import utcnow_aware
-from app.core.custom_types import GUID
+from app.core.custom_types import GUID, JSONType
 
 
 class ExportTask(Base):
@@ -21,6 +21,17 @@ class ExportTask(Base):
     """
     
     __tablename__ = "export_tasks"
+    __table_args__ = (
+        # 同一用户相同导出内容的进行中任务只保留一个
+        Index(
+            "uq_export_tasks_inflight",
+            "user_id", "dedup_key",
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'processing')"),
+            sqlite_where=text("status IN ('pending', 'processing')")
+        ),
+        Index("uq_export_tasks_idempotency_key", "user_id", "idempotency_key", unique=True),
+    )
     
     id: Mapped[uuid.UUID] = mapped_column(
         GUID(),
@@ -50,6 +61,28 @@ class ExportTask(Base):
         default="standard",
         comment="质量: standard, high"
     )
+    slide_range: Mapped[str] = mapped_column(
+        String(100),
+        nullable=True,
+        comment="页面范围，如 1-5；为空表示全部"
+    )
+    ppt_version: Mapped[int] = mapped_column(
+        Integer,
+        nullable=True,
+        comment="提交时的 PPT 版本号"
+    )
+    
+    # 去重
+    dedup_key: Mapped[str] = mapped_column(
+        String(64),
+        nullable=True,
+        comment="去重键：PPT、版本、格式、质量、页面范围的哈希"
+    )
+    idempotency_key: Mapped[str] = mapped_column(
+        String(100),
+        nullable=True,
+        comment="客户端提供的幂等键"
+    )
     
     # 任务状态
     status: Mapped[str] = mapped_column(
@@ -93,3 +126,110 @@ class ExportTask(Base):
     
     def __repr__(self) -> str:
         return f"<ExportTask(id={self.id}, format={self.format}, status={self.status})>"
+
+
+class BulkExportJob(Base):
+    """
+    批量导出任务
+    
+    将多个 PPT 导出后打包为一个 zip
+    """
+    
+    __tablename__ = "bulk_export_jobs"
+    
+    id: Mapped[uuid.UUID] = mapped_column(
+        GUID(),
+        primary_key=True,
+        default=uuid.uuid4
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        GUID(),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    
+    # 导出配置
+    ppt_ids: Mapped[list] = mapped_column(
+        JSONType(),
+        nullable=False,
+        comment="要导出的 PPT ID 列表"
+    )
+    format: Mapped[str] = mapped_column(
+        String(10),
+        nullable=False,
+        comment="格式: pptx, pdf"
+    )
+    quality: Mapped[str] = mapped_column(
+        String(20),
+        default="standard",
+        comment="质量: standard, high"
+    )
+    
+    # 任务状态与进度
+    status: Mapped[str] = mapped_column(
+        String(20),
+        default="pending",
+        comment="状态: pending, processing, completed, failed"
+    )
+    total: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        comment="PPT 总数"
+    )
+    completed: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        comment="已打包数量"
+    )
+    failed: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        comment="导出失败数量"
+    )
+    errors: Mapped[list] = mapped_column(
+        JSONType(),
+        nullable=True,
+        comment="失败明细: [{ppt_id, error}]"
+    )
+    
+    # 结果
+    file_path: Mapped[str] = mapped_column(
+        String(500),
+        nullable=True,
+        comment="zip 文件路径"
+    )
+    file_size: Mapped[int] = mapped_column(
+        Integer,
+        nullable=True,
+        comment="文件大小（字节）"
+    )
+    error_message: Mapped[str] = mapped_column(
+        String(500),
+        nullable=True
+    )
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="下载链接过期时间"
+    )
+    
+    # 时间戳
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=utcnow_aware
+    )
+    completed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+    
+    @property
+    def progress(self) -> int:
+        """进度百分比（已完成与失败的都计入）"""
+        if not self.total:
+            return 0
+        return int(((self.completed or 0) + (self.failed or 0)) * 100 / self.total)
+    
+    def __repr__(self) -> str:
+        return f"<BulkExportJob(id={self.id}, total={self.total}, status={self.status})>"
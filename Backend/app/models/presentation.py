@@ -27,6 +27,7 @@ class Presentation(Base):
         user_id: 创建者
         title: 标题
         slides: 幻灯片内容（JSONB）
+        thumbnail_keys: 已渲染的缩略图（幻灯片 ID -> 内容哈希）
         status: 状态（draft, published, archived）
         ai_prompt: 生成时使用的提示词
         ai_parameters: AI 生成参数
@@ -66,6 +67,11 @@ class Presentation(Base):
         default=list,
         comment="幻灯片数组，每个元素包含 type, content, layout, style"
     )
+    thumbnail_keys: Mapped[Optional[dict]] = mapped_column(
+        JSONType(),
+        nullable=True,
+        comment="已渲染的缩略图：幻灯片 ID -> 内容哈希，由缩略图任务写入"
+    )
     
     # 状态管理
     status: Mapped[str] = mapped_column(
@@ -177,6 +183,11 @@ class GenerationTask(Base):
         nullable=True,
         comment="生成结果：包含 ppt_id 和 slides"
     )
+    checkpoint: Mapped[Optional[dict]] = mapped_column(
+        JSONType(),
+        nullable=True,
+        comment="断点数据：已完成阶段的大纲与图片引用，重试时从此恢复"
+    )
     error_message: Mapped[Optional[str]] = mapped_column(
         Text,
         nullable=True,
@@ -5,7 +5,7 @@
 
 from fastapi import APIRouter
 
-from app.routers import api_keys, auth, export, ppt, ppt_generation, templates, users
+from app.routers import api_keys, auth, export, ppt, ppt_generation, templates, thumbnails, users
 
 # 创建主路由
 api_router = APIRouter(prefix="/api/v1")
@@ -17,6 +17,9 @@ api_router.include_router(api_keys.router)
 api_router.include_router(ppt_generation.router)
 api_router.include_router(ppt.router)
 api_router.include_router(export.router)
+api_router.include_router(export.bulk_router)
+api_router.include_router(export.files_router)
 api_router.include_router(templates.router)
+api_router.include_router(thumbnails.router)
 
 __all__ = ["api_router"]
@@ -3,21 +3,41 @@
 处理 PPT 导出请求
 """
 
+import time
+from pathlib import Path
+from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core import get_current_user
+from app.config import settings
+from app.core import get_current_user, verify_url_signature
 from app.database import get_db
 from app.models.user import User
-from app.schemas.presentation import ExportRequest, ExportResponse
+from app.schemas.presentation import (
+    BulkExportRequest,
+    BulkExportResponse,
+    ExportRequest,
+    ExportResponse,
+)
+from app.services.export_service import EXPORT_DOWNLOAD_PATH, get_export_service, parse_slide_range
 from app.services.export_task_service import get_export_task_service
 from app.services.ppt_service import get_ppt_service
-from app.tasks.export_tasks import process_export_task
+from app.tasks import PRIORITY_BULK, PRIORITY_INTERACTIVE
+from app.tasks.export_tasks import process_bulk_export, process_export_task
+from app.utils.file_response import content_disposition, file_response
+from app.utils.zip_stream import follow_file, partial_path
 
 router = APIRouter(prefix="/ppt/{ppt_id}/export", tags=["PPT 导出"])
 
+# 批量导出：多个 PPT 打包为一个 zip
+bulk_router = APIRouter(prefix="/exports/bulk", tags=["PPT 导出"])
+
+# 预签名下载链接，无需登录（可由反向代理直接校验并发送文件）
+files_router = APIRouter(prefix="/exports", tags=["PPT 导出"])
+
 
 @router.post(
     "",
@@ -29,6 +49,11 @@ router = APIRouter(prefix="/ppt/{ppt_id}/export", tags=["PPT 导出"])
 async def submit_export_task(
     ppt_id: UUID,
     request: ExportRequest,
+    idempotency_key: Optional[str] = Header(
+        None,
+        max_length=100,
+        description="幂等键：相同的键重复提交时返回首次创建的任务"
+    ),
     current_user: User = Depends(get_current_user),
     db = Depends(get_db)
 ):
@@ -39,6 +64,8 @@ async def submit_export_task(
     - pptx: PowerPoint 格式
     - pdf: PDF 格式
     - png/jpg: 图片格式（每页一张图）
+    
+    相同 PPT 版本、格式、质量和页面范围的任务仍在进行中时，返回该任务而不重复导出
     """
     # 检查 PPT 是否存在
     ppt_service = get_ppt_service(db)
@@ -50,23 +77,55 @@ async def submit_export_task(
             detail={"code": "NOT_FOUND", "message": "PPT 不存在"}
         )
     
-    # 创建导出任务
+    # 校验页面范围是否落在 PPT 内
+    try:
+        parse_slide_range(request.slide_range, len(ppt.slides or []))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"code": "INVALID_SLIDE_RANGE", "message": str(e)}
+        )
+    
+    # 创建导出任务，或复用进行中的相同任务
     task_service = get_export_task_service(db)
-    task = await task_service.create_task(
-        current_user.id,
-        ppt_id,
-        request.format,
-        request.quality
-    )
+    try:
+        task, created = await task_service.submit_task(
+            current_user.id,
+            ppt,
+            request.format,
+            request.quality,
+            request.slide_range,
+            idempotency_key
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"code": "IDEMPOTENCY_KEY_REUSED", "message": str(e)}
+        )
     
-    # 启动异步导出任务
-    process_export_task.delay(str(task.id))
+    # 启动异步导出任务（用户等待结果，优先于批量任务）
+    if created:
+        try:
+            process_export_task.apply_async((str(task.id),), priority=PRIORITY_INTERACTIVE)
+        except Exception as e:
+            # 未派发的任务不会被执行，标记失败以释放去重唯一索引
+            print(f"[Export] 派发任务 {task.id} 失败: {e}")
+            await task_service.mark_failed(task, f"任务派发失败: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={"code": "EXPORT_UNAVAILABLE", "message": "导出服务暂不可用，请稍后重试"}
+            )
+    
+    # 幂等键重放时任务可能已完成
+    download_url = None
+    if task.status == "completed" and task.file_path:
+        download_url = get_export_service().get_file_url(task.file_path)
     
     return ExportResponse(
         export_task_id=task.id,
         status=task.status,
-        download_url=None,
-        expires_at=None
+        download_url=download_url,
+        expires_at=task.expires_at
     )
 
 
@@ -94,7 +153,6 @@ async def get_export_status(
     # 构建下载 URL（如果已完成）
     download_url = None
     if task.status == "completed" and task.file_path:
-        from app.services.export_service import get_export_service
         export_service = get_export_service()
         download_url = export_service.get_file_url(task.file_path)
     
@@ -104,3 +162,205 @@ async def get_export_status(
         download_url=download_url,
         expires_at=task.expires_at
     )
+
+
+@router.get(
+    "/{task_id}/download",
+    summary="下载导出文件",
+    description="需要登录；支持 Range 断点续传与 ETag 缓存校验"
+)
+async def download_export(
+    ppt_id: UUID,
+    task_id: UUID,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """下载导出文件"""
+    task_service = get_export_task_service(db)
+    task = await task_service.get_task(task_id, current_user.id)
+    
+    if not task or task.ppt_id != ppt_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"code": "NOT_FOUND", "message": "导出任务不存在"}
+        )
+    
+    path = Path(task.file_path) if task.status == "completed" and task.file_path else None
+    if path is None or not path.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"code": "FILE_NOT_FOUND", "message": "导出文件不存在或已过期"}
+        )
+    
+    ppt_service = get_ppt_service(db)
+    ppt = await ppt_service.get_by_id(ppt_id, current_user.id)
+    filename = f"{ppt.title}{path.suffix}" if ppt and ppt.title else path.name
+    
+    return _send_export_file(request, path, filename)
+
+
+@files_router.get(
+    "/{file_name}",
+    summary="通过预签名链接下载导出文件",
+    description="链接由导出状态接口返回，过期后失效"
+)
+async def download_signed_export(
+    file_name: str,
+    request: Request,
+    expires: int = Query(..., description="过期时间（Unix 时间戳）"),
+    md5: str = Query(..., description="签名")
+):
+    """通过预签名链接下载导出文件"""
+    if not verify_url_signature(f"{EXPORT_DOWNLOAD_PATH}/{file_name}", expires, md5):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={"code": "INVALID_SIGNATURE", "message": "下载链接无效"}
+        )
+    
+    if expires < time.time():
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail={"code": "LINK_EXPIRED", "message": "下载链接已过期"}
+        )
+    
+    path = get_export_service().storage_path / file_name
+    if Path(file_name).name != file_name or not path.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"code": "FILE_NOT_FOUND", "message": "导出文件不存在或已过期"}
+        )
+    
+    return _send_export_file(request, path, file_name)
+
+
+@bulk_router.post(
+    "",
+    response_model=BulkExportResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="提交批量导出任务",
+    description="将多个 PPT 导出并打包为一个 zip"
+)
+async def submit_bulk_export(
+    request: BulkExportRequest,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """提交批量导出任务"""
+    ppt_ids = list(dict.fromkeys(request.ppt_ids))
+    
+    ppt_service = get_ppt_service(db)
+    owned = await ppt_service.get_owned_ids(ppt_ids, current_user.id)
+    missing = [str(ppt_id) for ppt_id in ppt_ids if ppt_id not in owned]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"code": "NOT_FOUND", "message": f"PPT 不存在: {', '.join(missing)}"}
+        )
+    
+    task_service = get_export_task_service(db)
+    job = await task_service.create_bulk_job(
+        current_user.id,
+        ppt_ids,
+        request.format,
+        request.quality
+    )
+    
+    # 批量任务优先级最低，不阻塞交互式导出
+    process_bulk_export.apply_async((str(job.id),), priority=PRIORITY_BULK)
+    
+    return _bulk_response(job)
+
+
+@bulk_router.get(
+    "/{job_id}",
+    response_model=BulkExportResponse,
+    summary="查询批量导出进度"
+)
+async def get_bulk_export_status(
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """查询批量导出任务的整体进度"""
+    task_service = get_export_task_service(db)
+    job = await task_service.get_bulk_job(job_id, current_user.id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"code": "NOT_FOUND", "message": "批量导出任务不存在"}
+        )
+    
+    return _bulk_response(job)
+
+
+@bulk_router.get(
+    "/{job_id}/download",
+    summary="下载批量导出 zip",
+    description="需要登录；处理中即可开始下载，zip 随导出进度持续输出；完成后支持 Range 与 ETag"
+)
+async def download_bulk_export(
+    job_id: UUID,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """下载批量导出 zip"""
+    task_service = get_export_task_service(db)
+    job = await task_service.get_bulk_job(job_id, current_user.id)
+    filename = f"presentations_{job_id.hex[:8]}.zip"
+    
+    # 仍在打包：跟随正在写入的 zip 输出，直到最后一个 PPT 完成
+    if job and job.status == "processing" and job.file_path:
+        part = partial_path(Path(job.file_path))
+        if part.is_file():
+            return StreamingResponse(
+                follow_file(part, Path(job.file_path)),
+                media_type="application/zip",
+                headers={
+                    "content-disposition": content_disposition(filename),
+                    "cache-control": "no-store",
+                }
+            )
+    
+    # 处理中但 .part 已改名说明刚好完成，直接发送完整文件
+    finished = job and job.status in ("processing", "completed") and job.file_path
+    path = Path(job.file_path) if finished else None
+    if path is None or not path.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"code": "FILE_NOT_FOUND", "message": "导出文件不存在或已过期"}
+        )
+    
+    return _send_export_file(request, path, filename)
+
+
+def _bulk_response(job) -> BulkExportResponse:
+    download_url = None
+    if job.status == "completed" and job.file_path:
+        download_url = get_export_service().get_file_url(job.file_path)
+    
+    return BulkExportResponse(
+        job_id=job.id,
+        status=job.status,
+        total=job.total,
+        completed=job.completed,
+        failed=job.failed,
+        progress=job.progress,
+        errors=job.errors or [],
+        download_url=download_url,
+        expires_at=job.expires_at
+    )
+
+
+def _send_export_file(request: Request, path: Path, filename: str) -> Response:
+    """发送导出文件；配置了 X-Accel-Redirect 时交给 nginx 发送"""
+    if settings.EXPORT_ACCEL_REDIRECT_PREFIX:
+        # nginx 发送文件并自行处理 Range 与 ETag，Python 只负责鉴权
+        return Response(headers={
+            "x-accel-redirect": f"{settings.EXPORT_ACCEL_REDIRECT_PREFIX}{path.name}",
+            "content-disposition": content_disposition(filename),
+        })
+    
+    return file_response(request, path, filename)
@@ -22,6 +22,7 @@ from app.schemas.presentation import (
 )
 from app.services.operation_history_service import get_operation_history_service
 from app.services.ppt_service import get_ppt_service
+from app.services.thumbnail_service import get_thumbnail_service
 
 router = APIRouter(prefix="/ppt", tags=["PPT 管理"])
 
@@ -42,7 +43,7 @@ async def create_ppt(
     """创建空白 PPT"""
     service = get_ppt_service(db)
     ppt = await service.create(current_user.id, data)
-    return ppt
+    return _detail_response(ppt)
 
 
 @router.get(
@@ -60,7 +61,7 @@ async def list_ppts(
     """获取用户的 PPT 列表"""
     service = get_ppt_service(db)
     ppts = await service.get_by_user(current_user.id, skip, limit, status)
-    return ppts
+    return [_list_response(ppt) for ppt in ppts]
 
 
 @router.get(
@@ -83,7 +84,7 @@ async def get_ppt(
             detail={"code": "NOT_FOUND", "message": "PPT 不存在"}
         )
     
-    return ppt
+    return _detail_response(ppt)
 
 
 @router.patch(
@@ -122,7 +123,7 @@ async def update_ppt(
         after_state={"title": ppt.title, "slides": ppt.slides}
     )
     
-    return ppt
+    return _detail_response(ppt)
 
 
 @router.delete(
@@ -388,3 +389,21 @@ async def get_operation_history(
     history = await service.get_history(ppt_id, current_user.id, limit)
     
     return history
+
+
+# ==================== 响应构建 ====================
+
+def _list_response(ppt) -> PresentationResponse:
+    """PPT 列表项，附带首页缩略图 URL"""
+    response = PresentationResponse.model_validate(ppt)
+    urls = get_thumbnail_service().slide_urls(ppt.thumbnail_keys, (ppt.slides or [])[:1])
+    response.thumbnail_url = urls[0] if urls else None
+    return response
+
+
+def _detail_response(ppt) -> PresentationDetailResponse:
+    """PPT 详情，附带每页缩略图 URL（由已存储的缩略图键构建，不读取文件）"""
+    response = PresentationDetailResponse.model_validate(ppt)
+    response.slide_thumbnails = get_thumbnail_service().slide_urls(ppt.thumbnail_keys, ppt.slides or [])
+    response.thumbnail_url = response.slide_thumbnails[0] if response.slide_thumbnails else None
+    return response
@@ -5,9 +5,10 @@
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.core import get_current_user
 from app.database import get_db
 from app.models.user import User
@@ -16,7 +17,9 @@ from app.schemas.template import (
     TemplateDetailResponse,
     TemplateListResponse,
 )
-from app.services.template_service import get_template_service
+from app.services.template_cache import CachedBody
+from app.services.template_service import TEMPLATE_CATEGORIES, get_template_service
+from app.utils.file_response import etag_matches
 
 router = APIRouter(prefix="/templates", tags=["模板"])
 
@@ -27,23 +30,21 @@ router = APIRouter(prefix="/templates", tags=["模板"])
     summary="获取模板列表"
 )
 async def list_templates(
+    request: Request,
     category: str = None,
     is_premium: bool = None,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=100, description="返回数量上限"),
     db = Depends(get_db)
 ):
     """
     获取 PPT 模板列表
     
-    可按分类和是否付费筛选
+    可按分类和是否付费筛选；响应带 ETag，未变化时返回 304
     """
     service = get_template_service(db)
-    templates = await service.get_templates(category, is_premium, limit)
+    catalog = await service.get_catalog(category, is_premium, limit)
     
-    return {
-        "templates": templates,
-        "total": len(templates)
-    }
+    return _cached_response(request, catalog)
 
 
 @router.get(
@@ -53,13 +54,7 @@ async def list_templates(
 )
 async def get_categories():
     """获取所有模板分类"""
-    return [
-        {"id": "business", "name": "商务", "icon": "💼"},
-        {"id": "education", "name": "教育", "icon": "📚"},
-        {"id": "creative", "name": "创意", "icon": "🎨"},
-        {"id": "minimal", "name": "极简", "icon": "⚪"},
-        {"id": "general", "name": "通用", "icon": "📄"},
-    ]
+    return TEMPLATE_CATEGORIES
 
 
 @router.get(
@@ -69,19 +64,20 @@ async def get_categories():
 )
 async def get_template(
     template_id: UUID,
+    request: Request,
     db = Depends(get_db)
 ):
     """获取模板详细信息"""
     service = get_template_service(db)
-    template = await service.get_by_id(template_id)
+    detail = await service.get_detail(template_id)
     
-    if not template:
+    if not detail:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"code": "NOT_FOUND", "message": "模板不存在"}
         )
     
-    return template
+    return _cached_response(request, detail)
 
 
 @router.post(
@@ -99,7 +95,8 @@ async def use_template(
     创建 PPT 时调用，增加模板使用统计
     """
     service = get_template_service(db)
-    template = await service.get_by_id(template_id)
+    # 存在性检查走模板缓存，计数写入 Redis，热门模板不产生行锁竞争
+    template = await service.get_detail(template_id)
     
     if not template:
         raise HTTPException(
@@ -110,3 +107,15 @@ async def use_template(
     await service.increment_usage(template_id)
     
     return {"message": "模板使用已记录"}
+
+
+def _cached_response(request: Request, cached: CachedBody) -> Response:
+    """发送缓存的 JSON 响应；If-None-Match 命中时返回 304"""
+    headers = {
+        "etag": cached.etag,
+        "cache-control": f"public, max-age={settings.TEMPLATE_HTTP_MAX_AGE}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=cached.body, media_type="application/json", headers=headers)
@@ -0,0 +1,46 @@
+"""
+缩略图路由
+提供按内容哈希寻址的幻灯片缩略图
+"""
+
+import re
+
+from fastapi import APIRouter, HTTPException, Request, status
+
+from app.services.thumbnail_service import get_thumbnail_service
+from app.utils.file_response import file_response
+
+router = APIRouter(prefix="/thumbnails", tags=["缩略图"])
+
+_FILE_NAME = re.compile(r"([0-9a-f]{64})\.webp")
+
+
+@router.get(
+    "/{file_name}",
+    summary="获取幻灯片缩略图",
+    description="URL 由 PPT 接口返回；按内容哈希寻址，内容变化即换新 URL，可永久缓存"
+)
+async def get_thumbnail(file_name: str, request: Request):
+    """
+    获取幻灯片缩略图
+    
+    无需登录：哈希由幻灯片完整内容计算，不知道内容无法猜出 URL，
+    与预签名下载链接一样可由 CDN / 浏览器直接缓存
+    """
+    match = _FILE_NAME.fullmatch(file_name)
+    path = get_thumbnail_service().path(match.group(1)) if match else None
+    if path is None or not path.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"code": "THUMBNAIL_NOT_FOUND", "message": "缩略图不存在或尚未生成"}
+        )
+    
+    # 记录访问时间，清理任务删除长期未访问的缩略图
+    get_thumbnail_service().touch(path)
+    
+    return file_response(
+        request,
+        path,
+        media_type="image/webp",
+        cache_control="public, max-age=31536000, immutable"
+    )
@@ -98,6 +98,7 @@ class PresentationResponse(PresentationBase):
     user_id: UUID
     slides: List[Slide]
     slide_count: int = Field(default=0, description="幻灯片数量")
+    thumbnail_url: Optional[str] = Field(default=None, description="首页缩略图，尚未生成时为空")
     status: str
     version: int
     created_at: datetime
@@ -121,6 +122,10 @@ class PresentationDetailResponse(PresentationResponse):
     """PPT 详情"""
     ai_prompt: Optional[str] = None
     ai_parameters: Optional[Dict[str, Any]] = None
+    slide_thumbnails: List[Optional[str]] = Field(
+        default_factory=list,
+        description="每页缩略图，与 slides 一一对应，尚未生成的页面为空"
+    )
 
 
 # ==================== 幻灯片操作 ====================
@@ -152,6 +157,7 @@ class GenerateRequest(BaseModel):
     language: str = Field(default="zh", pattern="^(zh|en)$")
     style: str = Field(default="business", description="风格: business, education, creative, minimal")
     provider: Optional[str] = Field(None, description="指定 AI 提供商")
+    enrich_content: bool = Field(default=False, description="对内容单薄的页面调用 AI 扩写")
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -206,7 +212,12 @@ class ExportRequest(BaseModel):
     """导出请求"""
     format: str = Field(..., pattern="^(pptx|pdf|png|jpg)$")
     quality: str = Field(default="standard", pattern="^(standard|high)$")
-    slide_range: Optional[str] = Field(None, description="页面范围，如 '1-5' 或 'all'")
+    slide_range: Optional[str] = Field(
+        None,
+        max_length=100,
+        pattern=r"^(all|\d+(-\d+)?(,\d+(-\d+)?)*)$",
+        description="页面范围（从 1 开始），如 '1-5'、'1,3,6-8' 或 'all'"
+    )
 
 
 class ExportResponse(BaseModel):
@@ -215,3 +226,23 @@ class ExportResponse(BaseModel):
     status: str
     download_url: Optional[str] = None
     expires_at: Optional[datetime] = None
+
+
+class BulkExportRequest(BaseModel):
+    """批量导出请求"""
+    ppt_ids: List[UUID] = Field(..., min_length=1, max_length=100, description="要导出的 PPT ID 列表")
+    format: str = Field(default="pptx", pattern="^(pptx|pdf)$")
+    quality: str = Field(default="standard", pattern="^(standard|high)$")
+
+
+class BulkExportResponse(BaseModel):
+    """批量导出任务响应"""
+    job_id: UUID
+    status: str
+    total: int
+    completed: int = 0
+    failed: int = 0
+    progress: int = Field(0, description="进度百分比")
+    errors: List[Dict[str, Any]] = Field(default_factory=list, description="失败明细")
+    download_url: Optional[str] = None
+    expires_at: Optional[datetime] = None
@@ -16,6 +16,7 @@ from app.services.ppt_generation_service import (
 )
 from app.services.ppt_service import PPTService, get_ppt_service
 from app.services.template_service import TemplateService, get_template_service
+from app.services.thumbnail_service import ThumbnailService, get_thumbnail_service
 from app.services.user_service import UserService, get_user_service
 
 __all__ = [
@@ -36,4 +37,6 @@ __all__ = [
     "get_export_task_service",
     "TemplateService",
     "get_template_service",
+    "ThumbnailService",
+    "get_thumbnail_service",
 ]
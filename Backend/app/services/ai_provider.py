@@ -3,105 +3,54 @@ AI Provider Service Wrapper
 Unified interface for different AI services
 """
 
-import json
-import re
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, Dict, List, Optional
+from collections import deque
+from typing import AsyncGenerator, Deque, Dict, List, Optional
 
 import httpx
+import openai
 from openai import AsyncOpenAI
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
 from app.config import settings
+from app.services.rate_limiter import RateLimiter
+from app.utils.json_repair import salvage_json_parse
 
 
-def robust_json_parse(content: str) -> Dict:
-    """
-    Robust JSON parser
-    
-    Handles:
-    1. Extract ```json code blocks
-    2. Extract ``` code blocks  
-    3. Fix unterminated strings
-    4. Find first valid JSON object
-    """
-    # Try to extract code blocks
-    if "```json" in content:
-        match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
-        if match:
-            content = match.group(1)
-    elif "```" in content:
-        match = re.search(r'```\s*(.*?)\s*```', content, re.DOTALL)
-        if match:
-            content = match.group(1)
-    
-    content = content.strip()
-    
-    # Try direct parse
-    try:
-        return json.loads(content)
-    except json.JSONDecodeError:
-        pass
-    
-    # Try to find first JSON object
-    try:
-        match = re.search(r'\{.*\}', content, re.DOTALL)
-        if match:
-            return json.loads(match.group(0))
-    except json.JSONDecodeError:
-        pass
-    
-    # Try to fix truncated content
-    fixed_content = _fix_json_content(content)
-    try:
-        return json.loads(fixed_content)
-    except json.JSONDecodeError:
-        pass
-    
-    raise ValueError(f"Cannot parse JSON content: {content[:200]}...")
+def _is_retryable(exc: BaseException) -> bool:
+    """Transient failures worth retrying: timeouts, connection errors, 429 and 5xx"""
+    if isinstance(exc, (openai.APIConnectionError, httpx.TransportError)):
+        return True
+    status_code = getattr(exc, "status_code", None)
+    if status_code is None and getattr(exc, "response", None) is not None:
+        status_code = getattr(exc.response, "status_code", None)
+    return status_code is not None and (status_code == 429 or status_code >= 500)
 
 
-def _fix_json_content(content: str) -> str:
-    """Fix common JSON format errors"""
-    # Remove comments
-    content = re.sub(r'//.*?\n', '\n', content)
-    content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-    
-    # Track quotes and brackets
-    in_string = False
-    escape = False
-    stack = []
-    
-    for i, char in enumerate(content):
-        if escape:
-            escape = False
-            continue
-        if char == '\\':
-            escape = True
-            continue
-        if char == '"' and not in_string:
-            in_string = True
-            stack.append('"')
-        elif char == '"' and in_string:
-            in_string = False
-            if stack and stack[-1] == '"':
-                stack.pop()
-    
-    # Fix unterminated string
-    if in_string:
-        content += '"'
-    
-    # Fix unclosed brackets
-    closing_map = {'{': '}', '[': ']', '(': ')', '"': '"'}
-    while stack:
-        opener = stack.pop()
-        if opener in closing_map:
-            content += closing_map[opener]
-    
-    # Remove trailing commas
-    content = re.sub(r',\s*}', '}', content)
-    content = re.sub(r',\s*]', ']', content)
-    
-    return content
+def _log_retry(label: str):
+    def log(retry_state: RetryCallState) -> None:
+        print(f"[{label}] Attempt {retry_state.attempt_number} failed: "
+              f"{retry_state.outcome.exception()!r}, retrying in {retry_state.next_action.sleep:.1f}s")
+    return log
+
+
+def _retrying(label: str) -> AsyncRetrying:
+    """Call-level retry policy: exponential backoff with full jitter"""
+    return AsyncRetrying(
+        stop=stop_after_attempt(settings.AI_MAX_RETRIES + 1),
+        wait=wait_random_exponential(multiplier=settings.AI_RETRY_BASE_DELAY, max=settings.AI_RETRY_MAX_DELAY),
+        retry=retry_if_exception(_is_retryable),
+        before_sleep=_log_retry(label),
+        reraise=True
+    )
 
 
 class AIProviderBase(ABC):
@@ -168,6 +117,30 @@ class YunwuProvider(AIProviderBase):
     TEXT_MODEL = "gemini-3-flash-preview"      # For text generation (outline)
     IMAGE_MODEL = "gemini-3-pro-image-preview"  # For image generation
     
+    # Recent image latencies (seconds) in this process, for request hedging
+    _image_latencies: Deque[float] = deque(maxlen=100)
+    
+    STYLE_DESCRIPTIONS = {
+        "business": "Professional business style, deep blue tones, clean and elegant",
+        "education": "Educational style, green tones, fresh and clear",
+        "creative": "Creative style, pink/purple tones, modern and lively",
+        "minimal": "Minimalist style, black/white/gray tones, simple and elegant",
+        "tech": "Tech style, cyan/blue tones, futuristic"
+    }
+    
+    # Field layout per slide type, shared by the chunked outline prompts
+    SLIDE_FIELDS = """- "title": subtitle
+- "section": description
+- "content": content (at least 100 words), bullets (3-5 detailed points), data {"key", "value"}
+- "two-column": left and right {"title", "points": [...]}, conclusion
+- "timeline": events [{"year", "title", "description"}]
+- "process": steps [step strings]
+- "grid": items [{"title", "description"}]
+- "comparison": items [{"name", "valueA", "valueB"}]
+- "data": stats [{"value", "label", "description"}], insight
+- "quote": quote, author
+- "image-text": text"""
+    
     def __init__(self, api_key: str, image_api_key: str = None):
         """
         Args:
@@ -180,17 +153,42 @@ class YunwuProvider(AIProviderBase):
         # Client for text generation (OpenAI-compatible)
         self.client = AsyncOpenAI(
             api_key=api_key,
-            base_url="https://yunwu.ai/v1"
+            base_url="https://yunwu.ai/v1",
+            max_retries=0  # retried by _chat_completion
         )
         self.model = self.TEXT_MODEL
         
         # API key for image generation (may be same or different)
         self.image_api_key = image_api_key or api_key
         
+        # Shared per-key rate limiters (text and image endpoints are separate quotas)
+        self.text_limiter = RateLimiter("yunwu", api_key)
+        self.image_limiter = RateLimiter("yunwu-image", self.image_api_key)
+        
         print(f"[YunwuProvider] Text model: {self.TEXT_MODEL}")
         print(f"[YunwuProvider] Image model: {self.IMAGE_MODEL}")
         print(f"[YunwuProvider] Using {'same' if api_key == self.image_api_key else 'different'} API key for image generation")
     
+    async def _chat_completion(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ):
+        """Text model request through the per-key rate limiter, with retries"""
+        # Long generations get proportionally more time than AI_REQUEST_TIMEOUT
+        timeout = settings.AI_REQUEST_TIMEOUT * max(1, max_tokens // 2000)
+        async for attempt in _retrying("TextGen"):
+            with attempt:
+                async with self.text_limiter.call():
+                    return await self.client.chat.completions.create(
+                        model=self.TEXT_MODEL,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        timeout=timeout
+                    )
+    
     async def generate_ppt_outline(
         self,
         prompt: str,
@@ -200,14 +198,10 @@ class YunwuProvider(AIProviderBase):
     ) -> Dict:
         """Generate detailed PPT outline with rich content"""
         
-        style_descriptions = {
-            "business": "Professional business style, deep blue tones, clean and elegant",
-            "education": "Educational style, green tones, fresh and clear",
-            "creative": "Creative style, pink/purple tones, modern and lively",
-            "minimal": "Minimalist style, black/white/gray tones, simple and elegant",
-            "tech": "Tech style, cyan/blue tones, futuristic"
-        }
-        style_desc = style_descriptions.get(style, style_descriptions["business"])
+        if num_slides > settings.AI_OUTLINE_CHUNK_THRESHOLD:
+            return await self._generate_chunked_outline(prompt, num_slides, language, style)
+        
+        style_desc = self.STYLE_DESCRIPTIONS.get(style, self.STYLE_DESCRIPTIONS["business"])
         
         system_prompt = f"""You are a professional PPT content strategist. Generate content-rich, data-driven, well-structured presentations based on user topics.
 
@@ -365,8 +359,7 @@ class YunwuProvider(AIProviderBase):
         
         print(f"[TextGen] Using model: {self.TEXT_MODEL} for outline generation")
         
-        response = await self.client.chat.completions.create(
-            model=self.TEXT_MODEL,
+        response = await self._chat_completion(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt}
@@ -383,11 +376,17 @@ class YunwuProvider(AIProviderBase):
         else:
             print(f"[AI Provider] WARNING: Raw response does NOT contain image_prompt fields")
         
-        # Check if truncated
         if response.choices[0].finish_reason == "length":
-            content = _fix_json_content(content)
+            print("[AI Provider] WARNING: Outline truncated at max_tokens, salvaging")
         
-        result = robust_json_parse(content)
+        # Truncated output keeps only the complete slides instead of failing
+        # the task (which would re-run the whole generation)
+        result, truncated = salvage_json_parse(content)
+        if truncated:
+            if not result.get("slides"):
+                raise ValueError("Outline truncated before the first complete slide")
+            result["truncated"] = True
+            print(f"[AI Provider] Salvaged {len(result['slides'])}/{num_slides} complete slides")
         
         # Debug: Check parsed result
         slides = result.get("slides", [])
@@ -396,6 +395,164 @@ class YunwuProvider(AIProviderBase):
         
         return result
     
+    async def _generate_chunked_outline(
+        self,
+        prompt: str,
+        num_slides: int,
+        language: str,
+        style: str
+    ) -> Dict:
+        """
+        Generate a large outline as a skeleton plus parallel body batches
+        
+        A single max_tokens=8000 response cannot hold a 50-slide deck, so:
+        1. Generate a compact skeleton (title, summary, theme, slide types/titles)
+        2. Expand slide bodies in parallel batches that share the skeleton
+        3. Merge the batches back in skeleton order
+        """
+        skeleton = await self._generate_outline_skeleton(prompt, num_slides, language, style)
+        skeleton_slides = skeleton["slides"][:num_slides]
+        
+        batch_size = settings.AI_OUTLINE_BATCH_SIZE
+        batches = [
+            (start, skeleton_slides[start:start + batch_size])
+            for start in range(0, len(skeleton_slides), batch_size)
+        ]
+        print(f"[TextGen] Expanding {len(skeleton_slides)} slides in {len(batches)} parallel batches")
+        
+        expanded = await asyncio.gather(
+            *(self._expand_outline_batch(prompt, skeleton, start, batch, language)
+              for start, batch in batches),
+            return_exceptions=True
+        )
+        
+        if all(isinstance(result, Exception) for result in expanded):
+            raise expanded[0]
+        
+        slides = []
+        for (start, batch), result in zip(batches, expanded):
+            if isinstance(result, Exception):
+                print(f"[TextGen] Batch {start + 1}-{start + len(batch)} failed, keeping skeleton: {result}")
+                result = []
+            for offset, planned in enumerate(batch):
+                body = result[offset] if offset < len(result) and isinstance(result[offset], dict) else {}
+                slides.append({**planned, **body})
+        
+        outline = {**skeleton, "slides": slides}
+        print(f"[AI Provider] Merged {len(slides)} slides, "
+              f"{sum(1 for s in slides if s.get('image_prompt'))} have image_prompt")
+        return outline
+    
+    async def _generate_outline_skeleton(
+        self,
+        prompt: str,
+        num_slides: int,
+        language: str,
+        style: str
+    ) -> Dict:
+        """Generate deck title, summary, theme and the type/title of every slide"""
+        style_desc = self.STYLE_DESCRIPTIONS.get(style, self.STYLE_DESCRIPTIONS["business"])
+        
+        system_prompt = f"""You are a professional PPT content strategist. Plan the structure of a presentation based on the user topic.
+
+**Requirements**:
+1. Plan exactly {num_slides} slides
+2. Use {language} language
+3. Design style: {style_desc}
+4. The first slide is "title"; use "section" slides to divide chapters
+5. Choose the layout that best fits each slide: "title", "section", "content", "two-column", "timeline", "process", "grid", "comparison", "data", "quote", "image-text"
+6. Slide titles must be specific and attractive, not generic placeholders
+
+**Output Format (JSON only, no slide bodies)**:
+{{
+    "title": "Attractive, specific main PPT title",
+    "summary": "Overall content summary, around 200 words",
+    "theme": {{
+        "name": "Theme name",
+        "primary_color": "Primary color, e.g., #1a365d",
+        "secondary_color": "Secondary color, e.g., #3182ce",
+        "background_color": "Background color, e.g., #ffffff",
+        "text_color": "Text color, e.g., #1a202c",
+        "accent_color": "Accent color, e.g., #ed8936",
+        "font_family": "Font, e.g., Microsoft YaHei"
+    }},
+    "slides": [
+        {{"type": "title", "title": "Main title"}},
+        {{"type": "section", "title": "Chapter title"}},
+        {{"type": "content", "title": "Slide title"}}
+    ]
+}}"""
+        
+        print(f"[TextGen] Using model: {self.TEXT_MODEL} for outline skeleton ({num_slides} slides)")
+        
+        response = await self._chat_completion(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=4000
+        )
+        
+        skeleton, _ = salvage_json_parse(response.choices[0].message.content)
+        if not skeleton.get("slides"):
+            raise ValueError("Outline skeleton contains no slides")
+        return skeleton
+    
+    async def _expand_outline_batch(
+        self,
+        prompt: str,
+        skeleton: Dict,
+        start: int,
+        batch: List[Dict],
+        language: str
+    ) -> List[Dict]:
+        """Write full content for skeleton slides start+1 .. start+len(batch)"""
+        plan = "\n".join(
+            f"{i + 1}. [{s.get('type', 'content')}] {s.get('title', '')}"
+            for i, s in enumerate(skeleton["slides"])
+        )
+        first, last = start + 1, start + len(batch)
+        
+        system_prompt = f"""You are a professional PPT content strategist writing part of a presentation.
+
+**Presentation**: {skeleton.get("title", "")}
+**Summary**: {skeleton.get("summary", "")}
+
+**Full slide plan**:
+{plan}
+
+**Task**: Write the full content for slides {first}-{last} only, keeping each slide's type and title from the plan.
+
+**Requirements**:
+1. Use {language} language
+2. Each slide must have complete, valuable content with data/cases/analysis, not just simple titles
+3. EVERY slide MUST include an "image_prompt" field (30-80 words describing a professional business illustration)
+4. Do not repeat content that belongs to other slides in the plan
+
+**Fields by slide type** (plus "type", "title" and "image_prompt" on every slide):
+{self.SLIDE_FIELDS}
+
+**Output Format (JSON)**:
+{{
+    "slides": [ exactly {len(batch)} slide objects, in plan order ]
+}}"""
+        
+        response = await self._chat_completion(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=8000
+        )
+        
+        result, truncated = salvage_json_parse(response.choices[0].message.content)
+        slides = result.get("slides", []) if isinstance(result, dict) else result
+        if truncated:
+            print(f"[TextGen] Batch {first}-{last} truncated, salvaged {len(slides)} slides")
+        return slides
+    
     async def generate_slide_content(
         self,
         title: str,
@@ -421,8 +578,7 @@ Requirements:
 
 Output format: Rich text with markdown-style formatting."""
         
-        response = await self.client.chat.completions.create(
-            model=self.TEXT_MODEL,
+        response = await self._chat_completion(
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
             max_tokens=2000
@@ -446,8 +602,7 @@ Requirements:
 
 Output only the prompt itself, no other text."""
         
-        response = await self.client.chat.completions.create(
-            model=self.TEXT_MODEL,
+        response = await self._chat_completion(
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
             max_tokens=200
@@ -455,6 +610,59 @@ Output only the prompt itself, no other text."""
         
         return response.choices[0].message.content.strip()
     
+    async def _post_image_request(self, api_url: str, payload: Dict, headers: Dict) -> httpx.Response:
+        """Single image request; raises on 429/5xx so the caller can retry"""
+        started = time.monotonic()
+        async with httpx.AsyncClient(timeout=settings.AI_IMAGE_TIMEOUT) as client:
+            async with self.image_limiter.call() as outcome:
+                response = await client.post(api_url, json=payload, headers=headers)
+                outcome.status_code = response.status_code
+        
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        if response.status_code == 200:
+            self._image_latencies.append(time.monotonic() - started)
+        return response
+    
+    def _hedge_delay(self) -> Optional[float]:
+        """Latency percentile after which a duplicate image request is sent"""
+        if not settings.AI_IMAGE_HEDGE_ENABLED or len(self._image_latencies) < 20:
+            return None
+        latencies = sorted(self._image_latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * settings.AI_IMAGE_HEDGE_PERCENTILE))
+        return latencies[index]
+    
+    async def _hedged_image_request(self, api_url: str, payload: Dict, headers: Dict) -> httpx.Response:
+        """
+        Image request hedged against tail latency
+        
+        If the first request is slower than the configured latency percentile,
+        a duplicate is sent and whichever succeeds first wins.
+        """
+        delay = self._hedge_delay()
+        first = asyncio.create_task(self._post_image_request(api_url, payload, headers))
+        if delay is None:
+            return await first
+        
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        
+        print(f"[ImageGen] No response after {delay:.1f}s, sending hedged request")
+        pending = {first, asyncio.create_task(self._post_image_request(api_url, payload, headers))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for request in done:
+                    if request.exception() is None:
+                        return request.result()
+                    error = request.exception()
+            raise error
+        finally:
+            for request in pending:
+                request.cancel()
+    
     async def generate_image(self, prompt: str) -> str:
         """
         Generate image using gemini-3-pro-image-preview model
@@ -466,8 +674,6 @@ Output only the prompt itself, no other text."""
             Base64 encoded image data URL (data:image/png;base64,...)
         """
         try:
-            import httpx
-            
             print(f"[ImageGen] Using model: {self.IMAGE_MODEL}")
             print(f"[ImageGen] Prompt: {prompt[:50]}...")
             
@@ -497,44 +703,45 @@ Output only the prompt itself, no other text."""
             
             print(f"[ImageGen] Sending request to {api_url}")
             
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.post(api_url, json=payload, headers=headers)
-                
-                print(f"[ImageGen] Response status: {response.status_code}")
-                
-                if response.status_code != 200:
-                    print(f"[ImageGen] API error: {response.status_code} - {response.text[:200]}")
-                    return ""
-                
-                data = response.json()
-                
-                # Extract image from response
-                candidates = data.get("candidates", [])
-                if not candidates:
-                    print("[ImageGen] No candidates in response")
-                    print(f"[ImageGen] Response: {data}")
-                    return ""
-                
-                content = candidates[0].get("content", {})
-                parts = content.get("parts", [])
-                
-                print(f"[ImageGen] Got {len(parts)} parts in response")
-                
-                for i, part in enumerate(parts):
-                    print(f"[ImageGen] Part {i} keys: {list(part.keys())}")
-                    if "inlineData" in part:
-                        inline_data = part["inlineData"]
-                        mime_type = inline_data.get("mimeType", "image/png")
-                        base64_data = inline_data.get("data", "")
-                        if base64_data:
-                            print(f"[ImageGen] Found image data: {mime_type}, {len(base64_data)} chars")
-                            return f"data:{mime_type};base64,{base64_data}"
-                    elif "text" in part:
-                        print(f"[ImageGen] Text part: {part['text'][:100]}...")
-                
-                print("[ImageGen] No image data found in response")
+            async for attempt in _retrying("ImageGen"):
+                with attempt:
+                    response = await self._hedged_image_request(api_url, payload, headers)
+            
+            print(f"[ImageGen] Response status: {response.status_code}")
+            
+            if response.status_code != 200:
+                print(f"[ImageGen] API error: {response.status_code} - {response.text[:200]}")
                 return ""
-                
+            
+            data = response.json()
+            
+            # Extract image from response
+            candidates = data.get("candidates", [])
+            if not candidates:
+                print("[ImageGen] No candidates in response")
+                print(f"[ImageGen] Response: {data}")
+                return ""
+            
+            content = candidates[0].get("content", {})
+            parts = content.get("parts", [])
+            
+            print(f"[ImageGen] Got {len(parts)} parts in response")
+            
+            for i, part in enumerate(parts):
+                print(f"[ImageGen] Part {i} keys: {list(part.keys())}")
+                if "inlineData" in part:
+                    inline_data = part["inlineData"]
+                    mime_type = inline_data.get("mimeType", "image/png")
+                    base64_data = inline_data.get("data", "")
+                    if base64_data:
+                        print(f"[ImageGen] Found image data: {mime_type}, {len(base64_data)} chars")
+                        return f"data:{mime_type};base64,{base64_data}"
+                elif "text" in part:
+                    print(f"[ImageGen] Text part: {part['text'][:100]}...")
+            
+            print("[ImageGen] No image data found in response")
+            return ""
+            
         except Exception as e:
             print(f"[ImageGen] Error generating image: {e}")
             import traceback
@@ -3,25 +3,37 @@ Export Service
 Handle PPTX, PDF, image export
 """
 
+import asyncio
 import base64
 import os
 import re
+import subprocess
 import tempfile
+import time
 import uuid
 from io import BytesIO
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Iterable, List, Tuple
 from urllib.parse import urlparse
 
 import httpx
 from pptx import Presentation as PPTXPresentation
-from pptx.util import Inches, Pt, Emu
-from pptx.dml.color import RGBColor
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-from pptx.enum.shapes import MSO_SHAPE
+from pptx.util import Inches
 
 from app.config import settings
+from app.core.security import sign_url_path
 from app.models.presentation import Presentation
+from app.services.render_plans import render_slide, resolve_theme
+from app.services.slide_cache import SlideCache, SlideFragment, apply_fragment, slide_cache_key
+from app.utils.image_processing import QUALITY_DPI, normalize_image
+from app.utils.zip_stream import ZipStream
+
+# Path of the signed download route (see app.routers.export.files_router)
+EXPORT_DOWNLOAD_PATH = "/api/v1/exports"
+
+# Slide size and image-text picture box, in inches
+SLIDE_SIZE = (13.333, 7.5)
+IMAGE_TEXT_BOX = (5.9, 5.5)
 
 
 class ImageHelper:
@@ -43,13 +55,15 @@ class ImageHelper:
         return base64.b64decode(data)
     
     @staticmethod
-    async def download_image(url: str) -> bytes:
-        """Download image from URL"""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                return response.content
-            raise ValueError(f"Failed to download image: {response.status_code}")
+    async def download_image(url: str, client: Optional[httpx.AsyncClient] = None) -> bytes:
+        """Download image from URL, reusing client if given"""
+        if client is None:
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                return await ImageHelper.download_image(url, client)
+        response = await client.get(url)
+        if response.status_code == 200:
+            return response.content
+        raise ValueError(f"Failed to download image: {response.status_code}")
     
     @staticmethod
     async def get_image_data(image_url: str) -> Optional[BytesIO]:
@@ -65,6 +79,40 @@ class ImageHelper:
         except Exception as e:
             print(f"[Export] Failed to get image data: {e}")
             return None
+    
+    @staticmethod
+    async def prefetch_images(image_urls: Iterable[str]) -> Dict[str, bytes]:
+        """
+        Fetch all images up front
+        
+        Identical URLs are fetched once, downloads run concurrently up to
+        EXPORT_IMAGE_CONCURRENCY and base64 decoding runs in a thread so
+        large data URLs do not block the event loop.
+        
+        Returns:
+            Image bytes by URL; failed images are left out
+        """
+        unique_urls = list(dict.fromkeys(url for url in image_urls if url))
+        if not unique_urls:
+            return {}
+        
+        semaphore = asyncio.Semaphore(settings.EXPORT_IMAGE_CONCURRENCY)
+        
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            async def fetch(url: str) -> Optional[bytes]:
+                try:
+                    if ImageHelper.is_base64(url):
+                        return await asyncio.to_thread(ImageHelper.decode_base64, url)
+                    if url.startswith('http'):
+                        async with semaphore:
+                            return await ImageHelper.download_image(url, client)
+                except Exception as e:
+                    print(f"[Export] Failed to get image data: {e}")
+                return None
+            
+            results = await asyncio.gather(*(fetch(url) for url in unique_urls))
+        
+        return {url: data for url, data in zip(unique_urls, results) if data}
 
 
 class ExportService:
@@ -81,99 +129,143 @@ class ExportService:
         self.storage_path = Path(settings.STORAGE_LOCAL_PATH) / "exports"
         self.storage_path.mkdir(parents=True, exist_ok=True)
     
-    def _hex_to_rgb(self, hex_color: str) -> tuple:
-        """Convert hex color to RGB tuple"""
-        hex_color = hex_color.lstrip('#')
-        if len(hex_color) == 3:
-            hex_color = ''.join([c*2 for c in hex_color])
-        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-    
-    def _add_text_box(self, slide, left, top, width, height, text, 
-                      font_size=18, bold=False, color=None, align=PP_ALIGN.LEFT):
-        """Helper method to add text box"""
-        box = slide.shapes.add_textbox(Inches(left), Inches(top), Inches(width), Inches(height))
-        tf = box.text_frame
-        tf.word_wrap = True
-        p = tf.paragraphs[0]
-        p.text = text
-        p.alignment = align
-        run = p.runs[0]
-        run.font.size = Pt(font_size)
-        run.font.bold = bold
-        if color:
-            run.font.color.rgb = RGBColor(*color)
-        return box
-    
     async def export_pptx(
         self,
         presentation: Presentation,
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        quality: str = "standard",
+        slide_range: Optional[str] = None
     ) -> str:
-        """Export to PPTX format"""
+        """
+        Export to PPTX format
+        
+        Args:
+            quality: "standard" or "high"; sets the resolution images are
+                     downscaled to
+            slide_range: 1-based slides to export, e.g. "1-5" or "1,3,6-8";
+                         None or "all" exports the whole deck
+        """
         if output_path is None:
             output_path = str(self.storage_path / f"{presentation.id}_{uuid.uuid4().hex}.pptx")
         
+        # Only the selected slides are fetched and rendered
+        all_slides = list(presentation.slides or [])
+        slides = [all_slides[i] for i in parse_slide_range(slide_range, len(all_slides))]
+        
+        # Slides unchanged since an earlier export are copied from the cache
+        cache_keys: List[str] = []
+        fragments: Dict[int, SlideFragment] = {}
+        if settings.EXPORT_SLIDE_CACHE_ENABLED:
+            cache_keys = [slide_cache_key(slide_data, quality) for slide_data in slides]
+            fragments = await asyncio.to_thread(SlideCache().load_many, cache_keys)
+        
+        # Fetch the images of the slides that need rendering
+        images = await ImageHelper.prefetch_images(
+            slide_data.get('content', {}).get('image_url')
+            for index, slide_data in enumerate(slides) if index not in fragments
+        )
+        
+        # python-pptx is CPU-bound: render in a thread so the event loop stays
+        # free. Exports run in Celery prefork children, so they use all cores
+        # through the export worker's --concurrency, one render per child.
+        await asyncio.to_thread(
+            self.render_pptx, slides, images, output_path, quality, fragments, cache_keys
+        )
+        return output_path
+    
+    def render_pptx(
+        self,
+        slides: List[Dict[str, Any]],
+        images: Dict[str, bytes],
+        output_path: str,
+        quality: str = "standard",
+        fragments: Optional[Dict[int, SlideFragment]] = None,
+        cache_keys: Optional[List[str]] = None
+    ) -> None:
+        """
+        Render slides to a PPTX file (synchronous, CPU-bound)
+        
+        Args:
+            slides: Slide dicts as stored on the presentation
+            images: Prefetched image bytes by URL
+            output_path: File to write
+            quality: Export quality for image normalization
+            fragments: Cached slides by index, copied instead of rendered
+            cache_keys: Slide cache keys; rendered slides are stored under them
+        """
+        fragments = fragments or {}
+        cache = SlideCache() if cache_keys else None
+        
         # Create PPTX
         prs = PPTXPresentation()
         prs.slide_width = Inches(13.333)
         prs.slide_height = Inches(7.5)
         
-        for slide_data in presentation.slides:
-            slide_type = slide_data.get('type', 'content')
-            style = slide_data.get('style', {})
-            theme = style.get('theme', {})
-            content = slide_data.get('content', {})
-            
-            # Get theme colors
-            primary_rgb = self._hex_to_rgb(theme.get("primary_color", "#1a365d"))
-            text_rgb = self._hex_to_rgb(theme.get("text_color", "#1a202c"))
-            bg_rgb = self._hex_to_rgb(theme.get("background_color", "#ffffff"))
-            
-            # Get image URL if available
-            image_url = content.get('image_url')
-            
+        for index, slide_data in enumerate(slides):
             # Create blank slide
             slide = prs.slides.add_slide(prs.slide_layouts[6])
             
-            # Set background
-            background = slide.background
-            fill = background.fill
-            fill.solid()
-            fill.fore_color.rgb = RGBColor(*bg_rgb)
+            if index in fragments:
+                apply_fragment(slide, fragments[index])
+                continue
             
-            # Add background image if available
-            image_data = None
-            if image_url:
-                image_data = await ImageHelper.get_image_data(image_url)
-                if image_data:
-                    self._add_background_image(slide, image_data)
+            complete = self._render_slide(slide, slide_data, images, quality)
             
-            # Render based on layout type
-            if slide_type == 'title':
-                self._render_title_slide(slide, content, primary_rgb, text_rgb, image_data is not None)
-            elif slide_type == 'section':
-                self._render_section_slide(slide, content, primary_rgb, text_rgb, image_data is not None)
-            elif slide_type == 'two-column':
-                self._render_two_column_slide(slide, content, primary_rgb, text_rgb)
-            elif slide_type == 'timeline':
-                self._render_timeline_slide(slide, content, primary_rgb, text_rgb)
-            elif slide_type == 'process':
-                self._render_process_slide(slide, content, primary_rgb, text_rgb)
-            elif slide_type == 'grid':
-                self._render_grid_slide(slide, content, primary_rgb, text_rgb)
-            elif slide_type == 'comparison':
-                self._render_comparison_slide(slide, content, primary_rgb, text_rgb)
-            elif slide_type == 'data':
-                self._render_data_slide(slide, content, primary_rgb, text_rgb)
-            elif slide_type == 'quote':
-                self._render_quote_slide(slide, content, primary_rgb, text_rgb)
-            elif slide_type == 'image-text':
-                self._render_image_text_slide(slide, content, primary_rgb, text_rgb, image_data)
-            else:
-                self._render_content_slide(slide, content, primary_rgb, text_rgb)
+            # Don't cache a slide whose image failed to download, so the
+            # next export retries it
+            if cache is not None and complete:
+                try:
+                    cache.store(cache_keys[index], slide)
+                except OSError as e:
+                    print(f"[Export] Failed to cache slide: {e}")
         
         prs.save(output_path)
-        return output_path
+    
+    def _render_slide(
+        self,
+        slide,
+        slide_data: Dict[str, Any],
+        images: Dict[str, bytes],
+        quality: str
+    ) -> bool:
+        """
+        Render one slide dict onto a blank slide
+        
+        Returns:
+            False if the slide's image was missing from images
+        """
+        slide_type = slide_data.get('type', 'content')
+        style = slide_data.get('style', {})
+        content = slide_data.get('content', {})
+        
+        # Resolved once per distinct theme, shared across slides
+        theme = resolve_theme(style.get('theme'))
+        
+        # Get image URL if available
+        image_url = content.get('image_url')
+        
+        # Set background
+        background = slide.background
+        fill = background.fill
+        fill.solid()
+        fill.fore_color.rgb = theme.background
+        
+        # Add background image if available, downscaled to the slide
+        # Fresh buffer per slide: the same image may be used more than once
+        image_data = None
+        if image_url in images:
+            image_data = BytesIO(normalize_image(images[image_url], SLIDE_SIZE, quality))
+            self._add_background_image(slide, image_data)
+        
+        # Draw the layout from its compiled render plan
+        picture = None
+        if slide_type == 'image-text' and image_url in images:
+            picture = BytesIO(normalize_image(images[image_url], IMAGE_TEXT_BOX, quality))
+        render_slide(
+            slide, slide_type, content, theme,
+            has_image=image_data is not None, picture=picture
+        )
+        return not image_url or image_url in images
     
     def _add_background_image(self, slide, image_data: BytesIO):
         """Add background image to slide with transparency overlay"""
@@ -182,354 +274,25 @@ class ExportService:
             slide.shapes.add_picture(
                 image_data,
                 Inches(0), Inches(0),
-                width=Inches(13.333),
-                height=Inches(7.5)
+                width=Inches(SLIDE_SIZE[0]),
+                height=Inches(SLIDE_SIZE[1])
             )
         except Exception as e:
             print(f"[Export] Failed to add background image: {e}")
     
-    def _render_title_slide(self, slide, content, primary_rgb, text_rgb, has_image=False):
-        """Render title slide"""
-        title = content.get('title', '')
-        subtitle = content.get('subtitle', '')
-        
-        # If has background image, use white text for better visibility
-        text_color = RGBColor(255, 255, 255) if has_image else RGBColor(*primary_rgb)
-        subtext_color = RGBColor(240, 240, 240) if has_image else RGBColor(*text_rgb)
-        
-        # Add semi-transparent overlay for better text readability
-        if has_image:
-            overlay = slide.shapes.add_shape(
-                MSO_SHAPE.RECTANGLE,
-                Inches(0), Inches(0),
-                Inches(13.333), Inches(7.5)
-            )
-            overlay.fill.solid()
-            overlay.fill.fore_color.rgb = RGBColor(0, 0, 0)
-            overlay.fill.transparency = 0.4
-            overlay.line.fill.background()
-        
-        self._add_text_box(slide, 0.5, 2.5, 12.333, 1.5, title,
-                          font_size=54, bold=True, color=text_color, align=PP_ALIGN.CENTER)
-        
-        if subtitle:
-            self._add_text_box(slide, 0.5, 4.2, 12.333, 1, subtitle,
-                              font_size=28, color=subtext_color, align=PP_ALIGN.CENTER)
-    
-    def _render_section_slide(self, slide, content, primary_rgb, text_rgb, has_image=False):
-        """Render section divider slide"""
-        title = content.get('title', '')
-        description = content.get('description', '')
-        
-        # If has background image, use white text for better visibility
-        text_color = RGBColor(255, 255, 255) if has_image else RGBColor(*primary_rgb)
-        subtext_color = RGBColor(240, 240, 240) if has_image else RGBColor(*text_rgb)
-        
-        # Add semi-transparent overlay for better text readability
-        if has_image:
-            overlay = slide.shapes.add_shape(
-                MSO_SHAPE.RECTANGLE,
-                Inches(0), Inches(0),
-                Inches(13.333), Inches(7.5)
-            )
-            overlay.fill.solid()
-            overlay.fill.fore_color.rgb = RGBColor(0, 0, 0)
-            overlay.fill.transparency = 0.4
-            overlay.line.fill.background()
-        
-        self._add_text_box(slide, 0.5, 2.8, 12.333, 1.5, title,
-                          font_size=48, bold=True, color=text_color, align=PP_ALIGN.CENTER)
-        
-        if description:
-            self._add_text_box(slide, 0.5, 4.3, 12.333, 1, description,
-                              font_size=24, color=subtext_color, align=PP_ALIGN.CENTER)
-    
-    def _render_content_slide(self, slide, content, primary_rgb, text_rgb):
-        """Render content slide"""
-        title = content.get('title', '')
-        text = content.get('text', '')
-        bullets = content.get('bullets', [])
-        
-        self._add_text_box(slide, 0.5, 0.4, 12.333, 1, title,
-                          font_size=40, bold=True, color=primary_rgb)
-        
-        if bullets:
-            y_pos = 1.5
-            for bullet in bullets:
-                self._add_text_box(slide, 0.5, y_pos, 12.333, 0.8, f"• {bullet}",
-                                  font_size=22, color=text_rgb)
-                y_pos += 0.7
-        elif text:
-            self._add_text_box(slide, 0.5, 1.5, 12.333, 5.5, text,
-                              font_size=22, color=text_rgb)
-    
-    def _render_two_column_slide(self, slide, content, primary_rgb, text_rgb):
-        """Render two-column comparison slide"""
-        title = content.get('title', '')
-        left = content.get('left', {})
-        right = content.get('right', {})
-        
-        self._add_text_box(slide, 0.5, 0.4, 12.333, 1, title,
-                          font_size=40, bold=True, color=primary_rgb)
-        
-        if left.get('title'):
-            self._add_text_box(slide, 0.5, 1.4, 5.9, 0.6, left['title'],
-                              font_size=28, bold=True, color=primary_rgb)
-        
-        left_points = left.get('points', [])
-        y_pos = 2.2
-        for point in left_points[:5]:
-            self._add_text_box(slide, 0.5, y_pos, 5.9, 0.6, f"• {point}",
-                              font_size=20, color=text_rgb)
-            y_pos += 0.6
-        
-        if right.get('title'):
-            self._add_text_box(slide, 6.9, 1.4, 5.9, 0.6, right['title'],
-                              font_size=28, bold=True, color=primary_rgb)
-        
-        right_points = right.get('points', [])
-        y_pos = 2.2
-        for point in right_points[:5]:
-            self._add_text_box(slide, 6.9, y_pos, 5.9, 0.6, f"• {point}",
-                              font_size=20, color=text_rgb)
-            y_pos += 0.6
-    
-    def _render_timeline_slide(self, slide, content, primary_rgb, text_rgb):
-        """Render timeline slide"""
-        title = content.get('title', '')
-        events = content.get('events', [])
-        
-        self._add_text_box(slide, 0.5, 0.4, 12.333, 1, title,
-                          font_size=40, bold=True, color=primary_rgb)
-        
-        if not events:
-            return
-        
-        count = min(len(events), 5)
-        spacing = 12.0 / max(count - 1, 1)
-        
-        for i, event in enumerate(events[:5]):
-            x_pos = 0.5 + i * spacing
-            
-            shape = slide.shapes.add_shape(MSO_SHAPE.OVAL, Inches(x_pos - 0.15), Inches(3.85), Inches(0.3), Inches(0.3))
-            shape.fill.solid()
-            shape.fill.fore_color.rgb = RGBColor(*primary_rgb)
-            shape.line.fill.background()
-            
-            self._add_text_box(slide, x_pos - 0.8, 4.3, 1.6, 0.5,
-                              event.get('year', ''), font_size=16, bold=True, 
-                              color=primary_rgb, align=PP_ALIGN.CENTER)
-            
-            self._add_text_box(slide, x_pos - 0.8, 4.8, 1.6, 0.6,
-                              event.get('title', ''), font_size=14, bold=True,
-                              color=text_rgb, align=PP_ALIGN.CENTER)
-            
-            self._add_text_box(slide, x_pos - 0.8, 5.3, 1.6, 1.5,
-                              event.get('description', ''), font_size=12,
-                              color=text_rgb, align=PP_ALIGN.CENTER)
-    
-    def _render_process_slide(self, slide, content, primary_rgb, text_rgb):
-        """Render process flow slide"""
-        title = content.get('title', '')
-        steps = content.get('steps', [])
-        
-        self._add_text_box(slide, 0.5, 0.4, 12.333, 1, title,
-                          font_size=40, bold=True, color=primary_rgb)
-        
-        if not steps:
-            return
-        
-        count = min(len(steps), 6)
-        spacing = 12.0 / count
-        
-        for i, step in enumerate(steps[:6]):
-            x_pos = 0.5 + i * spacing
-            
-            shape = slide.shapes.add_shape(MSO_SHAPE.ROUNDED_RECTANGLE, 
-                                          Inches(x_pos), Inches(3), Inches(spacing - 0.3), Inches(1.5))
-            shape.fill.solid()
-            shape.fill.fore_color.rgb = RGBColor(*primary_rgb)
-            shape.line.fill.background()
-            
-            tf = shape.text_frame
-            tf.word_wrap = True
-            p = tf.paragraphs[0]
-            p.text = step
-            p.alignment = PP_ALIGN.CENTER
-            run = p.runs[0]
-            run.font.size = Pt(16)
-            run.font.bold = True
-            run.font.color.rgb = RGBColor(255, 255, 255)
-            
-            self._add_text_box(slide, x_pos, 2.3, spacing - 0.3, 0.5,
-                              f"Step {i + 1}", font_size=14, color=text_rgb, align=PP_ALIGN.CENTER)
-            
-            if i < count - 1:
-                arrow_x = x_pos + spacing - 0.25
-                self._add_text_box(slide, arrow_x, 3.5, 0.2, 0.5, "→",
-                                  font_size=24, color=primary_rgb, align=PP_ALIGN.CENTER)
-    
-    def _render_grid_slide(self, slide, content, primary_rgb, text_rgb):
-        """Render grid layout slide"""
-        title = content.get('title', '')
-        items = content.get('items', [])
-        
-        self._add_text_box(slide, 0.5, 0.4, 12.333, 1, title,
-                          font_size=40, bold=True, color=primary_rgb)
-        
-        if not items:
-            return
-        
-        positions = [(0.5, 1.5), (6.9, 1.5), (0.5, 4.2), (6.9, 4.2)]
-        
-        for i, item in enumerate(items[:4]):
-            x, y = positions[i]
-            
-            shape = slide.shapes.add_shape(MSO_SHAPE.ROUNDED_RECTANGLE,
-                                          Inches(x), Inches(y), Inches(5.9), Inches(2.5))
-            shape.fill.solid()
-            shape.fill.fore_color.rgb = RGBColor(245, 245, 245)
-            shape.line.color.rgb = RGBColor(*primary_rgb)
-            
-            self._add_text_box(slide, x + 0.2, y + 0.2, 5.5, 0.6,
-                              item.get('title', ''), font_size=24, bold=True, color=primary_rgb)
-            
-            self._add_text_box(slide, x + 0.2, y + 0.9, 5.5, 1.5,
-                              item.get('description', ''), font_size=16, color=text_rgb)
-    
-    def _render_comparison_slide(self, slide, content, primary_rgb, text_rgb):
-        """Render comparison table slide"""
-        title = content.get('title', '')
-        items = content.get('items', [])
-        
-        self._add_text_box(slide, 0.5, 0.4, 12.333, 1, title,
-                          font_size=40, bold=True, color=primary_rgb)
-        
-        if not items:
-            return
-        
-        headers = ['Item', 'Option A', 'Option B']
-        col_widths = [4, 4.1, 4.1]
-        x_pos = 0.5
-        
-        for i, header in enumerate(headers):
-            self._add_text_box(slide, x_pos, 1.5, col_widths[i], 0.6, header,
-                              font_size=20, bold=True, color=primary_rgb)
-            x_pos += col_widths[i]
-        
-        line = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, 
-                                     Inches(0.5), Inches(2.1), Inches(12.333), Inches(0.02))
-        line.fill.solid()
-        line.fill.fore_color.rgb = RGBColor(*primary_rgb)
-        line.line.fill.background()
-        
-        y_pos = 2.3
-        for item in items[:6]:
-            x_pos = 0.5
-            values = [item.get('name', ''), item.get('valueA', ''), item.get('valueB', '')]
-            
-            for i, value in enumerate(values):
-                self._add_text_box(slide, x_pos, y_pos, col_widths[i], 0.5, value,
-                                  font_size=18, color=text_rgb)
-                x_pos += col_widths[i]
-            
-            y_pos += 0.6
-    
-    def _render_data_slide(self, slide, content, primary_rgb, text_rgb):
-        """Render data/statistics slide"""
-        title = content.get('title', '')
-        stats = content.get('stats', [])
-        
-        self._add_text_box(slide, 0.5, 0.4, 12.333, 1, title,
-                          font_size=40, bold=True, color=primary_rgb)
-        
-        if not stats:
-            return
-        
-        count = min(len(stats), 4)
-        spacing = 12.333 / count
-        
-        for i, stat in enumerate(stats[:4]):
-            x_pos = 0.5 + i * spacing
-            
-            self._add_text_box(slide, x_pos, 2.5, spacing, 1.5,
-                              stat.get('value', ''), font_size=60, bold=True,
-                              color=primary_rgb, align=PP_ALIGN.CENTER)
-            
-            self._add_text_box(slide, x_pos, 4.2, spacing, 0.8,
-                              stat.get('label', ''), font_size=20,
-                              color=text_rgb, align=PP_ALIGN.CENTER)
-    
-    def _render_quote_slide(self, slide, content, primary_rgb, text_rgb):
-        """Render quote slide"""
-        quote = content.get('quote', '')
-        author = content.get('author', '')
-        title = content.get('title', '')
-        
-        self._add_text_box(slide, 0.5, 1.5, 1, 1, '"', font_size=120, 
-                          color=primary_rgb, align=PP_ALIGN.CENTER)
-        
-        self._add_text_box(slide, 1.5, 2, 10.333, 2.5, quote,
-                          font_size=32, color=text_rgb, align=PP_ALIGN.CENTER)
-        
-        if author:
-            self._add_text_box(slide, 0.5, 4.8, 12.333, 0.8, f"- {author}",
-                              font_size=24, color=primary_rgb, align=PP_ALIGN.CENTER)
-        
-        if title:
-            self._add_text_box(slide, 0.5, 5.5, 12.333, 0.6, title,
-                              font_size=18, color=text_rgb, align=PP_ALIGN.CENTER)
-    
-    def _render_image_text_slide(self, slide, content, primary_rgb, text_rgb, image_data=None):
-        """Render image-text layout slide"""
-        title = content.get('title', '')
-        text = content.get('text', '')
-        image_url = content.get('image_url', '')
-        
-        self._add_text_box(slide, 0.5, 0.4, 12.333, 1, title,
-                          font_size=40, bold=True, color=primary_rgb)
-        
-        # Add actual image if available, otherwise use placeholder
-        if image_data:
-            try:
-                slide.shapes.add_picture(
-                    image_data,
-                    Inches(0.5), Inches(1.5),
-                    width=Inches(5.9)
-                )
-            except Exception as e:
-                print(f"[Export] Failed to add image: {e}")
-                self._add_image_placeholder(slide, primary_rgb, 0.5, 1.5, 5.9, 5.5)
-        else:
-            self._add_image_placeholder(slide, primary_rgb, 0.5, 1.5, 5.9, 5.5)
-        
-        self._add_text_box(slide, 6.9, 1.5, 5.9, 5.5, text,
-                          font_size=22, color=text_rgb)
-    
-    def _add_image_placeholder(self, slide, primary_rgb, left, top, width, height):
-        """Add image placeholder shape"""
-        img_shape = slide.shapes.add_shape(MSO_SHAPE.ROUNDED_RECTANGLE,
-                                          Inches(left), Inches(top), Inches(width), Inches(height))
-        img_shape.fill.solid()
-        img_shape.fill.fore_color.rgb = RGBColor(230, 230, 230)
-        img_shape.line.color.rgb = RGBColor(*primary_rgb)
-        
-        tf = img_shape.text_frame
-        p = tf.paragraphs[0]
-        p.text = "[Image Placeholder]"
-        p.alignment = PP_ALIGN.CENTER
-        run = p.runs[0]
-        run.font.size = Pt(18)
-        run.font.color.rgb = RGBColor(150, 150, 150)
-    
-    async def export_pdf(self, presentation: Presentation, output_path: Optional[str] = None) -> str:
+    async def export_pdf(
+        self,
+        presentation: Presentation,
+        output_path: Optional[str] = None,
+        quality: str = "standard",
+        slide_range: Optional[str] = None
+    ) -> str:
         """Export to PDF"""
-        pptx_path = await self.export_pptx(presentation)
+        pptx_path = await self.export_pptx(presentation, quality=quality, slide_range=slide_range)
         
         if output_path is None:
             output_path = str(self.storage_path / f"{presentation.id}_{uuid.uuid4().hex}.pdf")
         
-        import subprocess
         cmd = [
             "soffice",
             "--headless",
@@ -539,7 +302,7 @@ class ExportService:
         ]
         
         try:
-            subprocess.run(cmd, check=True, capture_output=True, timeout=60)
+            await asyncio.to_thread(subprocess.run, cmd, check=True, capture_output=True, timeout=60)
             generated_pdf = Path(pptx_path).with_suffix('.pdf')
             if generated_pdf.exists():
                 generated_pdf.rename(output_path)
@@ -549,9 +312,151 @@ class ExportService:
             Path(pptx_path).unlink(missing_ok=True)
             raise RuntimeError(f"PDF export failed: {e}")
     
-    def get_file_url(self, file_path: str) -> str:
-        """Get file access URL"""
-        return f"/exports/{Path(file_path).name}"
+    async def export_images(
+        self,
+        presentation: Presentation,
+        format: str = "png",
+        quality: str = "standard",
+        slide_range: Optional[str] = None
+    ) -> List[str]:
+        """
+        Export one image per slide
+        
+        Returns:
+            Image paths in slide order
+        """
+        pages: Dict[int, str] = {}
+        async for page, path in self._render_images(presentation, format, quality, slide_range):
+            pages[page] = path
+        return [pages[page] for page in sorted(pages)]
+    
+    async def export_images_archive(
+        self,
+        presentation: Presentation,
+        format: str = "png",
+        quality: str = "standard",
+        slide_range: Optional[str] = None
+    ) -> str:
+        """
+        Export slide images as a single file
+        
+        One slide gives the image itself. Several are appended to a zip as
+        each page finishes rasterizing, and each image is deleted once
+        archived, so nothing is zipped in a second pass.
+        """
+        slides = list(presentation.slides or [])
+        if len(parse_slide_range(slide_range, len(slides))) == 1:
+            return (await self.export_images(presentation, format, quality, slide_range))[0]
+        
+        output_path = self.storage_path / f"{presentation.id}_{uuid.uuid4().hex}.zip"
+        extension = "jpg" if format == "jpg" else "png"
+        try:
+            with open(output_path, "wb") as sink:
+                archive = ZipStream(sink)
+                async for page, path in self._render_images(presentation, format, quality, slide_range):
+                    await asyncio.to_thread(archive.add_file, path, f"slide_{page:03d}.{extension}")
+                    Path(path).unlink(missing_ok=True)
+                archive.close()
+        except BaseException:
+            output_path.unlink(missing_ok=True)
+            raise
+        return str(output_path)
+    
+    async def _render_images(
+        self,
+        presentation: Presentation,
+        format: str,
+        quality: str,
+        slide_range: Optional[str]
+    ) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Rasterize the selected slides, yielding (page, path) as pages finish
+        
+        The slides are rendered to one PDF, then pdftoppm (poppler) renders
+        its pages in parallel at the quality's DPI.
+        """
+        page_count = len(parse_slide_range(slide_range, len(presentation.slides or [])))
+        pdf_path = await self.export_pdf(presentation, quality=quality, slide_range=slide_range)
+        
+        prefix = self.storage_path / f"{presentation.id}_{uuid.uuid4().hex}"
+        dpi = QUALITY_DPI.get(quality, QUALITY_DPI["standard"])
+        extension = "jpg" if format == "jpg" else "png"
+        semaphore = asyncio.Semaphore(max(settings.EXPORT_RENDER_WORKERS, 1))
+        
+        async def rasterize(page: int) -> Tuple[int, str]:
+            output = f"{prefix}-{page:03d}"
+            cmd = [
+                "pdftoppm",
+                "-jpeg" if extension == "jpg" else "-png",
+                "-r", str(dpi),
+                "-f", str(page), "-l", str(page),
+                "-singlefile",
+                pdf_path,
+                output
+            ]
+            async with semaphore:
+                await asyncio.to_thread(subprocess.run, cmd, check=True, capture_output=True, timeout=120)
+            return page, f"{output}.{extension}"
+        
+        tasks = [asyncio.ensure_future(rasterize(page)) for page in range(1, page_count + 1)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    yield await next_done
+                except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
+                    raise RuntimeError(f"Image export failed: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            Path(pdf_path).unlink(missing_ok=True)
+    
+    def get_file_url(self, file_path: str, expires_in: Optional[int] = None) -> Optional[str]:
+        """
+        Get a pre-signed, expiring download URL
+        
+        The signature follows nginx secure_link_md5, so a reverse proxy can
+        serve EXPORT_DOWNLOAD_PATH straight from the exports directory;
+        otherwise the API route verifies it and streams the file.
+        
+        Returns None when DOWNLOAD_URL_SECRET is not set; files are then
+        only available from the authenticated download routes.
+        """
+        if not settings.DOWNLOAD_URL_SECRET:
+            return None
+        expires = int(time.time()) + (expires_in or settings.EXPORT_URL_EXPIRE_SECONDS)
+        path = f"{EXPORT_DOWNLOAD_PATH}/{Path(file_path).name}"
+        signature = sign_url_path(path, expires)
+        return f"{settings.EXPORT_PUBLIC_BASE_URL}{path}?expires={expires}&md5={signature}"
+
+
+def parse_slide_range(slide_range: Optional[str], total: int) -> List[int]:
+    """
+    Parse a 1-based slide range into sorted 0-based indices
+    
+    Accepts "all", single pages and ranges separated by commas
+    ("1-5", "1,3,6-8"). Pages past the end of the deck are ignored.
+    
+    Raises:
+        ValueError: Malformed range, or no slide of the deck selected
+    """
+    if not slide_range or slide_range.strip().lower() == "all":
+        return list(range(total))
+    
+    selected = set()
+    for part in slide_range.split(","):
+        first, _, last = part.strip().partition("-")
+        try:
+            start = int(first)
+            end = int(last) if last else start
+        except ValueError:
+            raise ValueError(f"Invalid slide range: {slide_range}")
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid slide range: {slide_range}")
+        selected.update(range(start - 1, min(end, total)))
+    
+    if not selected:
+        raise ValueError(f"Slide range {slide_range} is outside the presentation ({total} slides)")
+    return sorted(selected)
 
 
 def get_export_service() -> ExportService:
@@ -2,17 +2,44 @@
 导出任务服务
 """
 
+import hashlib
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.export_task import ExportTask
-from app.utils.datetime import utcnow_aware
+from app.config import settings
+from app.models.export_task import BulkExportJob, ExportTask
 from app.models.presentation import Presentation
-from app.services.export_service import get_export_service
+from app.services.export_service import parse_slide_range
+from app.utils.datetime import utcnow_aware
+
+# 进行中的任务状态，可被重复提交复用
+INFLIGHT_STATUSES = ("pending", "processing")
+
+# 卡住的导出任务标记失败时的错误信息
+STALLED_ERROR = "导出超时，任务已终止"
+
+
+def stalled_cutoff() -> datetime:
+    """早于该时间提交且仍未结束的导出任务视为卡住"""
+    return utcnow_aware() - timedelta(minutes=settings.EXPORT_STALLED_MINUTES)
+
+
+def export_dedup_key(ppt: Presentation, format: str, quality: str, slide_range: Optional[str]) -> str:
+    """
+    导出去重键
+    
+    页面范围按实际选中的页面归一化，"1-3" 与 "1,2,3" 视为相同
+    """
+    total = len(ppt.slides or [])
+    indices = parse_slide_range(slide_range, total)
+    pages = "all" if len(indices) == total else ",".join(str(i) for i in indices)
+    raw = f"{ppt.id}:{ppt.version}:{format}:{quality}:{pages}"
+    return hashlib.sha256(raw.encode()).hexdigest()
 
 
 class ExportTaskService:
@@ -30,7 +57,8 @@ class ExportTaskService:
         user_id: UUID,
         ppt_id: UUID,
         format: str,
-        quality: str = "standard"
+        quality: str = "standard",
+        slide_range: Optional[str] = None
     ) -> ExportTask:
         """
         创建导出任务
@@ -40,6 +68,7 @@ class ExportTaskService:
             ppt_id: PPT ID
             format: 导出格式
             quality: 质量
+            slide_range: 页面范围，如 "1-5"；None 或 "all" 表示全部
             
         Returns:
             创建的任务
@@ -49,6 +78,7 @@ class ExportTaskService:
             ppt_id=ppt_id,
             format=format,
             quality=quality,
+            slide_range=slide_range,
             status="pending"
         )
         
@@ -58,6 +88,122 @@ class ExportTaskService:
         
         return task
     
+    async def submit_task(
+        self,
+        user_id: UUID,
+        ppt: Presentation,
+        format: str,
+        quality: str = "standard",
+        slide_range: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> Tuple[ExportTask, bool]:
+        """
+        幂等提交导出任务
+        
+        - 提供幂等键时，同一用户相同的键返回首次提交的任务
+        - 相同 PPT 版本、格式、质量和页面范围的任务仍在进行中时直接复用
+        
+        Args:
+            user_id: 用户 ID
+            ppt: PPT
+            format: 导出格式
+            quality: 质量
+            slide_range: 页面范围
+            idempotency_key: 客户端提供的幂等键
+            
+        Returns:
+            (任务, 是否新建)；新建的任务由调用方派发
+            
+        Raises:
+            ValueError: 幂等键已用于不同的导出请求
+        """
+        dedup_key = export_dedup_key(ppt, format, quality, slide_range)
+        
+        if idempotency_key:
+            existing = await self._find(user_id, ExportTask.idempotency_key == idempotency_key)
+            if existing:
+                if (existing.ppt_id, existing.format, existing.quality, existing.slide_range) != (
+                    ppt.id, format, quality, slide_range
+                ):
+                    raise ValueError("幂等键已用于其他导出请求")
+                return existing, False
+        
+        existing = await self._find_inflight(user_id, dedup_key)
+        if existing:
+            return existing, False
+        
+        # 卡住的相同任务仍占用去重唯一索引，先标记失败再新建
+        await self._expire_stalled(user_id, dedup_key)
+        
+        task = ExportTask(
+            user_id=user_id,
+            ppt_id=ppt.id,
+            format=format,
+            quality=quality,
+            slide_range=slide_range,
+            ppt_version=ppt.version,
+            dedup_key=dedup_key,
+            idempotency_key=idempotency_key,
+            status="pending"
+        )
+        self.db.add(task)
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            # 并发的相同请求已先行创建任务（由唯一索引保证只有一个）
+            await self.db.rollback()
+            existing = None
+            if idempotency_key:
+                existing = await self._find(user_id, ExportTask.idempotency_key == idempotency_key)
+            existing = existing or await self._find_inflight(user_id, dedup_key)
+            if existing is None:
+                raise
+            return existing, False
+        
+        await self.db.refresh(task)
+        return task, True
+    
+    async def _find(self, user_id: UUID, *conditions) -> Optional[ExportTask]:
+        result = await self.db.execute(
+            select(ExportTask)
+            .where(ExportTask.user_id == user_id, *conditions)
+            .order_by(ExportTask.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    async def _find_inflight(self, user_id: UUID, dedup_key: str) -> Optional[ExportTask]:
+        return await self._find(
+            user_id,
+            ExportTask.dedup_key == dedup_key,
+            ExportTask.status.in_(INFLIGHT_STATUSES),
+            ExportTask.created_at >= stalled_cutoff()
+        )
+    
+    async def _expire_stalled(self, user_id: UUID, dedup_key: str) -> None:
+        await self.db.execute(
+            update(ExportTask)
+            .where(
+                ExportTask.user_id == user_id,
+                ExportTask.dedup_key == dedup_key,
+                ExportTask.status.in_(INFLIGHT_STATUSES),
+                ExportTask.created_at < stalled_cutoff()
+            )
+            .values(status="failed", error_message=STALLED_ERROR)
+        )
+    
+    async def mark_failed(self, task: ExportTask, error: str) -> None:
+        """
+        将任务标记为失败
+        
+        Args:
+            task: 导出任务
+            error: 错误信息
+        """
+        task.status = "failed"
+        task.error_message = error[:500]
+        await self.db.commit()
+    
     async def get_task(
         self,
         task_id: UUID,
@@ -81,53 +227,53 @@ class ExportTaskService:
         )
         return result.scalar_one_or_none()
     
-    async def process_task(
+    async def create_bulk_job(
         self,
-        task: ExportTask,
-        presentation: Presentation
-    ) -> None:
+        user_id: UUID,
+        ppt_ids: List[UUID],
+        format: str,
+        quality: str = "standard"
+    ) -> BulkExportJob:
         """
-        处理导出任务
+        创建批量导出任务
         
         Args:
-            task: 导出任务
-            presentation: PPT 数据
+            user_id: 用户 ID
+            ppt_ids: PPT ID 列表（已去重且属于该用户）
+            format: 导出格式
+            quality: 质量
         """
-        export_service = get_export_service()
-        
-        try:
-            task.status = "processing"
-            await self.db.commit()
-            
-            # 执行导出
-            if task.format == "pptx":
-                file_path = await export_service.export_pptx(presentation)
-            elif task.format == "pdf":
-                file_path = await export_service.export_pdf(presentation)
-            elif task.format in ["png", "jpg"]:
-                file_paths = await export_service.export_images(
-                    presentation,
-                    format=task.format
-                )
-                file_path = file_paths[0] if file_paths else None
-            else:
-                raise ValueError(f"不支持的格式: {task.format}")
-            
-            # 更新任务状态
-            task.status = "completed"
-            task.file_path = file_path
-            task.file_size = Path(file_path).stat().st_size if file_path else 0
-            task.completed_at = utcnow_aware()
-            task.expires_at = utcnow_aware() + timedelta(days=1)
-            
-        except Exception as e:
-            task.status = "failed"
-            task.error_message = str(e)
+        job = BulkExportJob(
+            user_id=user_id,
+            ppt_ids=[str(ppt_id) for ppt_id in ppt_ids],
+            format=format,
+            quality=quality,
+            status="pending",
+            total=len(ppt_ids),
+            completed=0,
+            failed=0,
+            errors=[]
+        )
         
+        self.db.add(job)
         await self.db.commit()
-
-
-from pathlib import Path
+        await self.db.refresh(job)
+        
+        return job
+    
+    async def get_bulk_job(
+        self,
+        job_id: UUID,
+        user_id: UUID
+    ) -> Optional[BulkExportJob]:
+        """获取批量导出任务"""
+        result = await self.db.execute(
+            select(BulkExportJob).where(
+                BulkExportJob.id == job_id,
+                BulkExportJob.user_id == user_id
+            )
+        )
+        return result.scalar_one_or_none()
 
 
 def get_export_task_service(db: AsyncSession) -> ExportTaskService:
@@ -13,6 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.operation_history import OperationHistory
 from app.utils.datetime import utcnow_aware
 from app.models.presentation import Presentation
+from app.services.thumbnail_service import retain_thumbnail_keys
 
 
 class OperationHistoryService:
@@ -156,6 +157,9 @@ class OperationHistoryService:
             )
             ppt = ppt_result.scalar_one_or_none()
             if ppt and 'slides' in operation.before_state:
+                ppt.thumbnail_keys = retain_thumbnail_keys(
+                    ppt.thumbnail_keys, ppt.slides, operation.before_state['slides']
+                )
                 ppt.slides = operation.before_state['slides']
                 if 'title' in operation.before_state:
                     ppt.title = operation.before_state['title']
@@ -211,6 +215,9 @@ class OperationHistoryService:
             )
             ppt = ppt_result.scalar_one_or_none()
             if ppt and 'slides' in operation.after_state:
+                ppt.thumbnail_keys = retain_thumbnail_keys(
+                    ppt.thumbnail_keys, ppt.slides, operation.after_state['slides']
+                )
                 ppt.slides = operation.after_state['slides']
                 if 'title' in operation.after_state:
                     ppt.title = operation.after_state['title']
@@ -69,7 +69,8 @@ class PPTGenerationService:
                 "num_slides": request.num_slides,
                 "language": request.language,
                 "style": request.style,
-                "template_id": request.template_id
+                "template_id": request.template_id,
+                "enrich_content": request.enrich_content
             },
             status="pending"
         )
@@ -3,7 +3,7 @@ PPT 管理服务
 处理 PPT 的 CRUD 和单页编辑
 """
 
-from typing import List, Optional
+from typing import List, Optional, Set
 from uuid import UUID
 
 from sqlalchemy import select, update
@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.presentation import Presentation
 from app.schemas.presentation import PresentationCreate, PresentationUpdate, Slide, SlideUpdate
+from app.services.thumbnail_service import retain_thumbnail_keys
 
 
 class PPTService:
@@ -81,6 +82,29 @@ class PPTService:
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
     
+    async def get_owned_ids(
+        self,
+        ppt_ids: List[UUID],
+        user_id: UUID
+    ) -> Set[UUID]:
+        """
+        筛选属于用户的 PPT ID（只查询 ID，不加载内容）
+        
+        Args:
+            ppt_ids: PPT ID 列表
+            user_id: 用户 ID
+            
+        Returns:
+            存在且属于该用户的 PPT ID 集合
+        """
+        result = await self.db.execute(
+            select(Presentation.id).where(
+                Presentation.id.in_(ppt_ids),
+                Presentation.user_id == user_id
+            )
+        )
+        return set(result.scalars().all())
+    
     async def get_by_user(
         self,
         user_id: UUID,
@@ -136,9 +160,10 @@ class PPTService:
         # 更新字段
         update_data = data.model_dump(exclude_unset=True)
         
-        # 如果有 slides 更新，版本号 +1
+        # 如果有 slides 更新，版本号 +1，修改过的页面缩略图待重新生成
         if 'slides' in update_data:
             ppt.version += 1
+            ppt.thumbnail_keys = retain_thumbnail_keys(ppt.thumbnail_keys, ppt.slides, update_data['slides'])
         
         for field, value in update_data.items():
             setattr(ppt, field, value)
@@ -245,6 +270,7 @@ class PPTService:
         slides = copy.deepcopy(list(ppt.slides))
         updated_slide = deep_merge(slides[slide_index], update_data)
         slides[slide_index] = updated_slide
+        ppt.thumbnail_keys = retain_thumbnail_keys(ppt.thumbnail_keys, ppt.slides, slides)
         ppt.slides = slides  # 赋值新列表，触发 SQLAlchemy 变更检测
         
         # 版本号 +1
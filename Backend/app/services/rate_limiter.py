@@ -0,0 +1,177 @@
+"""
+Outbound AI call limiter
+
+- provider_slot: caps concurrent requests per AI provider within one
+  event loop. That is a per-worker cap only with CELERY_ASYNC_WORKER
+  (one persistent loop per process); prefork tasks each run their own
+  loop, so there it bounds a single task's fan-out, not the worker
+- RateLimiter: Redis token bucket per (provider, API key) shared by all
+  Celery workers, with AIMD rate adaptation on 429/5xx responses
+"""
+
+import asyncio
+import hashlib
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from app.config import settings
+from app.utils import redis_client
+from app.utils.redis_client import REDIS_ERRORS
+
+# Semaphores are bound to an event loop; Celery tasks create a loop per run
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# Reserve one token; returns the seconds to wait before using it.
+# The bucket may go into debt so concurrent callers queue in order.
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate')
+local rate = tonumber(state[3]) or tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate) - 1
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now, 'rate', rate)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+if tokens >= 0 then
+    return '0'
+end
+return tostring(-tokens / rate)
+"""
+
+# AIMD: additive increase on success, multiplicative decrease on
+# throttling, at most one decrease per cooldown window
+_FEEDBACK_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'rate', 'cut_ts')
+local rate = tonumber(state[1]) or tonumber(ARGV[2])
+if ARGV[1] == '1' then
+    rate = math.min(tonumber(ARGV[5]), rate + tonumber(ARGV[3]))
+else
+    if now - (tonumber(state[2]) or 0) < tonumber(ARGV[7]) then
+        return tostring(rate)
+    end
+    rate = math.max(tonumber(ARGV[6]), rate * tonumber(ARGV[4]))
+    redis.call('HSET', KEYS[1], 'cut_ts', now)
+end
+redis.call('HSET', KEYS[1], 'rate', rate)
+redis.call('EXPIRE', KEYS[1], ARGV[8])
+return tostring(rate)
+"""
+
+_BUCKET_TTL = 3600
+
+
+@asynccontextmanager
+async def provider_slot(provider: str) -> AsyncIterator[None]:
+    """
+    Hold one concurrency slot for an outbound call to provider
+
+    Slots are per event loop (see module docstring); the limit shared
+    across workers is the RateLimiter token bucket.
+
+    Usage:
+        async with provider_slot("yunwu"):
+            await provider.generate_image(prompt)
+    """
+    per_loop = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    semaphore = per_loop.get(provider)
+    if semaphore is None:
+        semaphore = per_loop[provider] = asyncio.Semaphore(settings.AI_PROVIDER_CONCURRENCY)
+    async with semaphore:
+        yield
+
+
+def _mark_redis_down(exc: Exception) -> None:
+    redis_client.mark_redis_down("RateLimiter", "limiting disabled", exc)
+
+
+class CallOutcome:
+    """Result of a limited call, reported back for rate adaptation"""
+
+    def __init__(self):
+        self.status_code: Optional[int] = None
+
+
+class RateLimiter:
+    """
+    Token bucket for one (provider, API key), shared across workers
+
+    The bucket rate starts at AI_RATE_LIMIT_PER_SECOND and adapts AIMD-style:
+    every success adds AI_RATE_INCREASE, a 429/5xx multiplies it by
+    AI_RATE_DECREASE_FACTOR. If Redis is unreachable calls are not rate
+    limited (provider_slot still caps concurrency).
+
+    Usage:
+        async with limiter.call() as outcome:
+            response = await client.post(...)
+            outcome.status_code = response.status_code
+    """
+
+    def __init__(self, provider: str, api_key: str):
+        digest = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        self.bucket_key = f"ai_rate:{provider}:{digest}"
+
+    async def acquire(self) -> None:
+        """Wait until the bucket grants a request"""
+        client = redis_client.get_redis()
+        if client is None:
+            return
+        try:
+            wait = float(await client.eval(
+                _ACQUIRE_SCRIPT, 1, self.bucket_key,
+                settings.AI_RATE_LIMIT_PER_SECOND,
+                settings.AI_RATE_LIMIT_BURST,
+                _BUCKET_TTL
+            ))
+        except REDIS_ERRORS as e:
+            _mark_redis_down(e)
+            return
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def feedback(self, status_code: Optional[int]) -> None:
+        """Adapt the bucket rate to a response status"""
+        throttled = status_code is not None and (status_code == 429 or status_code >= 500)
+        client = redis_client.get_redis()
+        if client is None:
+            return
+        try:
+            rate = await client.eval(
+                _FEEDBACK_SCRIPT, 1, self.bucket_key,
+                "0" if throttled else "1",
+                settings.AI_RATE_LIMIT_PER_SECOND,
+                settings.AI_RATE_INCREASE,
+                settings.AI_RATE_DECREASE_FACTOR,
+                settings.AI_RATE_LIMIT_MAX,
+                settings.AI_RATE_LIMIT_MIN,
+                settings.AI_RATE_DECREASE_COOLDOWN,
+                _BUCKET_TTL
+            )
+        except REDIS_ERRORS as e:
+            _mark_redis_down(e)
+            return
+        if throttled:
+            print(f"[RateLimiter] {self.bucket_key} got {status_code}, rate -> {float(rate):.2f}/s")
+
+    @asynccontextmanager
+    async def call(self) -> AsyncIterator[CallOutcome]:
+        """Acquire a token, run the call and report its outcome"""
+        await self.acquire()
+        outcome = CallOutcome()
+        try:
+            yield outcome
+        except Exception as e:
+            # openai.APIStatusError and httpx.HTTPStatusError carry the status
+            status_code = getattr(e, "status_code", None)
+            if status_code is None and getattr(e, "response", None) is not None:
+                status_code = getattr(e.response, "status_code", None)
+            if status_code is not None:
+                await self.feedback(status_code)
+            raise
+        await self.feedback(outcome.status_code)
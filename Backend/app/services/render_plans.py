@@ -0,0 +1,633 @@
+"""
+Declarative slide render plans
+
+Each layout type is a table of boxes, fonts and colors. A plan is compiled
+once per (layout, theme colors, background image) into shape operations
+with ready EMU offsets, Pt sizes and RGBColor objects; rendering a slide
+just walks the compiled operations. A new layout type is a new LAYOUTS
+entry, not a new method.
+
+Coordinates are inches on the 13.333 x 7.5 slide. Inside a Repeat they are
+relative to the item's slot, and SlotWidth(offset) stands for the slot
+width plus offset.
+
+Themes are resolved once per theme content hash (resolve_theme) into ready
+colors, fonts and background, shared by every slide and export of a deck.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from lxml import etree
+from pptx.dml.color import RGBColor
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.enum.text import PP_ALIGN
+from pptx.oxml.ns import qn
+from pptx.util import Inches, Pt
+
+
+@dataclass(frozen=True)
+class SlotWidth:
+    """Slot width plus offset (inches), for coordinates inside a Repeat"""
+    offset: float = 0.0
+
+
+Coord = Union[float, SlotWidth]
+Box = Tuple[Coord, Coord, Coord, Coord]
+
+
+@dataclass(frozen=True)
+class Text:
+    """
+    Text box
+
+    field: Content key ("left.title" for nested), item key inside a Repeat,
+           or None for the Repeat item itself / a literal template
+    template: Format string; {} is the value, {n} the 1-based item number
+    color: Color role, see _resolve_color
+    """
+    box: Box
+    field: Optional[str]
+    size: int
+    color: str = "text"
+    bold: bool = False
+    align: str = "left"
+    template: str = "{}"
+    skip_empty: bool = False
+    when: Optional[str] = None
+    unless: Optional[str] = None
+    not_last: bool = False
+
+
+@dataclass(frozen=True)
+class Shape:
+    """Autoshape with solid fill; line=None hides the outline"""
+    kind: MSO_SHAPE
+    box: Box
+    fill: str
+    line: Optional[str] = None
+    alpha: Optional[float] = None  # fill opacity 0-1
+    text: Optional[Text] = None  # text inside the shape (box ignored)
+    when: Optional[str] = None
+    unless: Optional[str] = None
+    not_last: bool = False
+    image_only: bool = False  # only drawn over a background image
+
+
+@dataclass(frozen=True)
+class Picture:
+    """Slide picture, or placeholder when there is no image"""
+    box: Box
+    placeholder: Shape
+
+
+@dataclass(frozen=True)
+class Stack:
+    """Slots stacked vertically: (x, y + i * dy), fixed width"""
+    x: float
+    y: float
+    dy: float
+    width: float = 0.0
+
+    def slots(self, count: int) -> List[Tuple[float, float, float]]:
+        return [(self.x, self.y + i * self.dy, self.width) for i in range(count)]
+
+
+@dataclass(frozen=True)
+class Spread:
+    """
+    Slots spread horizontally over span
+
+    points=True places items on span's end points (timeline), otherwise
+    span is divided into equal slots (process, stats)
+    """
+    x: float
+    span: float
+    points: bool = False
+
+    def slots(self, count: int) -> List[Tuple[float, float, float]]:
+        step = self.span / max(count - 1, 1) if self.points else self.span / max(count, 1)
+        return [(self.x + i * step, 0.0, step) for i in range(count)]
+
+
+@dataclass(frozen=True)
+class Cells:
+    """Fixed slot positions"""
+    positions: Tuple[Tuple[float, float], ...]
+    width: float = 0.0
+
+    def slots(self, count: int) -> List[Tuple[float, float, float]]:
+        return [(x, y, self.width) for x, y in self.positions[:count]]
+
+
+@dataclass(frozen=True)
+class Repeat:
+    """Elements repeated for each item of a content list"""
+    field: str
+    limit: int
+    layout: Union[Stack, Spread, Cells]
+    elements: Tuple[Union[Text, Shape], ...]
+    when: Optional[str] = None
+    unless: Optional[str] = None
+
+
+Element = Union[Text, Shape, Picture, Repeat]
+
+SLIDE_BOX = (0, 0, 13.333, 7.5)
+TITLE = Text((0.5, 0.4, 12.333, 1), "title", 40, color="primary", bold=True)
+OVERLAY = Shape(MSO_SHAPE.RECTANGLE, SLIDE_BOX, fill="black", alpha=0.6, image_only=True)
+
+
+def _column(x: float, side: str) -> Tuple[Element, ...]:
+    return (
+        Text((x, 1.4, 5.9, 0.6), f"{side}.title", 28, color="primary", bold=True, skip_empty=True),
+        Repeat(f"{side}.points", 5, Stack(x, 2.2, 0.6), (
+            Text((0, 0, 5.9, 0.6), None, 20, template="• {}"),
+        )),
+    )
+
+
+LAYOUTS: Dict[str, Tuple[Element, ...]] = {
+    "title": (
+        OVERLAY,
+        Text((0.5, 2.5, 12.333, 1.5), "title", 54, color="heading", bold=True, align="center"),
+        Text((0.5, 4.2, 12.333, 1), "subtitle", 28, color="subheading", align="center", skip_empty=True),
+    ),
+    "section": (
+        OVERLAY,
+        Text((0.5, 2.8, 12.333, 1.5), "title", 48, color="heading", bold=True, align="center"),
+        Text((0.5, 4.3, 12.333, 1), "description", 24, color="subheading", align="center", skip_empty=True),
+    ),
+    "content": (
+        TITLE,
+        Repeat("bullets", 0, Stack(0.5, 1.5, 0.7), (
+            Text((0, 0, 12.333, 0.8), None, 22, template="• {}"),
+        )),
+        Text((0.5, 1.5, 12.333, 5.5), "text", 22, skip_empty=True, unless="bullets"),
+    ),
+    "two-column": (TITLE,) + _column(0.5, "left") + _column(6.9, "right"),
+    "timeline": (
+        TITLE,
+        Repeat("events", 5, Spread(0.5, 12.0, points=True), (
+            Shape(MSO_SHAPE.OVAL, (-0.15, 3.85, 0.3, 0.3), fill="primary"),
+            Text((-0.8, 4.3, 1.6, 0.5), "year", 16, color="primary", bold=True, align="center"),
+            Text((-0.8, 4.8, 1.6, 0.6), "title", 14, bold=True, align="center"),
+            Text((-0.8, 5.3, 1.6, 1.5), "description", 12, align="center"),
+        )),
+    ),
+    "process": (
+        TITLE,
+        Repeat("steps", 6, Spread(0.5, 12.0), (
+            Shape(MSO_SHAPE.ROUNDED_RECTANGLE, (0, 3, SlotWidth(-0.3), 1.5), fill="primary",
+                  text=Text(SLIDE_BOX, None, 16, color="white", bold=True, align="center")),
+            Text((0, 2.3, SlotWidth(-0.3), 0.5), None, 14, align="center", template="Step {n}"),
+            Text((SlotWidth(-0.25), 3.5, 0.2, 0.5), None, 24, color="primary", align="center",
+                 template="→", not_last=True),
+        )),
+    ),
+    "grid": (
+        TITLE,
+        Repeat("items", 4, Cells(((0.5, 1.5), (6.9, 1.5), (0.5, 4.2), (6.9, 4.2))), (
+            Shape(MSO_SHAPE.ROUNDED_RECTANGLE, (0, 0, 5.9, 2.5), fill="panel", line="primary"),
+            Text((0.2, 0.2, 5.5, 0.6), "title", 24, color="primary", bold=True),
+            Text((0.2, 0.9, 5.5, 1.5), "description", 16),
+        )),
+    ),
+    "comparison": (
+        TITLE,
+        Text((0.5, 1.5, 4, 0.6), None, 20, color="primary", bold=True, template="Item", when="items"),
+        Text((4.5, 1.5, 4.1, 0.6), None, 20, color="primary", bold=True, template="Option A", when="items"),
+        Text((8.6, 1.5, 4.1, 0.6), None, 20, color="primary", bold=True, template="Option B", when="items"),
+        Shape(MSO_SHAPE.RECTANGLE, (0.5, 2.1, 12.333, 0.02), fill="primary", when="items"),
+        Repeat("items", 6, Stack(0.5, 2.3, 0.6), (
+            Text((0, 0, 4, 0.5), "name", 18),
+            Text((4, 0, 4.1, 0.5), "valueA", 18),
+            Text((8.1, 0, 4.1, 0.5), "valueB", 18),
+        )),
+    ),
+    "data": (
+        TITLE,
+        Repeat("stats", 4, Spread(0.5, 12.333), (
+            Text((0, 2.5, SlotWidth(), 1.5), "value", 60, color="primary", bold=True, align="center"),
+            Text((0, 4.2, SlotWidth(), 0.8), "label", 20, align="center"),
+        )),
+    ),
+    "quote": (
+        Text((0.5, 1.5, 1, 1), None, 120, color="primary", align="center", template='"'),
+        Text((1.5, 2, 10.333, 2.5), "quote", 32, align="center"),
+        Text((0.5, 4.8, 12.333, 0.8), "author", 24, color="primary", align="center",
+             template="- {}", skip_empty=True),
+        Text((0.5, 5.5, 12.333, 0.6), "title", 18, align="center", skip_empty=True),
+    ),
+    "image-text": (
+        TITLE,
+        Picture((0.5, 1.5, 5.9, 5.5), Shape(
+            MSO_SHAPE.ROUNDED_RECTANGLE, (0.5, 1.5, 5.9, 5.5), fill="placeholder", line="primary",
+            text=Text(SLIDE_BOX, None, 18, color="muted", align="center", template="[Image Placeholder]")
+        )),
+        Text((6.9, 1.5, 5.9, 5.5), "text", 22),
+    ),
+}
+
+_FIXED_COLORS = {
+    "white": (255, 255, 255),
+    "light": (240, 240, 240),
+    "black": (0, 0, 0),
+    "panel": (245, 245, 245),
+    "placeholder": (230, 230, 230),
+    "muted": (150, 150, 150),
+}
+
+_ALIGN = {"left": PP_ALIGN.LEFT, "center": PP_ALIGN.CENTER}
+
+
+# ---------------------------------------------------------------------------
+# Themes
+# ---------------------------------------------------------------------------
+
+DEFAULT_PRIMARY = "#1a365d"
+DEFAULT_TEXT = "#1a202c"
+DEFAULT_BACKGROUND = "#ffffff"
+
+_THEME_CACHE_SIZE = 128
+_themes: "OrderedDict[str, Theme]" = OrderedDict()
+_themes_lock = Lock()
+
+
+@dataclass(frozen=True, eq=False)
+class Theme:
+    """
+    Resolved slide theme
+
+    Compared and hashed by identity: resolve_theme returns the same object
+    for the same theme content, so compiled plans are cached per theme.
+
+    Attributes:
+        key: Content hash of the theme dict
+        primary, text, background: Theme colors
+        font: Font family for all text, or None for the default
+    """
+    key: str
+    primary: RGBColor
+    text: RGBColor
+    background: RGBColor
+    font: Optional[str]
+
+
+def resolve_theme(theme: Optional[Dict[str, Any]]) -> Theme:
+    """
+    Resolve a slide's theme dict, memoized by content hash
+
+    Accepts both background_color and the template field background.
+    Invalid colors fall back to the defaults.
+    """
+    theme = theme if isinstance(theme, dict) else {}
+    key = hashlib.sha1(
+        json.dumps(theme, sort_keys=True, ensure_ascii=False, default=str).encode()
+    ).hexdigest()
+
+    with _themes_lock:
+        resolved = _themes.get(key)
+        if resolved is not None:
+            _themes.move_to_end(key)
+            return resolved
+
+    resolved = Theme(
+        key=key,
+        primary=_parse_color(theme.get("primary_color"), DEFAULT_PRIMARY),
+        text=_parse_color(theme.get("text_color"), DEFAULT_TEXT),
+        background=_parse_color(
+            theme.get("background_color") or theme.get("background"), DEFAULT_BACKGROUND
+        ),
+        font=theme.get("font_family") or None,
+    )
+
+    with _themes_lock:
+        # Another thread may have resolved it meanwhile; keep one object
+        resolved = _themes.setdefault(key, resolved)
+        if len(_themes) > _THEME_CACHE_SIZE:
+            _themes.popitem(last=False)
+    return resolved
+
+
+def _parse_color(value: Any, default: str) -> RGBColor:
+    """Parse #rgb / #rrggbb"""
+    for candidate in (value, default):
+        if not isinstance(candidate, str):
+            continue
+        hex_color = candidate.strip().lstrip("#")
+        if len(hex_color) == 3:
+            hex_color = "".join(c * 2 for c in hex_color)
+        try:
+            return RGBColor.from_string(hex_color.upper())
+        except ValueError:
+            continue
+    return RGBColor.from_string(default.lstrip("#"))
+
+
+# ---------------------------------------------------------------------------
+# Compilation: plan + theme -> operations with resolved units and colors
+# ---------------------------------------------------------------------------
+
+# Compiled coordinate: EMU int, or ("slot", offset EMU)
+_CCoord = Union[int, Tuple[str, int]]
+
+
+@dataclass(frozen=True)
+class TextOp:
+    """Compiled Text: EMU box, Pt size, resolved color and font"""
+    box: Tuple[_CCoord, ...]
+    field: Optional[Tuple[str, ...]]
+    size: Any
+    color: RGBColor
+    font: Optional[str]
+    bold: bool
+    align: Any
+    template: str
+    skip_empty: bool
+    when: Optional[Tuple[str, ...]]
+    unless: Optional[Tuple[str, ...]]
+    not_last: bool
+
+
+@dataclass(frozen=True)
+class ShapeOp:
+    """Compiled Shape; alpha in 1/100000"""
+    kind: MSO_SHAPE
+    box: Tuple[_CCoord, ...]
+    fill: RGBColor
+    line: Optional[RGBColor]
+    alpha: Optional[int]
+    text: Optional[TextOp]
+    when: Optional[Tuple[str, ...]]
+    unless: Optional[Tuple[str, ...]]
+    not_last: bool
+
+
+@dataclass(frozen=True)
+class PictureOp:
+    """Compiled Picture with its placeholder shape"""
+    box: Tuple[int, ...]
+    placeholder: ShapeOp
+    when: Optional[Tuple[str, ...]] = None
+    unless: Optional[Tuple[str, ...]] = None
+
+
+@dataclass(frozen=True)
+class _CRepeat:
+    field: Tuple[str, ...]
+    limit: int
+    layout: Union[Stack, Spread, Cells]
+    elements: Tuple[Union[TextOp, ShapeOp], ...]
+    when: Optional[Tuple[str, ...]]
+    unless: Optional[Tuple[str, ...]]
+
+
+def _path(field: Optional[str]) -> Optional[Tuple[str, ...]]:
+    return tuple(field.split(".")) if field else None
+
+
+def _coord(value: Coord) -> _CCoord:
+    if isinstance(value, SlotWidth):
+        return ("slot", Inches(value.offset))
+    return Inches(value)
+
+
+def _resolve_color(role: str, theme: Theme, has_image: bool) -> RGBColor:
+    """
+    Color roles: primary / text from the theme; heading / subheading
+    switch to white / light grey over a background image
+    """
+    if role == "heading":
+        role = "white" if has_image else "primary"
+    elif role == "subheading":
+        role = "light" if has_image else "text"
+    if role == "primary":
+        return theme.primary
+    if role == "text":
+        return theme.text
+    return RGBColor(*_FIXED_COLORS[role])
+
+
+@lru_cache(maxsize=256)
+def compile_plan(layout: str, theme: Theme, has_image: bool) -> Tuple[Any, ...]:
+    """
+    Compile a layout for a theme and background image presence
+
+    Unknown layouts fall back to "content". Cached, so every slide of a
+    deck with the same theme shares one compiled plan.
+    """
+    elements = LAYOUTS.get(layout, LAYOUTS["content"])
+
+    def color(role: str) -> RGBColor:
+        return _resolve_color(role, theme, has_image)
+
+    def compile_text(e: Text) -> TextOp:
+        return TextOp(
+            tuple(_coord(c) for c in e.box), _path(e.field), Pt(e.size), color(e.color), theme.font, e.bold,
+            _ALIGN[e.align], e.template, e.skip_empty, _path(e.when), _path(e.unless), e.not_last
+        )
+
+    def compile_shape(e: Shape) -> ShapeOp:
+        return ShapeOp(
+            e.kind, tuple(_coord(c) for c in e.box), color(e.fill),
+            color(e.line) if e.line else None,
+            int(e.alpha * 100000) if e.alpha is not None else None,
+            compile_text(e.text) if e.text else None,
+            _path(e.when), _path(e.unless), e.not_last
+        )
+
+    def compile_element(e: Element):
+        if isinstance(e, Text):
+            return compile_text(e)
+        if isinstance(e, Shape):
+            return compile_shape(e)
+        if isinstance(e, Picture):
+            return PictureOp(tuple(Inches(c) for c in e.box), compile_shape(e.placeholder))
+        return _CRepeat(
+            _path(e.field), e.limit, e.layout, tuple(compile_element(c) for c in e.elements),
+            _path(e.when), _path(e.unless)
+        )
+
+    return tuple(
+        compile_element(e) for e in elements
+        if not (isinstance(e, Shape) and e.image_only and not has_image)
+    )
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def render_slide(slide, layout: str, content: Dict[str, Any], theme: Theme,
+                 has_image: bool = False, picture=None) -> None:
+    """
+    Draw a slide's layout
+
+    Args:
+        slide: python-pptx slide
+        layout: Layout type
+        content: Slide content dict
+        theme: Resolved theme (see resolve_theme)
+        has_image: Whether the slide has a background image
+        picture: Image stream for Picture elements, or None
+    """
+    for op, box, value in layout_ops(layout, content, theme, has_image):
+        if isinstance(op, PictureOp):
+            _render_picture(slide, op, picture, value)
+        elif isinstance(op, ShapeOp):
+            _add_shape(slide, op, box, value)
+        else:
+            _add_text(slide, op, box, value)
+
+
+def layout_ops(layout: str, content: Dict[str, Any], theme: Theme,
+               has_image: bool = False) -> Iterator[Tuple[Any, Tuple[int, int, int, int], Optional[str]]]:
+    """
+    Walk a slide's compiled plan
+
+    Yields (op, box, text) in drawing order, with repeats expanded and
+    hidden elements skipped: op is a compiled text, shape or picture, box
+    is (left, top, width, height) in EMU and text is the text to draw
+    (None for shapes without text; for pictures, the placeholder's text).
+    Renderers other than python-pptx (e.g. thumbnails) draw the same
+    operations.
+    """
+    for op in compile_plan(layout, theme, has_image):
+        if not _visible(op, content):
+            continue
+        if isinstance(op, _CRepeat):
+            yield from _repeat_ops(op, content)
+        elif isinstance(op, PictureOp):
+            yield op, op.box, _shape_text(op.placeholder, None, 0)
+        elif isinstance(op, ShapeOp):
+            yield op, _place(op.box, 0, 0, 0), _shape_text(op, None, 0)
+        else:
+            value = _field_text(op, content)
+            if value is not None:
+                yield op, _place(op.box, 0, 0, 0), value
+
+
+def _get(data: Any, path: Sequence[str]) -> Any:
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _visible(op, content: Dict[str, Any]) -> bool:
+    if op.when and not _get(content, op.when):
+        return False
+    if op.unless and _get(content, op.unless):
+        return False
+    return True
+
+
+def _format(template: str, value: Any, n: int = 0) -> str:
+    return template.format("" if value is None else value, n=n)
+
+
+def _field_text(op: TextOp, content: Dict[str, Any]) -> Optional[str]:
+    value = _get(content, op.field) if op.field else None
+    if op.skip_empty and not value:
+        return None
+    return _format(op.template, value)
+
+
+def _item_text(op: TextOp, item: Any, n: int) -> Optional[str]:
+    if op.field is None:
+        value = item
+    else:
+        value = item.get(op.field[0]) if isinstance(item, dict) else None
+    if op.skip_empty and not value:
+        return None
+    return _format(op.template, value, n)
+
+
+def _repeat_ops(op: _CRepeat, content: Dict[str, Any]):
+    items = _get(content, op.field)
+    if not isinstance(items, list) or not items:
+        return
+    if op.limit:
+        items = items[:op.limit]
+
+    slots = op.layout.slots(len(items))
+    last = len(slots) - 1
+    for i, (item, (x, y, width)) in enumerate(zip(items, slots)):
+        x, y, width = Inches(x), Inches(y), Inches(width)
+        for child in op.elements:
+            if child.not_last and i == last:
+                continue
+            box = _place(child.box, x, y, width)
+            if isinstance(child, ShapeOp):
+                yield child, box, _shape_text(child, item, i + 1)
+            else:
+                value = _item_text(child, item, i + 1)
+                if value is not None:
+                    yield child, box, value
+
+
+def _shape_text(op: ShapeOp, item: Any, n: int) -> Optional[str]:
+    return _item_text(op.text, item, n) if op.text is not None else None
+
+
+def _place(box: Tuple[_CCoord, ...], x: int, y: int, width: int) -> Tuple[int, int, int, int]:
+    left, top, w, h = (width + c[1] if isinstance(c, tuple) else c for c in box)
+    return left + x, top + y, w, h
+
+
+def _add_text(slide, op: TextOp, box: Tuple[int, int, int, int], value: str) -> None:
+    shape = slide.shapes.add_textbox(*box)
+    _fill_text_frame(shape.text_frame, op, value)
+
+
+def _fill_text_frame(tf, op: TextOp, value: str) -> None:
+    tf.word_wrap = True
+    p = tf.paragraphs[0]
+    p.alignment = op.align
+    run = p.add_run()
+    run.text = value
+    run.font.size = op.size
+    run.font.bold = op.bold
+    run.font.color.rgb = op.color
+    if op.font:
+        _set_font(run, op.font)
+
+
+def _set_font(run, font: str) -> None:
+    """Set the Latin and East Asian typeface (python-pptx only sets Latin)"""
+    run.font.name = font
+    latin = run._r.get_or_add_rPr().find(qn("a:latin"))
+    latin.addnext(latin.makeelement(qn("a:ea"), {"typeface": font}))
+
+
+def _add_shape(slide, op: ShapeOp, box: Tuple[int, int, int, int], value: Optional[str]) -> None:
+    shape = slide.shapes.add_shape(op.kind, *box)
+    shape.fill.solid()
+    shape.fill.fore_color.rgb = op.fill
+    if op.alpha is not None:
+        color = shape.fill._xPr.find(qn("a:solidFill"))[0]
+        etree.SubElement(color, qn("a:alpha")).set("val", str(op.alpha))
+    if op.line is None:
+        shape.line.fill.background()
+    else:
+        shape.line.color.rgb = op.line
+    if value is not None:
+        _fill_text_frame(shape.text_frame, op.text, value)
+
+
+def _render_picture(slide, op: PictureOp, picture, placeholder_text: Optional[str]) -> None:
+    if picture is not None:
+        left, top, width, _ = op.box
+        try:
+            slide.shapes.add_picture(picture, left, top, width=width)
+            return
+        except Exception as e:
+            print(f"[Export] Failed to add image: {e}")
+    _add_shape(slide, op.placeholder, _place(op.placeholder.box, 0, 0, 0), placeholder_text)
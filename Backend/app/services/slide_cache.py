@@ -0,0 +1,154 @@
+"""
+Rendered slide cache for incremental PPTX export
+
+A rendered slide is stored as its <p:cSld> XML plus the image blobs its
+pictures reference, keyed by (slide id, slide content hash, theme hash,
+quality). Re-exporting a deck after a small edit copies unchanged slides
+from the cache instead of fetching their images and rendering them again.
+
+Entries live under STORAGE_LOCAL_PATH/slide_cache so every render process
+and export worker sharing the volume reuses them. Media is stored once per
+SHA1. Entries unused for EXPORT_SLIDE_CACHE_TTL_HOURS are pruned by the
+export cleanup task.
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from lxml import etree
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
+
+from app.config import settings
+from app.services.render_plans import resolve_theme
+
+# Bump when rendering output changes so stale slides are not reused
+RENDER_VERSION = 1
+
+
+@dataclass
+class SlideFragment:
+    """A cached slide: cSld XML and image blobs by relationship id"""
+    xml: bytes
+    images: Dict[str, bytes]
+
+
+def slide_cache_key(slide_data: Dict[str, Any], quality: str) -> str:
+    """Cache key for a slide dict rendered at an export quality"""
+    style = slide_data.get('style') or {}
+    theme_key = resolve_theme(style.get('theme')).key
+    content_hash = hashlib.sha256(
+        json.dumps(slide_data, sort_keys=True, ensure_ascii=False, default=str).encode()
+    ).hexdigest()
+    raw = f"{RENDER_VERSION}:{slide_data.get('id') or ''}:{content_hash}:{theme_key}:{quality}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def capture_slide(slide) -> SlideFragment:
+    """Snapshot a rendered python-pptx slide"""
+    csld = slide._element.cSld
+    images: Dict[str, bytes] = {}
+    for blip in csld.iter(qn("a:blip")):
+        rId = blip.get(qn("r:embed"))
+        if rId and rId not in images:
+            images[rId] = slide.part.related_part(rId).blob
+    return SlideFragment(etree.tostring(csld), images)
+
+
+def apply_fragment(slide, fragment: SlideFragment) -> None:
+    """Replace a blank slide's content with a cached fragment"""
+    csld = parse_xml(fragment.xml)
+    rIds = {}
+    for old_rId, blob in fragment.images.items():
+        _, rIds[old_rId] = slide.part.get_or_add_image_part(BytesIO(blob))
+    for blip in csld.iter(qn("a:blip")):
+        old_rId = blip.get(qn("r:embed"))
+        if old_rId in rIds:
+            blip.set(qn("r:embed"), rIds[old_rId])
+    slide._element.replace(slide._element.cSld, csld)
+
+
+class SlideCache:
+    """
+    On-disk slide fragment store
+
+    Layout:
+        <root>/<key[:2]>/<key>.json  {"xml": ..., "images": {rId: sha1}}
+        <root>/media/<sha1>          image blobs
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = root or Path(settings.STORAGE_LOCAL_PATH) / "slide_cache"
+        self.media = self.root / "media"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def load(self, key: str) -> Optional[SlideFragment]:
+        """Load a fragment, or None if missing or incomplete"""
+        path = self._entry_path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            images = {}
+            for rId, sha1 in entry["images"].items():
+                media_path = self.media / sha1
+                images[rId] = media_path.read_bytes()
+                os.utime(media_path)
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return SlideFragment(entry["xml"].encode(), images)
+
+    def load_many(self, keys: List[str]) -> Dict[int, SlideFragment]:
+        """Load fragments for a list of keys; returns {index: fragment} for hits"""
+        fragments = {}
+        for index, key in enumerate(keys):
+            fragment = self.load(key)
+            if fragment is not None:
+                fragments[index] = fragment
+        return fragments
+
+    def store(self, key: str, slide) -> None:
+        """Capture and store a rendered slide"""
+        fragment = capture_slide(slide)
+        media = {}
+        for rId, blob in fragment.images.items():
+            sha1 = hashlib.sha1(blob).hexdigest()
+            media_path = self.media / sha1
+            if media_path.exists():
+                os.utime(media_path)
+            else:
+                write_atomic(media_path, blob)
+            media[rId] = sha1
+        entry = {"xml": fragment.xml.decode(), "images": media}
+        write_atomic(self._entry_path(key), json.dumps(entry).encode())
+
+    def prune(self, max_age_hours: int) -> int:
+        """Delete entries and media unused for max_age_hours; returns the count"""
+        if not self.root.exists():
+            return 0
+        cutoff = time.time() - max_age_hours * 3600
+        deleted = 0
+        for path in self.root.glob("*/*"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    deleted += 1
+            except OSError:
+                continue
+        return deleted
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write a file so concurrent readers never see it half written"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
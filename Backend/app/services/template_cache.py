@@ -0,0 +1,142 @@
+"""
+Template catalog cache
+
+The template gallery is read on every page view but only changes when
+templates are written. Serialized responses are cached in two tiers:
+
+- in-process: per API worker for TEMPLATE_CACHE_LOCAL_TTL seconds, no I/O
+- Redis: shared by all API workers for TEMPLATE_CACHE_TTL seconds
+
+Shared entries live in a hash named after a generation counter kept in
+Redis. invalidate() clears the local tier and increments the counter, so
+the writing worker sees its change at once and other workers within
+TEMPLATE_CACHE_LOCAL_TTL; superseded hashes expire on their own. A load
+that started before an invalidation stores its result under the old
+generation, where no reader looks. Without Redis the cache falls back to
+the local tier. Each entry carries an ETag (hash of the body) for
+conditional GETs.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Tuple
+
+from app.config import settings
+from app.utils import redis_client
+from app.utils.redis_client import REDIS_ERRORS
+
+_REDIS_KEY = "templates:catalog"
+_GENERATION_KEY = "templates:catalog:generation"
+_LOCAL_CACHE_SIZE = 256
+
+_local: "OrderedDict[str, Tuple[float, CachedBody]]" = OrderedDict()
+# Bumped by invalidate(); a load that started before in this process is not kept locally
+_generation = 0
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    """Serialized JSON response body and its ETag"""
+    body: bytes
+    etag: str
+
+    @classmethod
+    def of(cls, body: bytes) -> "CachedBody":
+        return cls(body, f'"{hashlib.sha1(body).hexdigest()}"')
+
+
+async def get_or_load(key: str, loader: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[CachedBody]:
+    """
+    Cached response body for key, loading it on a miss
+
+    Args:
+        key: Cache key, e.g. the query parameters of a list request
+        loader: Builds the JSON body from the database; None is not cached
+
+    Returns:
+        Cached body, or None if loader returned None
+    """
+    now = time.monotonic()
+    hit = _local.get(key)
+    if hit is not None and hit[0] > now:
+        _local.move_to_end(key)
+        return hit[1]
+
+    generation = _generation
+    shared = await _shared_generation()
+    body = await _redis_get(shared, key) if shared is not None else None
+    if body is None:
+        body = await loader()
+        if body is None:
+            return None
+        if shared is not None:
+            await _redis_set(shared, key, body)
+
+    cached = CachedBody.of(body)
+    if generation == _generation:
+        _local[key] = (now + settings.TEMPLATE_CACHE_LOCAL_TTL, cached)
+        _local.move_to_end(key)
+        if len(_local) > _LOCAL_CACHE_SIZE:
+            _local.popitem(last=False)
+    return cached
+
+
+async def invalidate() -> None:
+    """Drop all cached catalog responses after a template write"""
+    global _generation
+    _generation += 1
+    _local.clear()
+
+    client = redis_client.get_redis()
+    if client is None:
+        return
+    try:
+        await client.incr(_GENERATION_KEY)
+    except REDIS_ERRORS as e:
+        _mark_redis_down(e)
+
+
+def _hash_key(generation: int) -> str:
+    return f"{_REDIS_KEY}:{generation}"
+
+
+async def _shared_generation() -> Optional[int]:
+    """Current generation of the shared tier, None without Redis"""
+    client = redis_client.get_redis()
+    if client is None:
+        return None
+    try:
+        return int(await client.get(_GENERATION_KEY) or 0)
+    except REDIS_ERRORS as e:
+        _mark_redis_down(e)
+        return None
+
+
+async def _redis_get(generation: int, key: str) -> Optional[bytes]:
+    client = redis_client.get_redis()
+    if client is None:
+        return None
+    try:
+        return await client.hget(_hash_key(generation), key)
+    except REDIS_ERRORS as e:
+        _mark_redis_down(e)
+        return None
+
+
+async def _redis_set(generation: int, key: str, body: bytes) -> None:
+    client = redis_client.get_redis()
+    if client is None:
+        return
+    try:
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(_hash_key(generation), key, body)
+            pipe.expire(_hash_key(generation), settings.TEMPLATE_CACHE_TTL)
+            await pipe.execute()
+    except REDIS_ERRORS as e:
+        _mark_redis_down(e)
+
+
+def _mark_redis_down(exc: Exception) -> None:
+    redis_client.mark_redis_down("TemplateCache", "using local cache only", exc)
@@ -9,6 +9,19 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.template import Template
+from app.schemas.template import TemplateDetailResponse, TemplateListResponse
+from app.services import template_cache, template_usage
+from app.services.template_cache import CachedBody
+
+# 模板分类（列表仅缓存这些分类的查询，任意分类参数不会撑大缓存）
+TEMPLATE_CATEGORIES = [
+    {"id": "business", "name": "商务", "icon": "💼"},
+    {"id": "education", "name": "教育", "icon": "📚"},
+    {"id": "creative", "name": "创意", "icon": "🎨"},
+    {"id": "minimal", "name": "极简", "icon": "⚪"},
+    {"id": "general", "name": "通用", "icon": "📄"},
+]
+CATEGORY_IDS = frozenset(category["id"] for category in TEMPLATE_CATEGORIES)
 
 
 class TemplateService:
@@ -17,7 +30,7 @@ class TemplateService:
     
     功能：
     - 获取模板列表
-    - 获取模板详情
+    - 获取模板详情（列表与详情响应经 template_cache 缓存，模板写入后失效）
     - 应用模板到 PPT
     """
     
@@ -69,17 +82,65 @@ class TemplateService:
         )
         return result.scalar_one_or_none()
     
+    async def get_catalog(
+        self,
+        category: Optional[str] = None,
+        is_premium: Optional[bool] = None,
+        limit: int = 50
+    ) -> CachedBody:
+        """
+        获取模板列表响应（已序列化，带缓存）
+        
+        参数同 get_templates
+        """
+        premium = "" if is_premium is None else int(is_premium)
+        key = f"list:{category or ''}:{premium}:{limit}"
+        
+        async def load() -> bytes:
+            templates = await self.get_templates(category, is_premium, limit)
+            response = TemplateListResponse.model_validate(
+                {"templates": templates, "total": len(templates)},
+                from_attributes=True
+            )
+            return response.model_dump_json().encode()
+        
+        # 未知分类直接查询，不占用缓存
+        if category is not None and category not in CATEGORY_IDS:
+            return CachedBody.of(await load())
+        
+        return await template_cache.get_or_load(key, load)
+    
+    async def get_detail(self, template_id: UUID) -> Optional[CachedBody]:
+        """
+        获取模板详情响应（已序列化，带缓存）
+        
+        Returns:
+            模板不存在时返回 None
+        """
+        async def load() -> Optional[bytes]:
+            template = await self.get_by_id(template_id)
+            if not template:
+                return None
+            return TemplateDetailResponse.model_validate(template).model_dump_json().encode()
+        
+        return await template_cache.get_or_load(f"detail:{template_id}", load)
+    
     async def increment_usage(self, template_id: UUID) -> None:
         """
         增加模板使用次数
         
+        计数先累加到 Redis，由定时任务批量落库（见 template_usage）；
+        Redis 不可用时直接以原子 UPDATE 写入数据库。使用次数变化不使模板缓存失效，
+        列表排序在缓存过期后更新
+        
         Args:
             template_id: 模板 ID
         """
-        template = await self.get_by_id(template_id)
-        if template:
-            template.usage_count += 1
-            await self.db.commit()
+        if await template_usage.record_use(template_id):
+            return
+        
+        await template_usage.add_usage(self.db, {template_id: 1})
+        await self.db.commit()
     
     async def create_default_templates(self) -> None:
         """
@@ -186,6 +247,7 @@ class TemplateService:
             minimal_template
         ])
         await self.db.commit()
+        await template_cache.invalidate()
 
 
 def get_template_service(db: AsyncSession) -> TemplateService:
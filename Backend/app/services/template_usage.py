@@ -0,0 +1,117 @@
+"""
+Write-behind template usage counters
+
+record_use() adds to a Redis hash (HINCRBY) instead of writing the
+template row, so popular templates cause no row contention on
+/templates/{id}/use. flush_usage() runs from beat every
+TEMPLATE_USAGE_FLUSH_SECONDS: it moves the hash aside with RENAME and
+applies all counts in one transaction, one atomic
+UPDATE templates SET usage_count = usage_count + n per template.
+
+A batch is deleted from Redis only after its transaction commits. A flush
+that fails before committing leaves the batch to the next run; one that
+dies between commit and delete applies it twice. Usage counts favour
+never losing uses over exactness.
+
+If Redis is unavailable, record_use returns False and the caller updates
+the row directly with the same atomic UPDATE.
+
+Neither path invalidates the template catalog cache: usage only reorders
+the gallery, and TEMPLATE_CACHE_TTL bounds how stale the order gets.
+"""
+
+from typing import Dict
+from uuid import UUID
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.template import Template
+from app.utils import redis_client
+from app.utils.redis_client import REDIS_ERRORS
+
+_USAGE_KEY = "templates:usage"
+# Batch being flushed; left in place if a flush fails before committing
+_FLUSHING_KEY = "templates:usage:flushing"
+_LOCK_KEY = "templates:usage:lock"
+_LOCK_TTL = 300
+
+_templates = Template.__table__
+_ADD_USAGE = (
+    update(_templates)
+    .where(_templates.c.id == bindparam("template_id"))
+    .values(usage_count=_templates.c.usage_count + bindparam("uses"))
+)
+
+
+async def record_use(template_id: UUID) -> bool:
+    """
+    Count one use in Redis
+
+    Returns:
+        False if Redis is unavailable and the use was not recorded
+    """
+    client = redis_client.get_redis()
+    if client is None:
+        return False
+    try:
+        await client.hincrby(_USAGE_KEY, str(template_id), 1)
+    except REDIS_ERRORS as e:
+        _mark_redis_down(e)
+        return False
+    return True
+
+
+async def add_usage(db: AsyncSession, counts: Dict[UUID, int]) -> None:
+    """Add use counts to template rows atomically (no read-modify-write)"""
+    if not counts:
+        return
+    # Fixed row order so concurrent flushes cannot deadlock
+    params = [
+        {"template_id": template_id, "uses": uses}
+        for template_id, uses in sorted(counts.items(), key=lambda item: str(item[0]))
+    ]
+    await db.execute(_ADD_USAGE, params)
+
+
+async def flush_usage(db: AsyncSession) -> int:
+    """
+    Apply the counts recorded in Redis to the database
+
+    Returns:
+        Number of uses applied
+    """
+    client = redis_client.get_redis()
+    if client is None:
+        return 0
+
+    try:
+        if not await client.set(_LOCK_KEY, "1", nx=True, ex=_LOCK_TTL):
+            return 0  # another flush is running
+        try:
+            # Retry a batch left by a failed flush before taking a new one
+            if not await client.exists(_FLUSHING_KEY):
+                if not await client.exists(_USAGE_KEY):
+                    return 0
+                await client.rename(_USAGE_KEY, _FLUSHING_KEY)
+            batch = await client.hgetall(_FLUSHING_KEY)
+
+            counts = {_decode_id(key): int(value) for key, value in batch.items()}
+            await add_usage(db, counts)
+            await db.commit()
+            await client.delete(_FLUSHING_KEY)
+        finally:
+            await client.delete(_LOCK_KEY)
+    except REDIS_ERRORS as e:
+        _mark_redis_down(e)
+        return 0
+
+    return sum(counts.values())
+
+
+def _decode_id(key) -> UUID:
+    return UUID(key.decode() if isinstance(key, bytes) else key)
+
+
+def _mark_redis_down(exc: Exception) -> None:
+    redis_client.mark_redis_down("TemplateUsage", "counting uses in the database", exc)
@@ -0,0 +1,307 @@
+"""
+Slide thumbnails
+
+Small raster previews of slides, drawn with Pillow from the same compiled
+render plans as PPTX export (render_plans.layout_ops), so no office suite
+is needed. Thumbnails are content-addressed: the key hashes everything a
+slide is rendered from, so an unchanged slide keeps its file and URL and
+an edited slide gets a new one. Files never change once written and are
+served with long-lived cache headers.
+
+Keys are computed only when rendering, in background tasks, and stored on
+the presentation (Presentation.thumbnail_keys, slide id -> key); API
+responses build URLs from the stored keys without hashing or touching the
+filesystem. A slide edit drops the edited slide's key until the next
+render.
+
+Files live under STORAGE_LOCAL_PATH/thumbnails. The thumbnail route
+touches a file's access time when serving it (the modification time backs
+its ETag and stays fixed), and the export cleanup task prunes files not
+served for THUMBNAIL_TTL_DAYS.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.enum.text import PP_ALIGN
+from pptx.util import Inches
+
+from app.config import settings
+from app.services.export_service import SLIDE_SIZE, ImageHelper
+from app.services.render_plans import PictureOp, ShapeOp, TextOp, layout_ops, resolve_theme
+from app.services.slide_cache import write_atomic
+
+# Bump when thumbnail output changes so stale files are not reused
+THUMBNAIL_VERSION = 1
+
+# Path of the thumbnail route (see app.routers.thumbnails)
+THUMBNAIL_PATH = "/api/v1/thumbnails"
+
+_WEBP_QUALITY = 80
+_LINE_SPACING = 1.2
+# python-pptx text box insets (0.1" left/right, 0.05" top/bottom)
+_INSET_X, _INSET_Y = Inches(0.1), Inches(0.05)
+# Default corner radius of a PowerPoint rounded rectangle (adj 16667)
+_ROUNDED_RADIUS = 0.16667
+
+
+def thumbnail_key(slide_data: Dict[str, Any]) -> str:
+    """
+    Content hash of a slide as rendered
+
+    The slide id and speaker notes are left out, so identical slides
+    share a thumbnail across decks and copies.
+    """
+    rendered = {k: v for k, v in slide_data.items() if k not in ("id", "notes")}
+    raw = json.dumps(
+        {"version": THUMBNAIL_VERSION, "width": settings.THUMBNAIL_WIDTH, "slide": rendered},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def thumbnail_url(key: Optional[str]) -> Optional[str]:
+    """URL of a stored thumbnail key, or None for a slide without one"""
+    return f"{THUMBNAIL_PATH}/{key}.webp" if key else None
+
+
+def retain_thumbnail_keys(keys: Optional[Dict[str, str]], old_slides: Iterable[Dict[str, Any]],
+                          new_slides: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Stored keys still valid after the slides were replaced
+
+    Keeps the key of every slide whose dict is unchanged; edited, new and
+    deleted slides lose theirs until the next render.
+    """
+    if not keys:
+        return {}
+    old = {slide.get('id'): slide for slide in old_slides}
+    return {
+        slide['id']: keys[slide['id']]
+        for slide in new_slides
+        if slide.get('id') in keys and old.get(slide['id']) == slide
+    }
+
+
+class ThumbnailService:
+    """
+    On-disk thumbnail store
+
+    Layout:
+        <root>/<key[:2]>/<key>.webp
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = root or Path(settings.STORAGE_LOCAL_PATH) / "thumbnails"
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.webp"
+
+    def slide_urls(self, keys: Optional[Dict[str, str]], slides: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Thumbnail URL per slide from stored keys, None for slides not rendered yet"""
+        keys = keys or {}
+        return [thumbnail_url(keys.get(slide.get('id'))) for slide in slides]
+
+    async def generate(self, slides: List[Dict[str, Any]]) -> Tuple[int, Dict[str, str]]:
+        """
+        Render thumbnails missing for a list of slide dicts
+
+        Slides whose image cannot be fetched are skipped, so they are
+        retried on the next run instead of being stored without it.
+
+        Returns:
+            (number of thumbnails written, slide id -> key of every slide
+            that has a thumbnail now)
+        """
+        keys: Dict[str, str] = {}
+        missing: Dict[str, Dict[str, Any]] = {}
+        for slide_data in slides:
+            key = thumbnail_key(slide_data)
+            if slide_data.get('id'):
+                keys[slide_data['id']] = key
+            if key not in missing and not self.path(key).exists():
+                missing[key] = slide_data
+        if not missing:
+            return 0, keys
+
+        images = await ImageHelper.prefetch_images(
+            (slide_data.get('content') or {}).get('image_url') for slide_data in missing.values()
+        )
+
+        written = 0
+        failed = set()
+        for key, slide_data in missing.items():
+            data = await asyncio.to_thread(render_thumbnail, slide_data, images)
+            if data is not None:
+                write_atomic(self.path(key), data)
+                written += 1
+            else:
+                failed.add(key)
+        return written, {slide_id: key for slide_id, key in keys.items() if key not in failed}
+
+    def touch(self, path: Path) -> None:
+        """Record that a thumbnail was served, keeping its mtime (and ETag)"""
+        try:
+            os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+        except OSError:
+            pass
+
+    def prune(self, max_age_days: int) -> int:
+        """Delete thumbnails unused for max_age_days; returns the count"""
+        if not self.root.exists():
+            return 0
+        cutoff = time.time() - max_age_days * 86400
+        deleted = 0
+        for path in self.root.glob("*/*.webp"):
+            try:
+                stat = path.stat()
+                if max(stat.st_atime, stat.st_mtime) < cutoff:
+                    path.unlink()
+                    deleted += 1
+            except OSError:
+                continue
+        return deleted
+
+
+def render_thumbnail(slide_data: Dict[str, Any], images: Dict[str, bytes]) -> Optional[bytes]:
+    """
+    Draw a slide dict as a WebP thumbnail
+
+    Args:
+        slide_data: Slide dict
+        images: Image bytes by URL (see ImageHelper.prefetch_images)
+
+    Returns:
+        Encoded WebP, or None if the slide's image is missing from images
+    """
+    content = slide_data.get('content') or {}
+    theme = resolve_theme((slide_data.get('style') or {}).get('theme'))
+    image_url = content.get('image_url')
+    if image_url and image_url not in images:
+        return None
+
+    width = settings.THUMBNAIL_WIDTH
+    size = (width, round(width * SLIDE_SIZE[1] / SLIDE_SIZE[0]))
+    scale = width / Inches(SLIDE_SIZE[0])
+    canvas = Image.new("RGB", size, tuple(theme.background))
+
+    # Background image stretched over the slide, as in PPTX export
+    image = _open_image(images[image_url]) if image_url else None
+    if image is not None:
+        canvas.paste(image.resize(size, Image.BILINEAR))
+
+    draw = ImageDraw.Draw(canvas, "RGBA")
+    for op, box, value in layout_ops(
+        slide_data.get('type', 'content'), content, theme, has_image=image is not None
+    ):
+        box = tuple(round(v * scale) for v in box)
+        if isinstance(op, PictureOp):
+            if image is not None:
+                # Scaled to the box width, as python-pptx add_picture(width=...)
+                left, top, w, _ = box
+                picture = image.resize((w, max(1, round(w * image.height / image.width))), Image.BILINEAR)
+                canvas.paste(picture, (left, top))
+            else:
+                _draw_shape(draw, op.placeholder, box, value, scale)
+        elif isinstance(op, ShapeOp):
+            _draw_shape(draw, op, box, value, scale)
+        else:
+            _draw_text(draw, op, box, value, scale, middle=False)
+
+    output = BytesIO()
+    canvas.save(output, format="WEBP", quality=_WEBP_QUALITY)
+    return output.getvalue()
+
+
+def _open_image(data: bytes) -> Optional[Image.Image]:
+    try:
+        image = Image.open(BytesIO(data))
+        image.draft("RGB", (settings.THUMBNAIL_WIDTH, settings.THUMBNAIL_WIDTH))
+        return image.convert("RGB")
+    except Exception as e:
+        print(f"[Thumbnail] Failed to open image: {e}")
+        return None
+
+
+def _draw_shape(draw: ImageDraw.ImageDraw, op: ShapeOp, box: Tuple[int, ...],
+                value: Optional[str], scale: float) -> None:
+    left, top, w, h = box
+    xy = (left, top, left + max(w, 1) - 1, top + max(h, 1) - 1)
+    alpha = 255 if op.alpha is None else round(255 * op.alpha / 100000)
+    fill = tuple(op.fill) + (alpha,)
+    outline = tuple(op.line) if op.line is not None else None
+
+    if op.kind == MSO_SHAPE.OVAL:
+        draw.ellipse(xy, fill=fill, outline=outline)
+    elif op.kind == MSO_SHAPE.ROUNDED_RECTANGLE:
+        radius = round(min(w, h) * _ROUNDED_RADIUS)
+        draw.rounded_rectangle(xy, radius=radius, fill=fill, outline=outline)
+    else:
+        draw.rectangle(xy, fill=fill, outline=outline)
+
+    if value is not None:
+        # Autoshape text is vertically centered
+        _draw_text(draw, op.text, box, value, scale, middle=True)
+
+
+def _draw_text(draw: ImageDraw.ImageDraw, op: TextOp, box: Tuple[int, ...],
+               value: str, scale: float, middle: bool) -> None:
+    left, top, w, h = box
+    inset_x, inset_y = round(_INSET_X * scale), round(_INSET_Y * scale)
+    font = _font(max(1, round(op.size * scale)))
+    line_height = round(font.size * _LINE_SPACING)
+
+    lines = _wrap(draw, value, font, max(w - 2 * inset_x, 1))
+    y = top + inset_y
+    if middle:
+        y = top + (h - line_height * len(lines)) // 2
+    for line in lines:
+        x = left + inset_x
+        if op.align == PP_ALIGN.CENTER:
+            x = left + (w - draw.textlength(line, font=font)) / 2
+        draw.text((x, y), line, font=font, fill=tuple(op.color))
+        y += line_height
+
+
+def _wrap(draw: ImageDraw.ImageDraw, text: str, font, max_width: int) -> List[str]:
+    """Greedy wrap by character, which also breaks CJK text without spaces"""
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for char in paragraph:
+            if line and draw.textlength(line + char, font=font) > max_width:
+                # Prefer breaking at the last space for Latin text
+                head, space, tail = line.rpartition(" ")
+                if space and head:
+                    lines.append(head)
+                    line = tail + char
+                else:
+                    lines.append(line)
+                    line = char.lstrip()
+            else:
+                line += char
+        lines.append(line)
+    return lines
+
+
+@lru_cache(maxsize=64)
+def _font(size: int):
+    """Thumbnail font at a pixel size; Pillow's built-in font if the configured one is missing"""
+    try:
+        return ImageFont.truetype(settings.THUMBNAIL_FONT_PATH, size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+def get_thumbnail_service() -> ThumbnailService:
+    """Get thumbnail service instance"""
+    return ThumbnailService()
@@ -2,10 +2,18 @@
 Celery 任务队列配置
 """
 
+from datetime import timedelta
+
 from celery import Celery
+from kombu import Queue
 
 from app.config import settings
 
+# 任务优先级（Redis 传输中数值越小优先级越高）
+PRIORITY_INTERACTIVE = 0  # 用户在界面上等待的任务，如单个导出
+PRIORITY_DEFAULT = 5
+PRIORITY_BULK = 9  # 批量任务，让位于交互任务
+
 # 创建 Celery 实例
 celery_app = Celery(
     "ai_ppt",
@@ -14,6 +22,8 @@ celery_app = Celery(
     include=[
         "app.tasks.export_tasks",
         "app.tasks.generation_tasks",
+        "app.tasks.template_tasks",
+        "app.tasks.thumbnail_tasks",
     ]
 )
 
@@ -43,6 +53,66 @@ task_soft_time_limit=3000,  # 50分钟软超时
     # 重试设置
     task_default_retry_delay=60,
 task_max_retries=3,
+    
+    # 队列路由：生成、导出、维护任务使用独立队列和 worker 池，
+    # 慢速生成任务不会阻塞导出；未指定 -Q 的 worker 消费以下全部队列
+    task_default_queue="celery",
+    task_queues=(
+        Queue("celery"),
+        Queue("generation"),  # 大纲生成、组装落库
+        Queue("generation_images"),  # 单页配图
+        Queue("generation_enrich"),  # 单页内容扩写
+        Queue("export"),  # PPT 导出（含批量导出中逐个 PPT 的子任务）
+        Queue("export_bulk"),  # 批量导出打包：等待子任务并写入 zip，不占用导出 worker
+        Queue("maintenance"),  # 定时清理、缩略图
+    ),
+    task_routes={
+        "app.tasks.generation_tasks.process_generation_task": {"queue": "generation"},
+        "app.tasks.generation_tasks.assemble_generation": {"queue": "generation"},
+        "app.tasks.generation_tasks.generate_slide_image": {"queue": "generation_images"},
+        "app.tasks.generation_tasks.enrich_slide": {"queue": "generation_enrich"},
+        "app.tasks.export_tasks.process_export_task": {"queue": "export"},
+        "app.tasks.export_tasks.process_bulk_export": {"queue": "export_bulk"},
+        "app.tasks.export_tasks.export_bulk_item": {"queue": "export"},
+        "app.tasks.generation_tasks.cleanup_stalled_tasks": {"queue": "maintenance"},
+        "app.tasks.export_tasks.cleanup_stalled_exports": {"queue": "maintenance"},
+        "app.tasks.export_tasks.cleanup_old_exports": {"queue": "maintenance"},
+        "app.tasks.thumbnail_tasks.generate_thumbnails": {"queue": "maintenance"},
+        "app.tasks.thumbnail_tasks.refresh_recent_thumbnails": {"queue": "maintenance"},
+        "app.tasks.template_tasks.flush_template_usage": {"queue": "maintenance"},
+    },
+    
+    # 优先级：同一队列内高优先级任务先出队
+    task_default_priority=PRIORITY_DEFAULT,
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
+    
+    # 定时任务（需运行 celery -A app.tasks beat）
+    beat_schedule={
+        "cleanup-stalled-tasks": {
+            "task": "app.tasks.generation_tasks.cleanup_stalled_tasks",
+            "schedule": timedelta(minutes=10),
+        },
+        "cleanup-stalled-exports": {
+            "task": "app.tasks.export_tasks.cleanup_stalled_exports",
+            "schedule": timedelta(minutes=10),
+        },
+        "cleanup-old-exports": {
+            "task": "app.tasks.export_tasks.cleanup_old_exports",
+            "schedule": timedelta(hours=1),
+        },
+        "refresh-recent-thumbnails": {
+            "task": "app.tasks.thumbnail_tasks.refresh_recent_thumbnails",
+            "schedule": timedelta(seconds=settings.THUMBNAIL_SWEEP_SECONDS),
+        },
+        "flush-template-usage": {
+            "task": "app.tasks.template_tasks.flush_template_usage",
+            "schedule": timedelta(seconds=settings.TEMPLATE_USAGE_FLUSH_SECONDS),
+        },
+    },
 )
 
 # 自动发现任务
@@ -0,0 +1,71 @@
+"""
+Run task coroutines from Celery workers
+
+By default each call gets a fresh event loop (prefork workers, one task
+per process). With CELERY_ASYNC_WORKER enabled, coroutines are submitted
+to one persistent event loop per worker process instead, so a worker
+started with
+
+    celery -A app.tasks worker --pool threads --concurrency 100
+
+runs up to CELERY_ASYNC_CONCURRENCY I/O-bound tasks concurrently while
+reusing HTTP clients, DB pools and rate limiter state across tasks.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Optional
+
+from app.config import settings
+
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+# Created on the loop thread, reset together with the loop
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def run_async(coro: Awaitable[Any]) -> Any:
+    """Run a coroutine to completion from synchronous task code"""
+    if settings.CELERY_ASYNC_WORKER:
+        future = asyncio.run_coroutine_threadsafe(_limited(coro), _get_loop())
+        return future.result()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+        except:
+            pass
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Persistent loop of this process, started on first use"""
+    global _loop, _loop_pid, _semaphore
+    with _lock:
+        # A forked child must not reuse the parent's loop thread
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            _semaphore = None
+            threading.Thread(
+                target=_loop.run_forever,
+                name="celery-async-loop",
+                daemon=True
+            ).start()
+            print(f"[AsyncRunner] Started event loop in pid {_loop_pid}, "
+                  f"concurrency {settings.CELERY_ASYNC_CONCURRENCY}")
+        return _loop
+
+
+async def _limited(coro: Awaitable[Any]) -> Any:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.CELERY_ASYNC_CONCURRENCY)
+    async with _semaphore:
+        return await coro
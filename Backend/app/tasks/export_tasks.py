@@ -4,24 +4,36 @@
 """
 
 import asyncio
-from datetime import datetime
+import re
+import uuid
+import zipfile
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import List, Optional
 
+from celery import group
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
-from app.models.export_task import ExportTask
+from app.models.export_task import BulkExportJob, ExportTask
 from app.models.presentation import Presentation
 from app.services.export_service import ExportService
-from app.tasks import celery_app
+from app.services.export_task_service import INFLIGHT_STATUSES, STALLED_ERROR, stalled_cutoff
+from app.services.slide_cache import SlideCache
+from app.services.thumbnail_service import get_thumbnail_service
+from app.tasks import PRIORITY_BULK, celery_app
 from app.utils.datetime import utcnow_aware
+from app.utils.zip_stream import ZipStream, partial_path
 
 # 创建同步数据库引擎用于 Celery
 database_url_sync = settings.DATABASE_URL.replace("+asyncpg", "")
 engine = create_async_engine(settings.DATABASE_URL, future=True)
 
+# 批量导出等待子任务结果的轮询间隔（秒）
+_BULK_POLL_SECONDS = 0.5
+
 
 @celery_app.task(bind=True, max_retries=3)
 def process_export_task(self, task_id: str):
@@ -51,8 +63,9 @@ async def _process_export_async(task_self, task_id: str):
                 print(f"[Export] 任务 {task_id} 不存在")
                 return
             
-            if task.status == "cancelled":
-                print(f"[Export] 任务 {task_id} 已取消")
+            # 已取消、或因超时被清理标记为失败的任务不再执行
+            if task.status not in INFLIGHT_STATUSES:
+                print(f"[Export] 任务 {task_id} 已结束: {task.status}")
                 return
             
             # 更新状态为处理中
@@ -75,14 +88,18 @@ async def _process_export_async(task_self, task_id: str):
             export_service = ExportService()
             
             if task.format == "pptx":
-                file_path = await export_service.export_pptx(presentation)
+                file_path = await export_service.export_pptx(
+                    presentation, quality=task.quality, slide_range=task.slide_range
+                )
             elif task.format == "pdf":
-                file_path = await export_service.export_pdf(presentation)
+                file_path = await export_service.export_pdf(
+                    presentation, quality=task.quality, slide_range=task.slide_range
+                )
             elif task.format in ["png", "jpg"]:
-                file_paths = await export_service.export_images(
-                    presentation, format=task.format
+                file_path = await export_service.export_images_archive(
+                    presentation, format=task.format,
+                    quality=task.quality, slide_range=task.slide_range
                 )
-                file_path = file_paths[0] if file_paths else None
             else:
                 raise ValueError(f"不支持的格式: {task.format}")
             
@@ -98,26 +115,247 @@ async def _process_export_async(task_self, task_id: str):
         except Exception as exc:
             print(f"[Export] 任务 {task_id} 失败: {exc}")
             
-            # 更新失败状态
+            # 还会重试时保持 processing：任务仍占用去重唯一索引，期间相同的导出请求
+            # 复用它，而不是新建任务后导致重试改回 processing 时违反唯一索引
+            final = task_self.request.retries >= task_self.max_retries
             try:
+                await db.rollback()
                 result = await db.execute(
                     select(ExportTask).where(ExportTask.id == task_id)
                 )
                 task = result.scalar_one_or_none()
                 if task:
-                    task.status = "failed"
+                    if final:
+                        task.status = "failed"
                     task.error_message = str(exc)
                     await db.commit()
             except Exception as e:
                 print(f"[Export] 更新失败状态出错: {e}")
             
-            # 重试
+            if final:
+                raise
             raise task_self.retry(exc=exc, countdown=60)
         
         finally:
             await db.commit()
 
 
+@celery_app.task
+def process_bulk_export(job_id: str):
+    """
+    处理批量导出任务
+    
+    每个 PPT 作为一个导出子任务派发到 export 队列并行渲染，每完成一个立即写入 zip 并更新进度
+    
+    Args:
+        job_id: 批量导出任务 ID
+    """
+    return asyncio.run(_process_bulk_export_async(job_id))
+
+
+@celery_app.task(bind=True, max_retries=2)
+def export_bulk_item(self, job_id: str, ppt_id: str):
+    """
+    导出批量任务中的单个 PPT
+    
+    Returns:
+        导出文件路径，由 process_bulk_export 写入 zip
+    """
+    try:
+        return asyncio.run(_export_bulk_item_async(job_id, ppt_id))
+    except Exception as exc:
+        print(f"[BulkExport] {job_id} 导出 {ppt_id} 出错: {exc}")
+        if self.request.retries >= self.max_retries:
+            raise
+        raise self.retry(exc=exc, countdown=30)
+
+
+async def _export_bulk_item_async(job_id: str, ppt_id: str) -> str:
+    """异步导出单个 PPT"""
+    from app.database import AsyncSessionLocal
+    
+    async with AsyncSessionLocal() as db:
+        job = await db.get(BulkExportJob, uuid.UUID(job_id))
+        if not job or job.status != "processing":
+            raise RuntimeError("批量导出任务已结束")
+        
+        result = await db.execute(
+            select(Presentation).where(
+                Presentation.id == uuid.UUID(ppt_id),
+                Presentation.user_id == job.user_id
+            )
+        )
+        ppt = result.scalar_one_or_none()
+        if not ppt:
+            raise RuntimeError("PPT 不存在")
+        
+        export_service = ExportService()
+        if job.format == "pdf":
+            return await export_service.export_pdf(ppt, quality=job.quality)
+        return await export_service.export_pptx(ppt, quality=job.quality)
+
+
+def _dispatch_bulk_items(job_id: str, ppt_ids: List[str]) -> list:
+    """以 group 派发逐个 PPT 的导出子任务，返回各子任务的结果句柄"""
+    result = group(export_bulk_item.si(job_id, ppt_id) for ppt_id in ppt_ids).apply_async(
+        priority=PRIORITY_BULK
+    )
+    return list(result.results)
+
+
+async def _process_bulk_export_async(job_id: str):
+    """异步处理批量导出"""
+    from app.database import AsyncSessionLocal
+    
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(BulkExportJob).where(BulkExportJob.id == uuid.UUID(job_id))
+        )
+        job = result.scalar_one_or_none()
+        
+        # 重复投递或已处理的任务直接跳过
+        if not job or job.status != "pending":
+            return
+        
+        job.status = "processing"
+        await db.commit()
+        
+        archive_path: Optional[Path] = None
+        try:
+            ppt_result = await db.execute(
+                select(Presentation).where(
+                    Presentation.id.in_([uuid.UUID(ppt_id) for ppt_id in job.ppt_ids]),
+                    Presentation.user_id == job.user_id
+                )
+            )
+            presentations = {str(ppt.id): ppt for ppt in ppt_result.scalars().all()}
+            
+            errors = [
+                {"ppt_id": ppt_id, "error": "PPT 不存在"}
+                for ppt_id in job.ppt_ids if ppt_id not in presentations
+            ]
+            # zip 先写入 .part，完成后改名；进行中即可边生成边下载
+            export_service = ExportService()
+            archive_path = export_service.storage_path / f"bulk_{job.id}_{uuid.uuid4().hex}.zip"
+            job.failed = len(errors)
+            job.errors = list(errors)
+            job.file_path = str(archive_path)
+            await db.commit()
+            
+            part_path = partial_path(archive_path)
+            # pptx 本身已压缩，不再重复压缩
+            compression = zipfile.ZIP_STORED if job.format == "pptx" else zipfile.ZIP_DEFLATED
+            
+            with open(part_path, "wb") as sink:
+                archive = ZipStream(sink, compression=compression)
+                ppt_ids = [ppt_id for ppt_id in job.ppt_ids if ppt_id in presentations]
+                pending = dict(zip(_dispatch_bulk_items(job_id, ppt_ids), ppt_ids)) if ppt_ids else {}
+                
+                while pending:
+                    done = [item for item in pending if item.ready()]
+                    if not done:
+                        await asyncio.sleep(_BULK_POLL_SECONDS)
+                        continue
+                    
+                    for item in done:
+                        ppt = presentations[pending.pop(item)]
+                        if item.successful():
+                            path = item.result
+                            name = _archive_name(ppt.title, Path(path).suffix)
+                            await asyncio.to_thread(archive.add_file, path, name)
+                            Path(path).unlink(missing_ok=True)
+                            job.completed += 1
+                        else:
+                            error = str(item.result)
+                            print(f"[BulkExport] {job.id} 导出 {ppt.id} 失败: {error}")
+                            errors.append({"ppt_id": str(ppt.id), "error": error[:500]})
+                            job.errors = list(errors)
+                            job.failed += 1
+                        await db.commit()
+                archive.close()
+            
+            if job.completed == 0:
+                part_path.unlink(missing_ok=True)
+                job.status = "failed"
+                job.file_path = None
+                job.error_message = "所有 PPT 均导出失败"
+            else:
+                part_path.replace(archive_path)
+                job.status = "completed"
+                job.file_size = archive_path.stat().st_size
+                job.expires_at = utcnow_aware() + timedelta(days=1)
+            job.completed_at = utcnow_aware()
+            await db.commit()
+            
+            print(f"[BulkExport] 任务 {job_id} 结束: 成功 {job.completed}，失败 {job.failed}")
+            
+        except Exception as exc:
+            print(f"[BulkExport] 任务 {job_id} 失败: {exc}")
+            if archive_path is not None:
+                partial_path(archive_path).unlink(missing_ok=True)
+            await db.rollback()
+            job.file_path = None
+            job.status = "failed"
+            job.error_message = str(exc)[:500]
+            await db.commit()
+
+
+def _archive_name(title: Optional[str], suffix: str) -> str:
+    """zip 内的文件名：PPT 标题去除非法字符（重名由 ZipStream 追加序号）"""
+    base = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", title or "").strip() or "presentation"
+    return f"{base}{suffix}"
+
+
+@celery_app.task
+def cleanup_stalled_exports():
+    """
+    清理卡住的导出任务
+    
+    提交后超过 EXPORT_STALLED_MINUTES 仍未结束的任务（如 worker 崩溃、消息丢失）标记为失败，
+    释放去重唯一索引，相同的导出请求可重新提交；卡住的批量导出同时删除未完成的 zip
+    """
+    return asyncio.run(_cleanup_stalled_exports_async())
+
+
+async def _cleanup_stalled_exports_async():
+    """异步清理卡住的导出任务"""
+    from app.database import AsyncSessionLocal
+    
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ExportTask).where(
+                ExportTask.status.in_(INFLIGHT_STATUSES),
+                ExportTask.created_at < stalled_cutoff()
+            )
+        )
+        stalled = result.scalars().all()
+        
+        for task in stalled:
+            task.status = "failed"
+            task.error_message = STALLED_ERROR
+            print(f"[Cleanup] Marked timed out export task: {task.id}")
+        
+        # 批量导出的打包任务中断时，删除写了一半的 zip
+        bulk_result = await db.execute(
+            select(BulkExportJob).where(
+                BulkExportJob.status.in_(INFLIGHT_STATUSES),
+                BulkExportJob.created_at < stalled_cutoff()
+            )
+        )
+        stalled_jobs = bulk_result.scalars().all()
+        
+        for job in stalled_jobs:
+            if job.file_path:
+                partial_path(Path(job.file_path)).unlink(missing_ok=True)
+            job.status = "failed"
+            job.file_path = None
+            job.error_message = STALLED_ERROR
+            print(f"[Cleanup] Marked timed out bulk export: {job.id}")
+        
+        await db.commit()
+        return len(stalled) + len(stalled_jobs)
+
+
 @celery_app.task
 def cleanup_old_exports(max_age_hours: int = 24):
     """
@@ -164,7 +402,39 @@ async def _cleanup_old_exports_async(max_age_hours: int):
             except Exception as e:
                 print(f"[Cleanup] 删除文件失败 {task.file_path}: {e}")
         
+        # 批量导出的 zip
+        bulk_result = await db.execute(
+            select(BulkExportJob).where(
+                BulkExportJob.status == "completed",
+                BulkExportJob.completed_at < cutoff_time,
+                BulkExportJob.file_path.isnot(None)
+            )
+        )
+        for job in bulk_result.scalars().all():
+            try:
+                if Path(job.file_path).exists():
+                    Path(job.file_path).unlink()
+                    deleted_count += 1
+                job.file_path = None
+                job.file_size = None
+            except Exception as e:
+                print(f"[Cleanup] 删除文件失败 {job.file_path}: {e}")
+        
         await db.commit()
-        print(f"[Cleanup] 清理完成，删除 {deleted_count} 个文件")
+        
+        # 清理长期未使用的幻灯片渲染缓存
+        pruned = await asyncio.to_thread(
+            SlideCache().prune, settings.EXPORT_SLIDE_CACHE_TTL_HOURS
+        )
+        
+        # 清理长期未被访问的缩略图
+        thumbnails = await asyncio.to_thread(
+            get_thumbnail_service().prune, settings.THUMBNAIL_TTL_DAYS
+        )
+        
+        print(
+            f"[Cleanup] 清理完成，删除 {deleted_count} 个文件，{pruned} 个幻灯片缓存，"
+            f"{thumbnails} 张缩略图"
+        )
         
         return deleted_count
@@ -1,21 +1,37 @@
 """
 PPT Generation Tasks
 Handle AI-generated PPT asynchronous tasks
+
+The pipeline runs as a Celery chord:
+
+    process_generation_task (outline)
+        -> generate_slide_image / enrich_slide per slide (fan-out)
+        -> assemble_generation (persist presentation)
+
+Stage outputs are checkpointed on the task row, so a retried stage never
+repeats work that already succeeded. Database work stays in the task
+thread; only AI calls run as coroutines (see app.tasks.async_runner).
 """
 
-import asyncio
+import random
+import re
+import shutil
 import uuid
-from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import select, create_engine
+from celery import chord
+from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.models.presentation import GenerationTask, Presentation
 from app.services.ai_provider import AIProviderFactory
 from app.services.api_key_service import APIKeyService
-from app.tasks import celery_app
+from app.services.rate_limiter import provider_slot
+from app.tasks import PRIORITY_BULK, celery_app
+from app.tasks.async_runner import run_async
+from app.tasks.thumbnail_tasks import generate_thumbnails
 from app.utils.datetime import utcnow_aware
 
 
@@ -28,274 +44,531 @@ sync_engine = create_engine(
 SyncSessionLocal = sessionmaker(bind=sync_engine)
 
 
+def _retry_countdown(retries: int) -> float:
+    # Transient AI errors were already retried per call in the provider;
+    # back off the task itself exponentially with jitter
+    return min(600, 60 * 2 ** retries) + random.uniform(0, 30)
+
+
 @celery_app.task(bind=True, max_retries=3)
 def process_generation_task(self, task_id: str):
     """
-    Process PPT generation task
-    
+    Process PPT generation task: generate the outline, then fan out
+    per-slide subtasks as a chord ending in assemble_generation
+
     Args:
         task_id: Generation task ID
     """
-    # Run async code in new event loop
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
     try:
-        result = loop.run_until_complete(_process_with_sync_db(self, task_id))
-        return result
+        jobs = _plan_generation(task_id)
     except Exception as exc:
         print(f"[Generation] Task {task_id} error: {exc}")
         import traceback
         traceback.print_exc()
-        raise self.retry(exc=exc, countdown=60)
-    finally:
-        try:
-            loop.run_until_complete(loop.shutdown_asyncgens())
-            loop.close()
-        except:
-            pass
+        raise self.retry(exc=exc, countdown=_retry_countdown(self.request.retries))
+
+    if jobs is None:
+        return
+
+    image_jobs, enrich_jobs = jobs
+    header = [generate_slide_image.si(task_id, i, prompt) for i, prompt in image_jobs]
+    header += [enrich_slide.si(task_id, i, *args) for i, args in enrich_jobs]
+
+    if header:
+        chord(header)(assemble_generation.si(task_id))
+    else:
+        assemble_generation.delay(task_id)
 
 
-async def _process_with_sync_db(task_self, task_id: str):
-    """Process with sync database operations"""
-    
-    # Step 1: Get task info using sync DB
+async def _create_provider(task: GenerationTask):
+    """Create the AI provider for a task with the user's text and image keys"""
+    from app.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as async_db:
+        api_key_service = APIKeyService(async_db)
+        key = await api_key_service.get_default_key(task.user_id, task.provider)
+
+        if not key:
+            # Update failure status
+            with SyncSessionLocal() as db2:
+                t = db2.query(GenerationTask).filter(GenerationTask.id == task.id).first()
+                if t:
+                    t.status = "failed"
+                    t.error_message = f"No valid {task.provider} API Key found"
+                    db2.commit()
+            raise ValueError(f"No valid {task.provider} API Key found")
+
+        # Decrypt API Key
+        from app.services.encryption_service import api_key_encryption
+        api_key = api_key_encryption.decrypt(key.api_key_encrypted)
+
+        # Check for dedicated image generation API key
+        # Strategy 1: Check for provider named "{provider}-image" in database
+        # Strategy 2: Fall back to environment variable IMAGE_API_KEY
+        # Strategy 3: Use the same key for both
+        image_key_record = await api_key_service.get_image_key(task.user_id, task.provider)
+
+        if image_key_record and image_key_record.id != key.id:
+            # Found a dedicated image key
+            image_api_key = api_key_encryption.decrypt(image_key_record.api_key_encrypted)
+            print(f"[Generation] Using dedicated image API key from database")
+        else:
+            # Check environment variable
+            import os
+            image_api_key = os.getenv("IMAGE_API_KEY")
+            if image_api_key:
+                print(f"[Generation] Using IMAGE_API_KEY from environment")
+            else:
+                # Use the same key for both
+                image_api_key = api_key
+                print(f"[Generation] Using same API key for text and image generation")
+
+        # Create AI provider with both keys
+        return AIProviderFactory.create(task.provider, api_key, image_api_key)
+
+
+def _load_task(db, task_id: str) -> Optional[GenerationTask]:
+    """Load a task that is still meant to run, or None"""
+    task = db.query(GenerationTask).filter(GenerationTask.id == task_id).first()
+
+    if not task:
+        print(f"[Generation] Task {task_id} does not exist")
+        return None
+
+    if task.status == "cancelled":
+        print(f"[Generation] Task {task_id} has been cancelled")
+        return None
+
+    return task
+
+
+def _plan_generation(task_id: str) -> Optional[Tuple[list, list]]:
+    """
+    Outline stage
+
+    Returns:
+        (image jobs, enrich jobs) still to run, or None if the task is gone
+    """
     with SyncSessionLocal() as sync_db:
-        task = sync_db.query(GenerationTask).filter(GenerationTask.id == task_id).first()
-        
+        task = _load_task(sync_db, task_id)
         if not task:
-            print(f"[Generation] Task {task_id} does not exist")
-            return
-        
-        if task.status == "cancelled":
-            print(f"[Generation] Task {task_id} has been cancelled")
-            return
-        
+            return None
+
         # Update to processing
         task.status = "processing"
         task.progress = 10
         sync_db.commit()
-        
-        # Get API Key using async service
-        from app.database import AsyncSessionLocal
-        
-        async with AsyncSessionLocal() as async_db:
-            api_key_service = APIKeyService(async_db)
-            key = await api_key_service.get_default_key(task.user_id, task.provider)
-            
-            if not key:
-                # Update failure status
-                with SyncSessionLocal() as db2:
-                    t = db2.query(GenerationTask).filter(GenerationTask.id == task_id).first()
-                    if t:
-                        t.status = "failed"
-                        t.error_message = f"No valid {task.provider} API Key found"
-                        db2.commit()
-                raise ValueError(f"No valid {task.provider} API Key found")
-            
-            # Decrypt API Key
-            from app.services.encryption_service import api_key_encryption
-            api_key = api_key_encryption.decrypt(key.api_key_encrypted)
-            
-            # Check for dedicated image generation API key
-            # Strategy 1: Check for provider named "{provider}-image" in database
-            # Strategy 2: Fall back to environment variable IMAGE_API_KEY
-            # Strategy 3: Use the same key for both
-            image_key_record = await api_key_service.get_image_key(task.user_id, task.provider)
-            
-            if image_key_record and image_key_record.id != key.id:
-                # Found a dedicated image key
-                image_api_key = api_key_encryption.decrypt(image_key_record.api_key_encrypted)
-                print(f"[Generation] Using dedicated image API key from database")
-            else:
-                # Check environment variable
-                import os
-                image_api_key = os.getenv("IMAGE_API_KEY")
-                if image_api_key:
-                    print(f"[Generation] Using IMAGE_API_KEY from environment")
-                else:
-                    # Use the same key for both
-                    image_api_key = api_key
-                    print(f"[Generation] Using same API key for text and image generation")
-            
-            # Create AI provider with both keys
-            provider = AIProviderFactory.create(task.provider, api_key, image_api_key)
-            
-            # Get parameters
-            params = task.parameters or {}
-            num_slides = params.get("num_slides", 10)
-            language = params.get("language", "zh")
-            style = params.get("style", "business")
-            
-            # Step 2: Generate outline
-            with SyncSessionLocal() as db2:
-                t = db2.query(GenerationTask).filter(GenerationTask.id == task_id).first()
-                if t:
-                    t.progress = 20
-                    db2.commit()
-            
-            outline = await provider.generate_ppt_outline(
-                prompt=task.prompt,
-                num_slides=num_slides,
-                language=language,
-                style=style
-            )
-            
-            theme = outline.get("theme", {})
-            
-            # Step 3: Build slides
-            with SyncSessionLocal() as db2:
-                t = db2.query(GenerationTask).filter(GenerationTask.id == task_id).first()
-                if t:
-                    t.progress = 40
-                    db2.commit()
-            
-            slides = []
-            outline_slides = outline.get("slides", [])
-            
-            # Debug: Print outline structure
-            print(f"[Generation] Got {len(outline_slides)} slides from outline")
-            for idx, s in enumerate(outline_slides[:3]):
-                print(f"[Generation] Slide {idx}: type={s.get('type')}, has_image_prompt={'image_prompt' in s}")
-            
-            # Generate images for slides with image_prompt
-            # Limit to first 3 images to avoid rate limits
-            image_count = 0
-            max_images = 3
-            
-            for i, slide_outline in enumerate(outline_slides):
-                slide_type = slide_outline.get("type", "content")
-                title = slide_outline.get("title", "")
-                
-                # Debug image_prompt
-                if slide_outline.get("image_prompt"):
-                    print(f"[Generation] Slide {i} ({slide_type}) has image_prompt: {slide_outline['image_prompt'][:50]}...")
-                
-                # Build content based on layout type
-                content_data = {"title": title}
-                
-                if slide_type == "title":
-                    content_data["subtitle"] = slide_outline.get("subtitle", "")
-                elif slide_type == "section":
-                    content_data["description"] = slide_outline.get("description", "")
-                elif slide_type == "two-column":
-                    left = slide_outline.get("left", {})
-                    right = slide_outline.get("right", {})
-                    content_data["left"] = {
-                        "title": left.get("title", ""),
-                        "points": left.get("points", [])
-                    }
-                    content_data["right"] = {
-                        "title": right.get("title", ""),
-                        "points": right.get("points", [])
-                    }
-                elif slide_type == "timeline":
-                    events = slide_outline.get("events", [])
-                    content_data["events"] = events if events else []
-                elif slide_type == "process":
-                    steps = slide_outline.get("steps", [])
-                    content_data["steps"] = steps if steps else []
-                elif slide_type == "grid":
-                    items = slide_outline.get("items", [])
-                    content_data["items"] = items if items else []
-                elif slide_type == "comparison":
-                    items = slide_outline.get("items", [])
-                    content_data["items"] = items if items else []
-                elif slide_type == "data":
-                    stats = slide_outline.get("stats", [])
-                    content_data["stats"] = stats if stats else []
-                elif slide_type == "quote":
-                    content_data["quote"] = slide_outline.get("quote", "")
-                    content_data["author"] = slide_outline.get("author", "")
-                    content_data["title"] = slide_outline.get("title", "")
-                elif slide_type == "image-text":
-                    content_data["image_url"] = slide_outline.get("image_url", "")
-                    content_data["text"] = slide_outline.get("text", "")
-                else:  # content
-                    points = slide_outline.get("points", [])
-                    content_data["bullets"] = points
-                    content_data["text"] = slide_outline.get("content", "")
-                
-                # Generate image if image_prompt exists and under limit
-                image_prompt = slide_outline.get("image_prompt")
-                print(f"[Generation] Slide {i+1} ({slide_type}): image_prompt={'YES' if image_prompt else 'NO'}, count={image_count}/{max_images}")
-                
-                if image_prompt and image_count < max_images:
-                    try:
-                        print(f"[Generation] Generating image for slide {i+1}: {title[:30]}...")
-                        print(f"[Generation] Prompt: {image_prompt[:80]}...")
-                        
-                        image_url = await provider.generate_image(image_prompt)
-                        
-                        if image_url:
-                            content_data["image_url"] = image_url
-                            print(f"[Generation] ✓ Image generated for slide {i+1}, length={len(image_url)}")
-                            image_count += 1
-                        else:
-                            print(f"[Generation] ✗ No image returned for slide {i+1}")
-                    except Exception as e:
-                        print(f"[Generation] ✗ Failed to generate image for slide {i+1}: {e}")
-                        import traceback
-                        traceback.print_exc()
-                elif image_prompt and image_count >= max_images:
-                    print(f"[Generation] Skipping image for slide {i+1} (max reached)")
-                
-                slide_style = slide_outline.get("style", {})
-                
-                slide = {
-                    "id": str(uuid.uuid4()),
-                    "type": slide_type,
-                    "content": content_data,
-                    "layout": {"type": slide_type},
-                    "style": {**slide_style, "theme": theme}
-                }
-                slides.append(slide)
-                
-                # Update progress
-                progress = 40 + int((i + 1) / len(outline_slides) * 40)
-                with SyncSessionLocal() as db2:
-                    t = db2.query(GenerationTask).filter(GenerationTask.id == task_id).first()
-                    if t:
-                        t.progress = min(progress, 80)
-                        db2.commit()
-            
-            # Step 4: Create presentation
-            with SyncSessionLocal() as db2:
-                t = db2.query(GenerationTask).filter(GenerationTask.id == task_id).first()
-                if t:
-                    t.progress = 90
-                    db2.commit()
-            
-            # Create presentation using sync DB
-            with SyncSessionLocal() as db2:
-                presentation = Presentation(
-                    user_id=task.user_id,
-                    title=outline.get("title", "Untitled Presentation"),
-                    slides=slides,
-                    ai_prompt=task.prompt,
-                    ai_parameters=params,
-                    status="draft",
-                    version=1
-                )
-                db2.add(presentation)
-                db2.commit()
-                db2.refresh(presentation)
-                
-                # Update task completion
-                t = db2.query(GenerationTask).filter(GenerationTask.id == task_id).first()
-                if t:
-                    t.status = "completed"
-                    t.progress = 100
-                    t.ppt_id = presentation.id
-                    t.result = {
-                        "ppt_id": str(presentation.id),
-                        "title": presentation.title,
-                        "slide_count": len(slides)
-                    }
-                    t.completed_at = utcnow_aware()
-                    db2.commit()
-                
-                print(f"[Generation] Task {task_id} completed, PPT: {presentation.id}")
+
+        # Get parameters
+        params = task.parameters or {}
+        num_slides = params.get("num_slides", 10)
+        language = params.get("language", "zh")
+        style = params.get("style", "business")
+
+        # Artifacts from a previous attempt of this task
+        checkpoint = dict(task.checkpoint or {})
+
+        # Step 2: Generate outline
+        _set_progress(task_id, 20)
+
+        if "outline" in checkpoint:
+            outline = checkpoint["outline"]
+            truncated = checkpoint.get("truncated", False)
+            print(f"[Generation] Resuming task {task_id} from checkpointed outline")
+        else:
+            outline = run_async(_generate_outline(task, num_slides, language, style))
+            # Set by the provider when a truncated outline was salvaged
+            truncated = outline.pop("truncated", False)
+
+        # Step 3: Plan per-slide work, skipping what a previous attempt finished
+        slides, image_jobs, enrich_jobs = _build_slides(outline, params)
+        _save_checkpoint(task_id, {
+            "outline": outline,
+            "truncated": truncated,
+            "planned_images": len(image_jobs)
+        })
+        _set_progress(task_id, 40)
+
+        images = checkpoint.get("images") or {}
+        enriched = checkpoint.get("enriched") or {}
+        image_jobs = [
+            (i, prompt) for i, prompt in image_jobs
+            if str(i) not in images or not Path(images[str(i)]).exists()
+        ]
+
+        deck_context = f"{outline.get('title', '')}\n{outline.get('summary', '')}"
+        enrich_args = []
+        for i in enrich_jobs:
+            if str(i) in enriched:
+                continue
+            content = slides[i]["content"]
+            current = "\n".join(content.get("bullets") or []) or content.get("text", "")
+            context = f"{deck_context}\nCurrent slide content: {current}"
+            enrich_args.append((i, (content.get("title", ""), slides[i]["type"], context, language)))
+
+        print(f"[Generation] {len(image_jobs)} images, {len(enrich_args)} slides to enrich")
+        return image_jobs, enrich_args
+
+
+async def _generate_outline(task: GenerationTask, num_slides: int, language: str, style: str) -> dict:
+    provider = await _create_provider(task)
+    return await provider.generate_ppt_outline(
+        prompt=task.prompt,
+        num_slides=num_slides,
+        language=language,
+        style=style
+    )
+
+
+def _build_slides(outline: dict, params: dict) -> Tuple[list, List[Tuple[int, str]], List[int]]:
+    """
+    Build slide dicts from the outline
+
+    Returns:
+        (slides, (slide index, image prompt) jobs, indexes of slides to enrich)
+    """
+    theme = outline.get("theme", {})
+    slides = []
+    outline_slides = outline.get("slides", [])
+
+    # Debug: Print outline structure
+    print(f"[Generation] Got {len(outline_slides)} slides from outline")
+    for idx, s in enumerate(outline_slides[:3]):
+        print(f"[Generation] Slide {idx}: type={s.get('type')}, has_image_prompt={'image_prompt' in s}")
+
+    # Generate images for slides with image_prompt; request pacing is
+    # handled by the provider's shared per-key rate limiter
+    max_images = settings.AI_MAX_IMAGES
+    image_jobs = []
+    enrich_jobs = []
+    enrich = params.get("enrich_content", False)
+
+    for i, slide_outline in enumerate(outline_slides):
+        slide_type = slide_outline.get("type", "content")
+        title = slide_outline.get("title", "")
+
+        # Debug image_prompt
+        if slide_outline.get("image_prompt"):
+            print(f"[Generation] Slide {i} ({slide_type}) has image_prompt: {slide_outline['image_prompt'][:50]}...")
+
+        # Build content based on layout type
+        content_data = {"title": title}
+
+        if slide_type == "title":
+            content_data["subtitle"] = slide_outline.get("subtitle", "")
+        elif slide_type == "section":
+            content_data["description"] = slide_outline.get("description", "")
+        elif slide_type == "two-column":
+            left = slide_outline.get("left", {})
+            right = slide_outline.get("right", {})
+            content_data["left"] = {
+                "title": left.get("title", ""),
+                "points": left.get("points", [])
+            }
+            content_data["right"] = {
+                "title": right.get("title", ""),
+                "points": right.get("points", [])
+            }
+        elif slide_type == "timeline":
+            events = slide_outline.get("events", [])
+            content_data["events"] = events if events else []
+        elif slide_type == "process":
+            steps = slide_outline.get("steps", [])
+            content_data["steps"] = steps if steps else []
+        elif slide_type == "grid":
+            items = slide_outline.get("items", [])
+            content_data["items"] = items if items else []
+        elif slide_type == "comparison":
+            items = slide_outline.get("items", [])
+            content_data["items"] = items if items else []
+        elif slide_type == "data":
+            stats = slide_outline.get("stats", [])
+            content_data["stats"] = stats if stats else []
+        elif slide_type == "quote":
+            content_data["quote"] = slide_outline.get("quote", "")
+            content_data["author"] = slide_outline.get("author", "")
+            content_data["title"] = slide_outline.get("title", "")
+        elif slide_type == "image-text":
+            content_data["image_url"] = slide_outline.get("image_url", "")
+            content_data["text"] = slide_outline.get("text", "")
+        else:  # content
+            points = slide_outline.get("points", [])
+            content_data["bullets"] = points
+            content_data["text"] = slide_outline.get("content", "")
+
+        image_prompt = slide_outline.get("image_prompt")
+        if image_prompt and len(image_jobs) < max_images:
+            image_jobs.append((i, image_prompt))
+        elif image_prompt:
+            print(f"[Generation] Skipping image for slide {i+1} (max reached)")
+
+        if enrich and _is_thin_slide(slide_type, content_data):
+            enrich_jobs.append(i)
+
+        slide_style = slide_outline.get("style", {})
+
+        slide = {
+            "id": str(uuid.uuid4()),
+            "type": slide_type,
+            "content": content_data,
+            "layout": {"type": slide_type},
+            "style": {**slide_style, "theme": theme}
+        }
+        slides.append(slide)
+
+    return slides, image_jobs, enrich_jobs
+
+
+@celery_app.task
+def generate_slide_image(task_id: str, i: int, image_prompt: str):
+    """
+    Generate the image of one slide and checkpoint it
+
+    Never raises: a missing image must not fail the chord, the slide is
+    rendered without it as before.
+    """
+    try:
+        with SyncSessionLocal() as db:
+            task = _load_task(db, task_id)
+        if not task:
+            return None
+
+        print(f"[Generation] Generating image for slide {i+1}")
+        print(f"[Generation] Prompt: {image_prompt[:80]}...")
+
+        image_url = run_async(_generate_slide_image(task, image_prompt))
+        if not image_url:
+            print(f"[Generation] ✗ No image returned for slide {i+1}")
+            return None
+
+        print(f"[Generation] ✓ Image generated for slide {i+1}, length={len(image_url)}")
+        ref = _store_checkpoint_image(task_id, i, image_url)
+
+        def record(checkpoint: dict) -> Optional[int]:
+            images = checkpoint.setdefault("images", {})
+            images[str(i)] = ref
+            planned = checkpoint.get("planned_images") or len(images)
+            return 40 + int(min(len(images), planned) / planned * 40)
+
+        _update_checkpoint(task_id, record)
+        return i
+    except Exception as e:
+        print(f"[Generation] ✗ Failed to generate image for slide {i+1}: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+async def _generate_slide_image(task: GenerationTask, image_prompt: str) -> str:
+    provider = await _create_provider(task)
+    async with provider_slot(task.provider):
+        return await provider.generate_image(image_prompt)
+
+
+@celery_app.task
+def enrich_slide(task_id: str, i: int, title: str, slide_type: str, context: str, language: str):
+    """Expand one thin slide with generate_slide_content and checkpoint it"""
+    try:
+        with SyncSessionLocal() as db:
+            task = _load_task(db, task_id)
+        if not task:
+            return None
+
+        text = run_async(_enrich_slide(task, title, slide_type, context, language))
+        if not text:
+            return None
+
+        lines = _markdown_lines(text)
+        if not lines:
+            return None
+
+        _update_checkpoint(task_id, lambda checkpoint: checkpoint.setdefault("enriched", {}).update({str(i): lines}))
+        print(f"[Generation] ✓ Enriched slide {i+1}")
+        return i
+    except Exception as e:
+        print(f"[Generation] ✗ Failed to enrich slide {i+1}: {e}")
+
+
+async def _enrich_slide(task: GenerationTask, title: str, slide_type: str, context: str, language: str) -> str:
+    provider = await _create_provider(task)
+    async with provider_slot(task.provider):
+        return await provider.generate_slide_content(
+            title=title,
+            slide_type=slide_type,
+            context=context,
+            language=language
+        )
+
+
+@celery_app.task(bind=True, max_retries=3)
+def assemble_generation(self, task_id: str):
+    """Build the presentation from the checkpointed stage outputs"""
+    try:
+        ppt_id = _assemble_generation(task_id)
+    except Exception as exc:
+        print(f"[Generation] Task {task_id} assemble error: {exc}")
+        raise self.retry(exc=exc, countdown=_retry_countdown(self.request.retries))
+
+    # Previews are optional: a dispatch failure must not retry the assemble
+    if ppt_id:
+        try:
+            generate_thumbnails.apply_async((ppt_id,), priority=PRIORITY_BULK)
+        except Exception as exc:
+            print(f"[Generation] Task {task_id} thumbnail dispatch failed: {exc}")
+    return ppt_id
+
+
+def _assemble_generation(task_id: str) -> Optional[str]:
+    with SyncSessionLocal() as db:
+        task = _load_task(db, task_id)
+        if not task:
+            shutil.rmtree(_checkpoint_dir(task_id), ignore_errors=True)
+            return None
+
+        checkpoint = task.checkpoint or {}
+        params = task.parameters or {}
+        outline = checkpoint["outline"]
+        slides, _, _ = _build_slides(outline, params)
+
+        for i, image_url in _load_checkpoint_images(checkpoint).items():
+            slides[i]["content"]["image_url"] = image_url
+        for i, lines in (checkpoint.get("enriched") or {}).items():
+            _apply_enrichment(slides[int(i)], lines)
+
+        # Step 4: Create presentation
+        task.progress = 90
+        presentation = Presentation(
+            user_id=task.user_id,
+            title=outline.get("title", "Untitled Presentation"),
+            slides=slides,
+            ai_prompt=task.prompt,
+            ai_parameters=params,
+            status="draft",
+            version=1
+        )
+        db.add(presentation)
+        db.flush()
+
+        # Update task completion in the same transaction so a retry
+        # never creates a second presentation
+        task.status = "completed"
+        task.progress = 100
+        task.ppt_id = presentation.id
+        task.checkpoint = None
+        task.result = {
+            "ppt_id": str(presentation.id),
+            "title": presentation.title,
+            "slide_count": len(slides),
+            "requested_slides": params.get("num_slides", 10),
+            "truncated": checkpoint.get("truncated", False)
+        }
+        task.completed_at = utcnow_aware()
+        db.commit()
+
+        print(f"[Generation] Task {task_id} completed, PPT: {presentation.id}")
+
+    shutil.rmtree(_checkpoint_dir(task_id), ignore_errors=True)
+    return str(presentation.id)
+
+
+def _is_thin_slide(slide_type: str, content: dict) -> bool:
+    """Whether a text slide has too little content and should be enriched"""
+    if slide_type not in ("content", "image-text"):
+        return False
+    text = content.get("text") or ""
+    bullets = content.get("bullets") or []
+    return len(text) < settings.AI_ENRICH_MIN_CHARS and len(bullets) < 2
+
+
+# Markdown the provider uses in generate_slide_content output
+_MD_PREFIX = re.compile(r"^\s*(?:#{1,6}\s+|>\s*|[-*+•]\s+|\d+[.)]\s+)+")
+_MD_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_MD_EMPHASIS = re.compile(r"(\*\*|__|\*|`)")
+_MD_RULE = re.compile(r"^\s*(?:[-*_]\s*){3,}$")
+
+
+def _markdown_lines(text: str) -> List[str]:
+    """Plain-text lines of markdown slide content, without list markers"""
+    lines = []
+    for line in text.splitlines():
+        if _MD_RULE.match(line):
+            continue
+        line = _MD_PREFIX.sub("", line)
+        line = _MD_EMPHASIS.sub("", _MD_LINK.sub(r"\1", line)).strip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+def _apply_enrichment(slide: dict, lines: List[str]) -> None:
+    """
+    Put enriched lines where the slide's layout renders them
+
+    The content layout draws bullets and skips text when bullets exist,
+    so there each line becomes a bullet; image-text only draws text.
+    """
+    content = slide["content"]
+    if slide["type"] == "content":
+        content["bullets"] = lines
+        content["text"] = ""
+    else:
+        content["text"] = "\n".join(lines)
+
+
+def _set_progress(task_id: str, progress: int) -> None:
+    """Update generation task progress"""
+    with SyncSessionLocal() as db:
+        t = db.query(GenerationTask).filter(GenerationTask.id == task_id).first()
+        if t:
+            t.progress = progress
+            db.commit()
+
+
+def _checkpoint_dir(task_id: str) -> Path:
+    """Blob directory holding checkpointed images of a task"""
+    return Path(settings.STORAGE_LOCAL_PATH) / "generation" / str(task_id)
+
+
+def _save_checkpoint(task_id: str, values: dict) -> None:
+    """Merge values into the task checkpoint so a retry can resume from it"""
+    _update_checkpoint(task_id, lambda current: current.update(values))
+
+
+def _update_checkpoint(task_id: str, mutate) -> None:
+    """
+    Apply mutate to the task checkpoint under a row lock
+
+    Stage subtasks of one task run concurrently on different workers; the
+    lock keeps their read-modify-write of the JSON column from racing.
+    mutate may return a new progress value.
+    """
+    with SyncSessionLocal() as db:
+        t = db.query(GenerationTask).filter(GenerationTask.id == task_id).with_for_update().first()
+        if t:
+            checkpoint = dict(t.checkpoint or {})
+            progress = mutate(checkpoint)
+            t.checkpoint = checkpoint
+            if progress is not None:
+                t.progress = progress
+            db.commit()
+
+
+def _store_checkpoint_image(task_id: str, i: int, image_url: str) -> str:
+    """Write a generated image to the blob store, returning its ref"""
+    path = _checkpoint_dir(task_id) / f"slide_{i}.txt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(image_url, encoding="utf-8")
+    return str(path)
+
+
+def _load_checkpoint_images(checkpoint: dict) -> Dict[int, str]:
+    """Read checkpointed images back, skipping refs whose blob is gone"""
+    images = {}
+    for i, ref in (checkpoint.get("images") or {}).items():
+        try:
+            images[int(i)] = Path(ref).read_text(encoding="utf-8")
+        except OSError:
+            print(f"[Generation] Checkpointed image for slide {int(i)+1} missing, skipped")
+    return images
 
 
 @celery_app.task
@@ -304,16 +577,16 @@ def cleanup_stalled_tasks(max_minutes: int = 30):
     with SyncSessionLocal() as db:
         from datetime import timedelta
         cutoff_time = utcnow_aware() - timedelta(minutes=max_minutes)
-        
+
         stalled_tasks = db.query(GenerationTask).filter(
             GenerationTask.status == "processing",
             GenerationTask.updated_at < cutoff_time
         ).all()
-        
+
         for task in stalled_tasks:
             task.status = "failed"
             task.error_message = f"Task processing timeout (exceeded {max_minutes} minutes)"
             print(f"[Cleanup] Marked timed out task: {task.id}")
-        
+
         db.commit()
         return len(stalled_tasks)
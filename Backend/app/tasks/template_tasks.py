@@ -0,0 +1,26 @@
+"""
+模板任务
+定时将 Redis 中累计的模板使用次数批量写入数据库
+"""
+
+import asyncio
+
+from app.services.template_usage import flush_usage
+from app.tasks import celery_app
+
+
+@celery_app.task
+def flush_template_usage() -> int:
+    """批量写入模板使用次数，返回写入的使用次数"""
+    return asyncio.run(_flush_template_usage_async())
+
+
+async def _flush_template_usage_async() -> int:
+    from app.database import AsyncSessionLocal
+    
+    async with AsyncSessionLocal() as db:
+        applied = await flush_usage(db)
+    
+    if applied:
+        print(f"[TemplateUsage] 写入 {applied} 次模板使用")
+    return applied
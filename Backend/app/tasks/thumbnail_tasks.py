@@ -0,0 +1,91 @@
+"""
+缩略图任务
+在生成完成和编辑之后异步渲染幻灯片缩略图，并把缩略图键写回 PPT
+"""
+
+import asyncio
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.models.presentation import Presentation
+from app.services.thumbnail_service import get_thumbnail_service
+from app.tasks import celery_app
+from app.utils.datetime import utcnow_aware
+
+_COLUMNS = (Presentation.id, Presentation.slides, Presentation.version, Presentation.thumbnail_keys)
+
+
+@celery_app.task
+def generate_thumbnails(ppt_id: str) -> int:
+    """
+    为一个 PPT 生成缺失的缩略图（生成完成后分发）
+
+    Args:
+        ppt_id: PPT ID
+    """
+    return asyncio.run(_generate_thumbnails_async(ppt_id))
+
+
+async def _generate_thumbnails_async(ppt_id: str) -> int:
+    from app.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(*_COLUMNS).where(Presentation.id == ppt_id))
+        row = result.one_or_none()
+        if row is None or not row.slides:
+            return 0
+
+        written = await _render_and_store(db, row)
+
+    print(f"[Thumbnail] PPT {ppt_id} 生成 {written} 张缩略图")
+    return written
+
+
+@celery_app.task
+def refresh_recent_thumbnails(window_seconds: Optional[int] = None) -> int:
+    """
+    为最近编辑过的 PPT 补生成缩略图
+
+    编辑接口不直接分发任务，请求路径不依赖消息队列；由定时任务扫描
+    最近更新的 PPT。缩略图按内容寻址，未修改的页面直接跳过。
+
+    Args:
+        window_seconds: 扫描最近多少秒内更新的 PPT，默认为两个扫描间隔
+    """
+    window = window_seconds or settings.THUMBNAIL_SWEEP_SECONDS * 2
+    return asyncio.run(_refresh_recent_thumbnails_async(window))
+
+
+async def _refresh_recent_thumbnails_async(window_seconds: int) -> int:
+    from app.database import AsyncSessionLocal
+
+    cutoff_time = utcnow_aware() - timedelta(seconds=window_seconds)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(*_COLUMNS).where(Presentation.updated_at >= cutoff_time))
+        rows = result.all()
+
+        written = 0
+        for row in rows:
+            written += await _render_and_store(db, row)
+
+    if written:
+        print(f"[Thumbnail] 为 {len(rows)} 个最近编辑的 PPT 生成 {written} 张缩略图")
+    return written
+
+
+async def _render_and_store(db, row) -> int:
+    """渲染缺失的缩略图，键有变化时写回 PPT"""
+    written, keys = await get_thumbnail_service().generate(row.slides or [])
+    if keys != (row.thumbnail_keys or {}):
+        # 渲染期间 PPT 被编辑（版本号变化）则不写入，由下次扫描按新内容处理；
+        # 保留 updated_at，避免写入缩略图键使 PPT 被视为刚编辑
+        await db.execute(
+            update(Presentation)
+            .where(Presentation.id == row.id, Presentation.version == row.version)
+            .values(thumbnail_keys=keys, updated_at=Presentation.updated_at)
+        )
+        await db.commit()
+    return written
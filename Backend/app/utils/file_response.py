@@ -0,0 +1,140 @@
+"""
+Conditional and ranged file responses.
+
+Starlette 0.38's FileResponse sends whole files only; this adds ETag /
+If-None-Match revalidation and single-range (HTTP 206) requests on top of it.
+"""
+
+import mimetypes
+import re
+from email.utils import formatdate
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+_CHUNK_SIZE = 64 * 1024
+
+
+def file_response(
+    request: Request,
+    path: Path,
+    filename: Optional[str] = None,
+    media_type: Optional[str] = None,
+    cache_control: str = "private, max-age=3600"
+) -> Response:
+    """
+    Serve a file with ETag, conditional GET and Range support
+
+    Full responses go through FileResponse, which the server can send with
+    sendfile; ranges are streamed in chunks.
+
+    Args:
+        request: Incoming request (reads If-None-Match, Range, If-Range)
+        path: File to send
+        filename: Download name for Content-Disposition
+        media_type: Content type, guessed from filename when omitted
+        cache_control: Cache-Control header value
+    """
+    stat = path.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    filename = filename or path.name
+    media_type = media_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+        "cache-control": cache_control,
+        "content-disposition": content_disposition(filename),
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if request.headers.get("range") and (if_range is None or if_range == etag):
+        byte_range = _parse_range(request.headers["range"], stat.st_size)
+        if byte_range == (-1, -1):
+            return Response(
+                status_code=416,
+                headers={**headers, "content-range": f"bytes */{stat.st_size}"}
+            )
+
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
+
+    start, end = byte_range
+    headers["content-range"] = f"bytes {start}-{end}/{stat.st_size}"
+    headers["content-length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_range(path, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=headers
+    )
+
+
+def content_disposition(filename: str) -> str:
+    """Attachment header value, RFC 5987 encoded for non-ASCII names"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag"""
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range
+
+    Returns:
+        (start, end) inclusive; None to ignore the header and send the
+        whole file (malformed or multiple ranges); (-1, -1) if unsatisfiable
+    """
+    match = _RANGE.fullmatch(header.strip())
+    if match is None or size == 0:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return -1, -1
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size:
+        return -1, -1
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+async def _iter_range(path: Path, start: int, end: int) -> AsyncIterator[bytes]:
+    remaining = end - start + 1
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        while remaining > 0:
+            chunk = await f.read(min(_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
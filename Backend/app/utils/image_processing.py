@@ -0,0 +1,96 @@
+"""
+Image normalization for export.
+
+Generated images are full-resolution PNGs, far larger than the slide box
+they are shown in. normalize_image downsizes them to the pixel size the
+box needs at the export quality's DPI and recompresses opaque images as
+JPEG. PowerPoint does not reliably open WebP parts, so WebP is not used.
+"""
+
+import hashlib
+from collections import OrderedDict
+from io import BytesIO
+from threading import Lock
+from typing import Tuple
+
+from PIL import Image
+
+# Pixels per inch of slide box (PowerPoint's "Web" and "Print" compression
+# presets), and JPEG quality, per export quality
+QUALITY_DPI = {"standard": 150, "high": 220}
+JPEG_QUALITY = {"standard": 80, "high": 90}
+
+_CACHE_SIZE = 64
+_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+_cache_lock = Lock()
+
+
+def normalize_image(data: bytes, box: Tuple[float, float], quality: str = "standard") -> bytes:
+    """
+    Resize and recompress an image for a slide box
+
+    The image is scaled down (never up) so it still covers the box at the
+    target DPI. Results are cached per (content hash, box, quality).
+
+    Args:
+        data: Encoded image bytes
+        box: Box size in inches (width, height)
+        quality: Export quality, "standard" or "high"
+
+    Returns:
+        Encoded image bytes; the original if it cannot be made smaller
+    """
+    key = (hashlib.sha256(data).digest(), box, quality)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    try:
+        result = _normalize(data, box, quality)
+    except Exception as e:
+        print(f"[Export] Image normalization failed, embedding original: {e}")
+        result = data
+
+    with _cache_lock:
+        _cache[key] = result
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def _normalize(data: bytes, box: Tuple[float, float], quality: str) -> bytes:
+    dpi = QUALITY_DPI.get(quality, QUALITY_DPI["standard"])
+    image = Image.open(BytesIO(data))
+    image.load()
+
+    target_w, target_h = box[0] * dpi, box[1] * dpi
+    scale = max(target_w / image.width, target_h / image.height)
+    if scale < 1:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+    elif image.format == "JPEG":
+        # Already compact and no larger than needed
+        return data
+
+    output = BytesIO()
+    if _has_alpha(image):
+        image.save(output, format="PNG", optimize=True)
+    else:
+        image.convert("RGB").save(
+            output,
+            format="JPEG",
+            quality=JPEG_QUALITY.get(quality, JPEG_QUALITY["standard"]),
+            optimize=True,
+            progressive=True
+        )
+
+    result = output.getvalue()
+    return result if len(result) < len(data) else data
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    """Whether the image uses transparency (which JPEG cannot keep)"""
+    if image.mode in ("RGBA", "LA"):
+        return image.getextrema()[-1][0] < 255
+    return image.mode == "P" and "transparency" in image.info
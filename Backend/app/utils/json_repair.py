@@ -0,0 +1,222 @@
+"""
+Tolerant JSON parsing for LLM output.
+
+Strips markdown fences, tracks string and bracket state and repairs
+truncated documents in a single scan. Uses orjson when it is installed.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+# A complete JSON string literal (unrolled loop, matched in C)
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# Structural tokens outside strings, plus // and /* */ comments
+_TOKEN = re.compile(r'[{}\[\]",:]|//[^\n]*|/\*.*?(?:\*/|\Z)', re.DOTALL)
+# A scalar value cut off at the very end of the text
+_LITERAL = re.compile(r'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null')
+# Well-formed prefix of an unterminated string, and a half-written \u escape
+_OPEN_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_PARTIAL_UNICODE = re.compile(r'(?<!\\)((?:\\\\)*)\\u[0-9a-fA-F]{0,3}\Z')
+_FENCE_LANG = re.compile(r'[A-Za-z0-9_-]*')
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def loads(text: str) -> Any:
+    """Parse JSON with orjson if available, falling back to json"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def strip_code_fence(content: str) -> str:
+    """
+    Return the body of the first ``` code block, or content unchanged
+
+    A missing closing fence (truncated output) keeps the rest of the text.
+    """
+    fence = content.find("```")
+    if fence == -1:
+        return content
+    body_start = _FENCE_LANG.match(content, fence + 3).end()
+    body_end = content.find("```", body_start)
+    if body_end == -1:
+        body_end = len(content)
+    return content[body_start:body_end]
+
+
+def repair_json(content: str, salvage: bool = False) -> Tuple[str, bool]:
+    """
+    Repair a JSON document embedded in LLM output in one scan
+
+    Handles:
+    1. Markdown code fences and surrounding prose
+    2. // and /* */ comments, trailing commas
+    3. Truncation: closes the open string and all open containers,
+       dropping a dangling key or partial literal
+
+    Args:
+        content: Raw model output
+        salvage: On truncation, cut back to the last complete item of the
+                 outermost open array (e.g. drop the partial trailing slide)
+                 instead of keeping partial values
+
+    Returns:
+        (repaired JSON text, whether the input was truncated)
+    """
+    text = strip_code_fence(content)
+    start = text.find("{")
+    if start == -1:
+        start = text.find("[")
+    if start == -1:
+        return text.strip(), False
+
+    stack: List[str] = []
+    drops: List[Tuple[int, int]] = []  # spans removed from the output
+    prev = ""  # last token: { [ } ] , : or k (key) / v (string value)
+    last_comma = -1
+    safe = start  # cut position after the last complete value
+    safe_at = [start]  # latest safe position per stack depth
+    open_string = -1
+    end = -1
+    pos = start
+
+    while True:
+        match = _TOKEN.search(text, pos)
+        if match is None:
+            break
+        char = text[match.start()]
+
+        if char == '"':
+            string = _STRING.match(text, match.start())
+            if string is None:
+                open_string = match.start()
+                break
+            pos = string.end()
+            if stack and stack[-1] == "{" and prev in ("{", ","):
+                prev = "k"
+            else:
+                prev = "v"
+                safe = safe_at[len(stack)] = pos
+            continue
+
+        pos = match.end()
+        if char in "{[":
+            stack.append(char)
+            prev = char
+            safe = pos
+            if len(safe_at) > len(stack):
+                safe_at[len(stack)] = pos
+            else:
+                safe_at.append(pos)
+        elif char in "}]":
+            if prev == "," and not text[last_comma + 1:match.start()].strip():
+                drops.append((last_comma, last_comma + 1))
+            if stack:
+                stack.pop()
+            prev = char
+            if not stack:
+                end = pos
+                break
+            safe = safe_at[len(stack)] = pos
+        elif char == ",":
+            prev = ","
+            last_comma = match.start()
+            safe = safe_at[len(stack)] = last_comma
+        elif char == ":":
+            prev = ":"
+        else:
+            drops.append((match.start(), pos))
+
+    if end != -1:
+        return _splice(text, start, end, drops), False
+
+    if salvage and "[" in stack:
+        # Only keep items that were complete inside the outermost open array
+        depth = stack.index("[") + 1
+        cut = max(safe_at[1:depth + 1])
+        depth = max(d for d in range(1, depth + 1) if safe_at[d] == cut)
+        closers = "".join(_CLOSERS[opener] for opener in reversed(stack[:depth]))
+        return _splice(text, start, cut, drops) + closers, True
+
+    suffix = ""
+    expects_value = prev == ":" or (stack and stack[-1] == "[" and prev in ("[", ","))
+    if open_string != -1:
+        if expects_value:
+            # Keep the partial string value, minus any half-written escape
+            cut = _OPEN_STRING.match(text, open_string).end()
+            partial = _PARTIAL_UNICODE.search(text, open_string, cut)
+            if partial:
+                cut = partial.start() + len(partial.group(1))
+            suffix = '"'
+        else:
+            cut = safe
+    elif expects_value and _LITERAL.fullmatch(text[pos:].strip()):
+        cut = len(text.rstrip())
+    else:
+        cut = safe
+
+    closers = "".join(_CLOSERS[opener] for opener in reversed(stack))
+    return _splice(text, start, cut, drops) + suffix + closers, True
+
+
+def _splice(text: str, start: int, stop: int, drops: List[Tuple[int, int]]) -> str:
+    """Slice text[start:stop] with the dropped spans removed"""
+    parts = []
+    cursor = start
+    for drop_start, drop_end in drops:
+        if drop_start >= stop:
+            break
+        parts.append(text[cursor:drop_start])
+        cursor = drop_end
+    parts.append(text[cursor:stop])
+    return "".join(parts)
+
+
+def robust_json_parse(content: str) -> Dict:
+    """
+    Robust JSON parser
+
+    Tries a direct parse of the (unfenced) content first and only runs the
+    single-pass repair when that fails.
+    """
+    try:
+        return loads(strip_code_fence(content).strip())
+    except ValueError:
+        pass
+
+    repaired, _ = repair_json(content)
+    try:
+        return loads(repaired)
+    except ValueError:
+        pass
+
+    raise ValueError(f"Cannot parse JSON content: {content[:200]}...")
+
+
+def salvage_json_parse(content: str) -> Tuple[Dict, bool]:
+    """
+    Parse possibly truncated output, keeping only complete array items
+
+    Returns:
+        (parsed data, whether the output was truncated and salvaged)
+    """
+    try:
+        return loads(strip_code_fence(content).strip()), False
+    except ValueError:
+        pass
+
+    repaired, truncated = repair_json(content, salvage=True)
+    try:
+        return loads(repaired), truncated
+    except ValueError:
+        pass
+
+    raise ValueError(f"Cannot parse JSON content: {content[:200]}...")
@@ -0,0 +1,47 @@
+"""
+Shared async Redis client for optional Redis-backed features.
+
+One client per event loop (Celery tasks run a loop per task). After a
+connection failure Redis is skipped for REDIS_RETRY_AFTER seconds, so
+callers take their non-Redis path at once instead of waiting on timeouts.
+"""
+
+import asyncio
+import time
+import weakref
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+# Errors meaning "Redis unavailable": fall back and mark it down
+REDIS_ERRORS = (aioredis.RedisError, OSError)
+REDIS_RETRY_AFTER = 30
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = (
+    weakref.WeakKeyDictionary()
+)
+_down_until = 0.0
+
+
+def get_redis() -> Optional[aioredis.Redis]:
+    """Redis client for the running loop, or None while Redis is down"""
+    if time.monotonic() < _down_until:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = aioredis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=2
+        )
+    return client
+
+
+def mark_redis_down(tag: str, fallback: str, exc: Exception) -> None:
+    """Skip Redis for REDIS_RETRY_AFTER seconds after a failure"""
+    global _down_until
+    _down_until = time.monotonic() + REDIS_RETRY_AFTER
+    print(f"[{tag}] Redis unavailable, {fallback} for {REDIS_RETRY_AFTER}s: {exc}")
@@ -0,0 +1,140 @@
+"""
+Streaming zip archives.
+
+ZipStream appends entries to any writable sink (a file, an HTTP response
+pipe, a blob-store upload) without ever seeking back: each entry is
+followed by a data descriptor, so bytes are final as soon as they are
+written. Files are copied into the archive in chunks as they become ready,
+and a reader can stream a zip that is still being built (follow_file).
+"""
+
+import asyncio
+import shutil
+import zipfile
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional, Set
+
+import anyio
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def partial_path(path: Path) -> Path:
+    """Where an archive is written until complete (then renamed to path)"""
+    path = Path(path)
+    return path.with_name(f"{path.name}.part")
+
+
+class _AppendOnly:
+    """Sink wrapper without tell/seek, so zipfile never rewrites headers"""
+
+    def __init__(self, sink: BinaryIO):
+        self._sink = sink
+
+    def write(self, data: bytes) -> int:
+        return self._sink.write(data)
+
+    def flush(self) -> None:
+        flush = getattr(self._sink, "flush", None)
+        if flush is not None:
+            flush()
+
+
+class ZipStream:
+    """
+    Zip archive written front to back
+
+    Usage:
+        with open(path, "wb") as sink, ZipStream(sink) as archive:
+            archive.add_file(rendered_path, "slide_1.png")
+    """
+
+    def __init__(self, sink: BinaryIO, compression: int = zipfile.ZIP_STORED):
+        self._sink = _AppendOnly(sink)
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=compression)
+        self._names: Set[str] = set()
+
+    def add_file(self, path: Path, arcname: Optional[str] = None) -> str:
+        """
+        Append a file, copied in chunks
+
+        Returns:
+            The entry name, suffixed " (2)", " (3)"... if already taken
+        """
+        path = Path(path)
+        name = self._unique(arcname or path.name)
+        info = zipfile.ZipInfo.from_file(path, name)
+        info.compress_type = self._zip.compression
+        large = path.stat().st_size > zipfile.ZIP64_LIMIT
+        with open(path, "rb") as src, self._zip.open(info, "w", force_zip64=large) as dst:
+            shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+        self._sink.flush()
+        return name
+
+    def add_bytes(self, arcname: str, data: bytes) -> str:
+        """Append an in-memory entry"""
+        name = self._unique(arcname)
+        self._zip.writestr(name, data)
+        self._sink.flush()
+        return name
+
+    def close(self) -> None:
+        """Write the central directory"""
+        self._zip.close()
+        self._sink.flush()
+
+    def __enter__(self) -> "ZipStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _unique(self, name: str) -> str:
+        stem, dot, suffix = name.rpartition(".")
+        if not dot:
+            stem, suffix = name, ""
+        candidate, index = name, 2
+        while candidate in self._names:
+            candidate = f"{stem} ({index}){dot}{suffix}"
+            index += 1
+        self._names.add(candidate)
+        return candidate
+
+
+async def follow_file(
+    path: Path,
+    final_path: Path,
+    poll_interval: float = 0.5,
+    idle_timeout: float = 600
+) -> AsyncIterator[bytes]:
+    """
+    Stream a file another process is still appending to
+
+    The writer renames path to final_path when it is done, and deletes
+    path if it fails. The open handle keeps reading the same file across
+    the rename.
+
+    Raises:
+        RuntimeError: The writer failed or stalled for idle_timeout seconds
+    """
+    idle = 0.0
+    async with await anyio.open_file(path, "rb") as f:
+        while True:
+            chunk = await f.read(_CHUNK_SIZE)
+            if chunk:
+                idle = 0.0
+                yield chunk
+                continue
+
+            if not path.exists():
+                if not final_path.exists():
+                    raise RuntimeError("Archive build failed")
+                # Finished: drain what was written before the rename
+                while chunk := await f.read(_CHUNK_SIZE):
+                    yield chunk
+                return
+
+            if idle >= idle_timeout:
+                raise RuntimeError("Archive build stalled")
+            await asyncio.sleep(poll_interval)
+            idle += poll_interval
@@ -0,0 +1,126 @@
+"""
+robust_json_parse microbenchmark
+
+Compares the single-pass parser in app.utils.json_repair against the
+previous regex + char-loop implementation on a corpus of outline outputs
+(fenced, prose-wrapped, trailing commas/comments, truncated).
+
+Usage (from Backend/):
+    python -m benchmarks.bench_json_parse [--number 50]
+"""
+
+import argparse
+import json
+import re
+import timeit
+from pathlib import Path
+
+from app.utils import json_repair
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+
+
+def legacy_robust_json_parse(content: str):
+    """Previous implementation, kept verbatim for comparison"""
+    if "```json" in content:
+        match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
+        if match:
+            content = match.group(1)
+    elif "```" in content:
+        match = re.search(r'```\s*(.*?)\s*```', content, re.DOTALL)
+        if match:
+            content = match.group(1)
+
+    content = content.strip()
+
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
+
+    try:
+        match = re.search(r'\{.*\}', content, re.DOTALL)
+        if match:
+            return json.loads(match.group(0))
+    except json.JSONDecodeError:
+        pass
+
+    fixed_content = _legacy_fix_json_content(content)
+    try:
+        return json.loads(fixed_content)
+    except json.JSONDecodeError:
+        pass
+
+    raise ValueError(f"Cannot parse JSON content: {content[:200]}...")
+
+
+def _legacy_fix_json_content(content: str) -> str:
+    content = re.sub(r'//.*?\n', '\n', content)
+    content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
+
+    in_string = False
+    escape = False
+    stack = []
+
+    for i, char in enumerate(content):
+        if escape:
+            escape = False
+            continue
+        if char == '\\':
+            escape = True
+            continue
+        if char == '"' and not in_string:
+            in_string = True
+            stack.append('"')
+        elif char == '"' and in_string:
+            in_string = False
+            if stack and stack[-1] == '"':
+                stack.pop()
+
+    if in_string:
+        content += '"'
+
+    closing_map = {'{': '}', '[': ']', '(': ')', '"': '"'}
+    while stack:
+        opener = stack.pop()
+        if opener in closing_map:
+            content += closing_map[opener]
+
+    content = re.sub(r',\s*}', '}', content)
+    content = re.sub(r',\s*]', ']', content)
+
+    return content
+
+
+def _run(parser, content: str):
+    try:
+        result = parser(content)
+        return True, len(result.get("slides", []))
+    except ValueError:
+        return False, 0
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--number", type=int, default=50, help="iterations per sample")
+    args = arg_parser.parse_args()
+
+    print(f"orjson: {'yes' if json_repair.orjson is not None else 'no'}")
+    print(f"{'sample':<26}{'KB':>6}  {'legacy ms':>10} {'slides':>7}  {'new ms':>8} {'slides':>7}  {'speedup':>8}")
+
+    for path in sorted(CORPUS_DIR.glob("*.txt")):
+        content = path.read_text(encoding="utf-8")
+        row = [f"{path.stem:<26}{len(content.encode()) / 1024:>6.1f}"]
+        timings = []
+        for parser in (legacy_robust_json_parse, json_repair.robust_json_parse):
+            ok, slides = _run(parser, content)
+            seconds = timeit.timeit(lambda: _run(parser, content), number=args.number)
+            ms = seconds / args.number * 1000
+            timings.append(ms)
+            row.append(f"{ms:>10.3f} {slides if ok else 'FAIL':>7}")
+        row.append(f"{timings[0] / timings[1]:>7.1f}x")
+        print("  ".join(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+AI Provider 测试（使用伪造的模型响应）
+"""
+
+import asyncio
+import json
+from collections import deque
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services.ai_provider import YunwuProvider
+
+
+def _response(content: str, finish_reason: str = "stop"):
+    """构造 chat.completions 响应"""
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)])
+
+
+@pytest.mark.asyncio
+async def test_chunked_outline_merges_batches(monkeypatch):
+    """测试大页数大纲分批生成并按顺序合并"""
+    monkeypatch.setattr(settings, "AI_OUTLINE_CHUNK_THRESHOLD", 3)
+    monkeypatch.setattr(settings, "AI_OUTLINE_BATCH_SIZE", 2)
+
+    skeleton = {
+        "title": "AI",
+        "summary": "摘要",
+        "theme": {"primary_color": "#1a365d"},
+        "slides": [{"type": "content", "title": f"第{i}页"} for i in range(1, 6)],
+    }
+
+    async def fake_create(**kwargs):
+        system_prompt = kwargs["messages"][0]["content"]
+        if "Full slide plan" not in system_prompt:
+            return _response(json.dumps(skeleton, ensure_ascii=False))
+        first = int(system_prompt.split("Write the full content for slides ")[1].split("-")[0])
+        if first == 3:
+            raise RuntimeError("batch failed")
+        count = 2 if first < 5 else 1
+        slides = [{"content": f"正文{first + i}", "image_prompt": "p"} for i in range(count)]
+        return _response(json.dumps({"slides": slides}, ensure_ascii=False))
+
+    provider = YunwuProvider("test-key")
+    monkeypatch.setattr(provider.client.chat.completions, "create", fake_create)
+
+    outline = await provider.generate_ppt_outline("关于人工智能的演示", num_slides=5)
+
+    assert outline["title"] == "AI"
+    assert [s["title"] for s in outline["slides"]] == [f"第{i}页" for i in range(1, 6)]
+    assert [s.get("content") for s in outline["slides"]] == ["正文1", "正文2", None, None, "正文5"]
+
+
+@pytest.mark.asyncio
+async def test_truncated_outline_is_salvaged(monkeypatch):
+    """测试截断的大纲保留完整页面并打上标记"""
+    content = '{"title": "AI", "slides": [{"type": "title", "title": "封面"}, {"type": "content", "title": "半'
+
+    async def fake_create(**kwargs):
+        return _response(content, finish_reason="length")
+
+    provider = YunwuProvider("test-key")
+    monkeypatch.setattr(provider.client.chat.completions, "create", fake_create)
+
+    outline = await provider.generate_ppt_outline("关于人工智能的演示", num_slides=2)
+
+    assert outline["truncated"] is True
+    assert outline["slides"] == [{"type": "title", "title": "封面"}]
+
+
+@pytest.mark.asyncio
+async def test_text_call_retries_transient_errors(monkeypatch):
+    """测试连接错误按退避策略重试后成功"""
+    monkeypatch.setattr(settings, "AI_RETRY_BASE_DELAY", 0.001)
+    attempts = []
+
+    async def fake_create(**kwargs):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("connection reset")
+        return _response('{"title": "AI", "slides": [{"type": "title", "title": "封面"}]}')
+
+    provider = YunwuProvider("test-key")
+    monkeypatch.setattr(provider.client.chat.completions, "create", fake_create)
+
+    outline = await provider.generate_ppt_outline("关于人工智能的演示", num_slides=1)
+
+    assert len(attempts) == 3
+    assert outline["title"] == "AI"
+
+
+@pytest.mark.asyncio
+async def test_text_call_does_not_retry_other_errors(monkeypatch):
+    """测试非瞬时错误不重试"""
+    attempts = []
+
+    async def fake_create(**kwargs):
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    provider = YunwuProvider("test-key")
+    monkeypatch.setattr(provider.client.chat.completions, "create", fake_create)
+
+    with pytest.raises(ValueError):
+        await provider.generate_slide_content("标题", "content", "上下文")
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_image_request_is_hedged(monkeypatch):
+    """测试慢图片请求超过延迟分位后发送对冲请求"""
+    monkeypatch.setattr(settings, "AI_IMAGE_HEDGE_ENABLED", True)
+    monkeypatch.setattr(YunwuProvider, "_image_latencies", deque([0.01] * 20, maxlen=100))
+    calls = []
+
+    async def fake_post(api_url, payload, headers):
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+        return "fast"
+
+    provider = YunwuProvider("test-key")
+    monkeypatch.setattr(provider, "_post_image_request", fake_post)
+
+    assert await provider._hedged_image_request("url", {}, {}) == "fast"
+    assert len(calls) == 2
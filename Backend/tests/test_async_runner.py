@@ -0,0 +1,51 @@
+"""
+任务协程运行器测试
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.tasks import async_runner
+from app.tasks.async_runner import run_async
+
+
+def test_fresh_loop_by_default(monkeypatch):
+    """测试默认模式下每次调用使用新的事件循环"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "CELERY_ASYNC_WORKER", False)
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    assert run_async(current_loop()) is not run_async(current_loop())
+
+
+def test_async_worker_shares_loop_with_cap(monkeypatch):
+    """测试异步模式下多线程任务共享常驻事件循环且受并发上限约束"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "CELERY_ASYNC_WORKER", True)
+    monkeypatch.setattr(settings, "CELERY_ASYNC_CONCURRENCY", 3)
+    monkeypatch.setattr(async_runner, "_loop", None)
+
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    async def job():
+        nonlocal active, max_active
+        with lock:
+            active += 1
+            max_active = max(max_active, active)
+        await asyncio.sleep(0.02)
+        with lock:
+            active -= 1
+        return asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        loops = list(pool.map(lambda _: run_async(job()), range(10)))
+
+    assert len(set(loops)) == 1
+    assert max_active == 3
+
+    loops[0].call_soon_threadsafe(loops[0].stop)
@@ -0,0 +1,38 @@
+"""
+Celery 队列路由与定时任务配置测试
+"""
+
+import pytest
+
+import app.tasks.export_tasks  # noqa: F401  注册任务
+import app.tasks.generation_tasks  # noqa: F401
+import app.tasks.template_tasks  # noqa: F401
+from app.tasks import celery_app
+
+
+@pytest.mark.parametrize("task_name, queue", [
+    ("app.tasks.generation_tasks.process_generation_task", "generation"),
+    ("app.tasks.generation_tasks.generate_slide_image", "generation_images"),
+    ("app.tasks.export_tasks.process_export_task", "export"),
+    ("app.tasks.export_tasks.export_bulk_item", "export"),
+    ("app.tasks.export_tasks.process_bulk_export", "export_bulk"),
+    ("app.tasks.generation_tasks.cleanup_stalled_tasks", "maintenance"),
+    ("app.tasks.export_tasks.cleanup_stalled_exports", "maintenance"),
+    ("app.tasks.export_tasks.cleanup_old_exports", "maintenance"),
+    ("app.tasks.thumbnail_tasks.refresh_recent_thumbnails", "maintenance"),
+    ("app.tasks.template_tasks.flush_template_usage", "maintenance"),
+])
+def test_task_routes(task_name, queue):
+    """测试各类任务路由到独立队列"""
+    route = celery_app.amqp.router.route({}, task_name)
+
+    assert route["queue"].name == queue
+
+
+def test_beat_schedule_tasks_registered():
+    """测试定时任务指向已注册的任务"""
+    schedule = celery_app.conf.beat_schedule
+
+    assert schedule
+    for entry in schedule.values():
+        assert entry["task"] in celery_app.tasks
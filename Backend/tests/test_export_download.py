@@ -0,0 +1,467 @@
+"""
+导出文件下载测试
+"""
+
+import uuid
+from io import BytesIO
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.models.export_task import ExportTask
+from tests.conftest import TestingSessionLocal
+
+CONTENT = b"0123456789" * 10
+
+
+@pytest.fixture(autouse=True)
+def download_secret(monkeypatch):
+    """预签名链接使用独立密钥"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "DOWNLOAD_URL_SECRET", "download-secret")
+
+
+@pytest_asyncio.fixture
+async def export_task(client: AsyncClient, auth_headers, monkeypatch, tmp_path):
+    """创建一个已完成的导出任务及其文件"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "STORAGE_LOCAL_PATH", str(tmp_path))
+
+    ppt = (await client.post("/api/v1/ppt", json={"title": "季度汇报"}, headers=auth_headers)).json()
+    user = (await client.get("/api/v1/users/me", headers=auth_headers)).json()
+
+    file_path = tmp_path / "exports" / f"{ppt['id']}_{uuid.uuid4().hex}.pptx"
+    file_path.parent.mkdir(parents=True)
+    file_path.write_bytes(CONTENT)
+
+    async with TestingSessionLocal() as db:
+        task = ExportTask(
+            user_id=uuid.UUID(user["id"]),
+            ppt_id=uuid.UUID(ppt["id"]),
+            format="pptx",
+            status="completed",
+            file_path=str(file_path),
+            file_size=len(CONTENT)
+        )
+        db.add(task)
+        await db.commit()
+        return ppt["id"], str(task.id)
+
+
+@pytest.mark.asyncio
+async def test_download_with_etag_and_range(client: AsyncClient, auth_headers, export_task):
+    """测试登录下载支持 ETag 与 Range"""
+    ppt_id, task_id = export_task
+    url = f"/api/v1/ppt/{ppt_id}/export/{task_id}/download"
+
+    response = await client.get(url, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert "filename*=utf-8''" in response.headers["content-disposition"]
+    etag = response.headers["etag"]
+
+    response = await client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = await client.get(url, headers={**auth_headers, "Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+
+    response = await client.get(url, headers={**auth_headers, "Range": "bytes=-5"})
+    assert response.content == CONTENT[-5:]
+
+    response = await client.get(url, headers={**auth_headers, "Range": "bytes=500-"})
+    assert response.status_code == 416
+
+
+@pytest.mark.asyncio
+async def test_download_requires_owner(client: AsyncClient, export_task):
+    """测试未登录不能下载"""
+    ppt_id, task_id = export_task
+
+    response = await client.get(f"/api/v1/ppt/{ppt_id}/export/{task_id}/download")
+
+    assert response.status_code in (401, 403)
+
+
+@pytest.mark.asyncio
+async def test_signed_download_url(client: AsyncClient, auth_headers, export_task):
+    """测试状态接口返回的预签名链接可直接下载，篡改或过期后失效"""
+    ppt_id, task_id = export_task
+
+    status = (await client.get(f"/api/v1/ppt/{ppt_id}/export/{task_id}/status", headers=auth_headers)).json()
+    download_url = status["download_url"]
+
+    response = await client.get(download_url)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+    response = await client.get(download_url.replace("md5=", "md5=x"))
+    assert response.status_code == 403
+
+    from app.services.export_service import get_export_service
+    expired_url = get_export_service().get_file_url(download_url.split("?")[0], expires_in=-10)
+    response = await client.get(expired_url)
+    assert response.status_code == 410
+
+
+@pytest.mark.asyncio
+async def test_signed_urls_disabled_without_secret(client: AsyncClient, auth_headers, export_task, monkeypatch):
+    """测试未配置 DOWNLOAD_URL_SECRET 时不生成也不接受预签名链接"""
+    from app.config import settings
+    ppt_id, task_id = export_task
+    status = (await client.get(f"/api/v1/ppt/{ppt_id}/export/{task_id}/status", headers=auth_headers)).json()
+
+    monkeypatch.setattr(settings, "DOWNLOAD_URL_SECRET", "")
+
+    disabled = (await client.get(f"/api/v1/ppt/{ppt_id}/export/{task_id}/status", headers=auth_headers)).json()
+    assert disabled["download_url"] is None
+    response = await client.get(status["download_url"])
+    assert response.status_code == 403
+    response = await client.get(f"/api/v1/ppt/{ppt_id}/export/{task_id}/download", headers=auth_headers)
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_accel_redirect(client: AsyncClient, auth_headers, export_task, monkeypatch):
+    """测试配置 X-Accel-Redirect 后由反向代理发送文件"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "EXPORT_ACCEL_REDIRECT_PREFIX", "/protected-exports/")
+    ppt_id, task_id = export_task
+
+    response = await client.get(f"/api/v1/ppt/{ppt_id}/export/{task_id}/download", headers=auth_headers)
+
+    assert response.headers["x-accel-redirect"].startswith("/protected-exports/")
+    assert response.content == b""
+
+
+@pytest.mark.asyncio
+async def test_submit_export_slide_range(client: AsyncClient, auth_headers, monkeypatch):
+    """测试导出页面范围的校验与保存"""
+    from app.tasks.export_tasks import process_export_task
+    monkeypatch.setattr(process_export_task, "apply_async", lambda *args, **kwargs: None)
+
+    ppt = (await client.post("/api/v1/ppt", json={"title": "范围导出"}, headers=auth_headers)).json()
+    for i in range(3):
+        await client.post(
+            f"/api/v1/ppt/{ppt['id']}/slides",
+            json={"type": "content", "content": {"title": f"第{i + 1}页"}},
+            headers=auth_headers
+        )
+    url = f"/api/v1/ppt/{ppt['id']}/export"
+
+    malformed = await client.post(url, json={"format": "pptx", "slide_range": "1-"}, headers=auth_headers)
+    assert malformed.status_code == 422
+
+    outside = await client.post(url, json={"format": "pptx", "slide_range": "5-8"}, headers=auth_headers)
+    assert outside.status_code == 400
+    assert outside.json()["code"] == "INVALID_SLIDE_RANGE"
+
+    accepted = await client.post(url, json={"format": "pdf", "slide_range": "2-3"}, headers=auth_headers)
+    assert accepted.status_code == 202
+    async with TestingSessionLocal() as db:
+        task = await db.get(ExportTask, uuid.UUID(accepted.json()["export_task_id"]))
+        assert task.slide_range == "2-3"
+
+
+@pytest_asyncio.fixture
+async def dispatched(monkeypatch):
+    """记录派发的导出任务"""
+    from app.tasks.export_tasks import process_export_task
+    calls = []
+    monkeypatch.setattr(process_export_task, "apply_async", lambda args, **kwargs: calls.append(args[0]))
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_duplicate_export_reuses_inflight_task(client: AsyncClient, auth_headers, dispatched):
+    """测试相同导出请求复用进行中的任务，内容变化后重新导出"""
+    ppt = (await client.post("/api/v1/ppt", json={"title": "去重"}, headers=auth_headers)).json()
+    await client.post(
+        f"/api/v1/ppt/{ppt['id']}/slides",
+        json={"type": "content", "content": {"title": "第一页"}},
+        headers=auth_headers
+    )
+    url = f"/api/v1/ppt/{ppt['id']}/export"
+
+    first = (await client.post(url, json={"format": "pptx"}, headers=auth_headers)).json()
+    second = (await client.post(url, json={"format": "pptx", "slide_range": "all"}, headers=auth_headers)).json()
+    pdf = (await client.post(url, json={"format": "pdf"}, headers=auth_headers)).json()
+
+    assert second["export_task_id"] == first["export_task_id"]
+    assert pdf["export_task_id"] != first["export_task_id"]
+    assert len(dispatched) == 2
+
+    # 编辑后版本号变化，不再复用旧任务
+    await client.post(
+        f"/api/v1/ppt/{ppt['id']}/slides",
+        json={"type": "content", "content": {"title": "第二页"}},
+        headers=auth_headers
+    )
+    third = (await client.post(url, json={"format": "pptx"}, headers=auth_headers)).json()
+    assert third["export_task_id"] != first["export_task_id"]
+    assert len(dispatched) == 3
+
+
+@pytest.mark.asyncio
+async def test_export_retry_keeps_task_inflight(client: AsyncClient, auth_headers, dispatched, monkeypatch):
+    """测试导出失败待重试期间任务仍为进行中，相同请求复用它，重试不违反去重唯一索引"""
+    from types import SimpleNamespace
+
+    from app import database
+    from app.tasks import export_tasks
+
+    monkeypatch.setattr(database, "AsyncSessionLocal", TestingSessionLocal)
+
+    async def failing_export(*args, **kwargs):
+        raise RuntimeError("渲染失败")
+
+    monkeypatch.setattr(export_tasks.ExportService, "export_pptx", failing_export)
+
+    class Retry(Exception):
+        pass
+
+    def attempt(retries: int):
+        def retry(exc, countdown):
+            return Retry()
+        return SimpleNamespace(request=SimpleNamespace(retries=retries), max_retries=3, retry=retry)
+
+    ppt = (await client.post("/api/v1/ppt", json={"title": "重试"}, headers=auth_headers)).json()
+    url = f"/api/v1/ppt/{ppt['id']}/export"
+    first = (await client.post(url, json={"format": "pptx"}, headers=auth_headers)).json()
+    task_id = first["export_task_id"]
+
+    with pytest.raises(Retry):
+        await export_tasks._process_export_async(attempt(0), task_id)
+
+    # 重试前提交相同导出，复用原任务
+    again = (await client.post(url, json={"format": "pptx"}, headers=auth_headers)).json()
+    assert again["export_task_id"] == task_id
+    assert again["status"] == "processing"
+    assert len(dispatched) == 1
+
+    with pytest.raises(Retry):
+        await export_tasks._process_export_async(attempt(1), task_id)
+
+    # 最后一次失败后才标记为 failed，之后的相同请求新建任务
+    with pytest.raises(RuntimeError):
+        await export_tasks._process_export_async(attempt(3), task_id)
+    async with TestingSessionLocal() as db:
+        task = await db.get(ExportTask, uuid.UUID(task_id))
+        assert (task.status, task.error_message) == ("failed", "渲染失败")
+
+    retried = (await client.post(url, json={"format": "pptx"}, headers=auth_headers)).json()
+    assert retried["export_task_id"] != task_id
+
+
+@pytest.mark.asyncio
+async def test_stalled_export_not_reused(client: AsyncClient, auth_headers, dispatched, monkeypatch):
+    """测试卡住的导出任务不再被复用，定时清理将其标记为失败"""
+    from datetime import timedelta
+
+    from app import database
+    from app.config import settings
+    from app.tasks import export_tasks
+
+    monkeypatch.setattr(database, "AsyncSessionLocal", TestingSessionLocal)
+
+    ppt = (await client.post("/api/v1/ppt", json={"title": "卡住"}, headers=auth_headers)).json()
+    url = f"/api/v1/ppt/{ppt['id']}/export"
+    stalled_id = (await client.post(url, json={"format": "pptx"}, headers=auth_headers)).json()["export_task_id"]
+    pdf_id = (await client.post(url, json={"format": "pdf"}, headers=auth_headers)).json()["export_task_id"]
+
+    async with TestingSessionLocal() as db:
+        for task_id in (stalled_id, pdf_id):
+            task = await db.get(ExportTask, uuid.UUID(task_id))
+            task.status = "processing"
+            task.created_at = task.created_at - timedelta(minutes=settings.EXPORT_STALLED_MINUTES + 1)
+        await db.commit()
+
+    # 相同请求新建任务，旧任务标记为失败
+    fresh = (await client.post(url, json={"format": "pptx"}, headers=auth_headers)).json()
+    assert fresh["export_task_id"] != stalled_id
+    assert len(dispatched) == 3
+
+    assert await export_tasks._cleanup_stalled_exports_async() == 1
+    async with TestingSessionLocal() as db:
+        for task_id in (stalled_id, pdf_id):
+            task = await db.get(ExportTask, uuid.UUID(task_id))
+            assert (task.status, task.error_message) == ("failed", export_tasks.STALLED_ERROR)
+        assert (await db.get(ExportTask, uuid.UUID(fresh["export_task_id"]))).status == "pending"
+
+    # 被清理的任务即使之后投递也不再执行
+    await export_tasks._process_export_async(None, stalled_id)
+    async with TestingSessionLocal() as db:
+        assert (await db.get(ExportTask, uuid.UUID(stalled_id))).status == "failed"
+
+
+@pytest.mark.asyncio
+async def test_export_dispatch_failure(client: AsyncClient, auth_headers, monkeypatch):
+    """测试任务派发失败时标记为失败，相同请求可重新提交"""
+    from app.tasks.export_tasks import process_export_task
+
+    def broker_down(*args, **kwargs):
+        raise ConnectionError("broker unavailable")
+
+    monkeypatch.setattr(process_export_task, "apply_async", broker_down)
+
+    ppt = (await client.post("/api/v1/ppt", json={"title": "派发"}, headers=auth_headers)).json()
+    url = f"/api/v1/ppt/{ppt['id']}/export"
+
+    response = await client.post(url, json={"format": "pptx"}, headers=auth_headers)
+    assert response.status_code == 503
+    assert response.json()["code"] == "EXPORT_UNAVAILABLE"
+
+    async with TestingSessionLocal() as db:
+        tasks = (await db.execute(
+            select(ExportTask).where(ExportTask.ppt_id == uuid.UUID(ppt["id"]))
+        )).scalars().all()
+        assert [task.status for task in tasks] == ["failed"]
+
+    calls = []
+    monkeypatch.setattr(process_export_task, "apply_async", lambda args, **kwargs: calls.append(args[0]))
+    retried = await client.post(url, json={"format": "pptx"}, headers=auth_headers)
+    assert retried.status_code == 202
+    assert calls == [retried.json()["export_task_id"]]
+
+
+@pytest.mark.asyncio
+async def test_export_idempotency_key(client: AsyncClient, auth_headers, dispatched):
+    """测试幂等键重放返回原任务，用于其他请求时冲突"""
+    ppt = (await client.post("/api/v1/ppt", json={"title": "幂等"}, headers=auth_headers)).json()
+    url = f"/api/v1/ppt/{ppt['id']}/export"
+    headers = {**auth_headers, "Idempotency-Key": "export-1"}
+
+    first = (await client.post(url, json={"format": "pptx"}, headers=headers)).json()
+
+    # 任务完成后重放仍返回同一任务
+    async with TestingSessionLocal() as db:
+        task = await db.get(ExportTask, uuid.UUID(first["export_task_id"]))
+        task.status = "completed"
+        await db.commit()
+
+    replay = (await client.post(url, json={"format": "pptx"}, headers=headers)).json()
+    assert replay["export_task_id"] == first["export_task_id"]
+    assert replay["status"] == "completed"
+    assert len(dispatched) == 1
+
+    conflict = await client.post(url, json={"format": "pdf"}, headers=headers)
+    assert conflict.status_code == 409
+    assert conflict.json()["code"] == "IDEMPOTENCY_KEY_REUSED"
+
+
+@pytest.mark.asyncio
+async def test_bulk_export(client: AsyncClient, auth_headers, monkeypatch, tmp_path):
+    """测试批量导出：校验 PPT 归属、逐个 PPT 派发子任务、打包 zip、统计进度与失败明细"""
+    import asyncio
+    import zipfile
+
+    from app import database
+    from app.config import settings
+    from app.tasks import export_tasks
+
+    monkeypatch.setattr(settings, "STORAGE_LOCAL_PATH", str(tmp_path))
+    monkeypatch.setattr(database, "AsyncSessionLocal", TestingSessionLocal)
+    dispatched = []
+    monkeypatch.setattr(
+        export_tasks.process_bulk_export, "apply_async",
+        lambda args, **kwargs: dispatched.append((args[0], kwargs.get("priority")))
+    )
+
+    ppts = [
+        (await client.post("/api/v1/ppt", json={"title": title}, headers=auth_headers)).json()
+        for title in ("周报", "周报", "方案/终稿")
+    ]
+    ppt_ids = [ppt["id"] for ppt in ppts]
+
+    missing = await client.post(
+        "/api/v1/exports/bulk", json={"ppt_ids": ppt_ids + [str(uuid.uuid4())]}, headers=auth_headers
+    )
+    assert missing.status_code == 404
+
+    submitted = await client.post("/api/v1/exports/bulk", json={"ppt_ids": ppt_ids}, headers=auth_headers)
+    assert submitted.status_code == 202
+    job = submitted.json()
+    assert job["total"] == 3 and job["status"] == "pending"
+    from app.tasks import PRIORITY_BULK
+    assert dispatched == [(job["job_id"], PRIORITY_BULK)]
+
+    # 子任务在当前事件循环中执行，代替 export 队列上的 worker
+    items = []
+
+    class Item:
+        def __init__(self, job_id, ppt_id):
+            self.future = asyncio.ensure_future(export_tasks._export_bulk_item_async(job_id, ppt_id))
+
+        def ready(self):
+            return self.future.done()
+
+        def successful(self):
+            return self.future.exception() is None
+
+        @property
+        def result(self):
+            return self.future.exception() or self.future.result()
+
+    def dispatch_items(job_id, ids):
+        items.extend(ids)
+        return [Item(job_id, ppt_id) for ppt_id in ids]
+
+    monkeypatch.setattr(export_tasks, "_dispatch_bulk_items", dispatch_items)
+    monkeypatch.setattr(export_tasks, "_BULK_POLL_SECONDS", 0.01)
+
+    # 提交后被删除的 PPT 计入失败，不再派发子任务
+    await client.delete(f"/api/v1/ppt/{ppt_ids[2]}", headers=auth_headers)
+    await export_tasks._process_bulk_export_async(job["job_id"])
+    assert items == ppt_ids[:2]
+
+    status = (await client.get(f"/api/v1/exports/bulk/{job['job_id']}", headers=auth_headers)).json()
+    assert status["status"] == "completed"
+    assert (status["completed"], status["failed"], status["progress"]) == (2, 1, 100)
+    assert status["errors"][0]["ppt_id"] == ppt_ids[2]
+    assert status["download_url"]
+
+    response = await client.get(f"/api/v1/exports/bulk/{job['job_id']}/download", headers=auth_headers)
+    assert response.status_code == 200
+    with zipfile.ZipFile(BytesIO(response.content)) as archive:
+        assert sorted(archive.namelist()) == ["周报 (2).pptx", "周报.pptx"]
+    assert list((tmp_path / "exports").glob("*.pptx")) == []
+
+
+@pytest.mark.asyncio
+async def test_stalled_bulk_export_cleanup(client: AsyncClient, auth_headers, monkeypatch, tmp_path):
+    """测试卡在处理中的批量导出被标记为失败，并删除写了一半的 zip"""
+    from datetime import timedelta
+
+    from app import database
+    from app.config import settings
+    from app.models.export_task import BulkExportJob
+    from app.tasks import export_tasks
+
+    monkeypatch.setattr(database, "AsyncSessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(export_tasks.process_bulk_export, "apply_async", lambda args, **kwargs: None)
+
+    ppt = (await client.post("/api/v1/ppt", json={"title": "批量"}, headers=auth_headers)).json()
+    job_id = (await client.post(
+        "/api/v1/exports/bulk", json={"ppt_ids": [ppt["id"]]}, headers=auth_headers
+    )).json()["job_id"]
+
+    archive_path = tmp_path / f"bulk_{job_id}.zip"
+    part = archive_path.with_name(f"{archive_path.name}.part")
+    part.write_bytes(b"PK")
+    async with TestingSessionLocal() as db:
+        job = await db.get(BulkExportJob, uuid.UUID(job_id))
+        job.status = "processing"
+        job.file_path = str(archive_path)
+        job.created_at = job.created_at - timedelta(minutes=settings.EXPORT_STALLED_MINUTES + 1)
+        await db.commit()
+
+    assert await export_tasks._cleanup_stalled_exports_async() >= 1
+
+    async with TestingSessionLocal() as db:
+        job = await db.get(BulkExportJob, uuid.UUID(job_id))
+        assert (job.status, job.file_path) == ("failed", None)
+    assert not part.exists()
@@ -0,0 +1,234 @@
+"""
+导出服务测试（不依赖数据库）
+"""
+
+import asyncio
+import base64
+import multiprocessing
+import uuid
+import zipfile
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+from pptx import Presentation as PPTXPresentation
+
+from app.services.export_service import ExportService, ImageHelper, parse_slide_range
+
+
+@pytest.fixture(autouse=True)
+def storage(monkeypatch, tmp_path):
+    """导出文件与幻灯片缓存写入临时目录"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "STORAGE_LOCAL_PATH", str(tmp_path / "storage"))
+
+
+def _png_bytes(color=(255, 0, 0)) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _data_url(data: bytes) -> str:
+    return "data:image/png;base64," + base64.b64encode(data).decode()
+
+
+@pytest.mark.asyncio
+async def test_prefetch_images_dedupes(monkeypatch):
+    """测试预取时相同 URL 只下载一次，base64 正常解码，失败的图片被忽略"""
+    downloads = []
+
+    async def fake_download(url, client=None):
+        downloads.append(url)
+        if "broken" in url:
+            raise ValueError("Failed to download image: 404")
+        return b"remote"
+
+    monkeypatch.setattr(ImageHelper, "download_image", staticmethod(fake_download))
+    png = _png_bytes()
+
+    images = await ImageHelper.prefetch_images([
+        "http://img/a.png", "http://img/a.png", _data_url(png), "http://img/broken.png", None
+    ])
+
+    assert sorted(downloads) == ["http://img/a.png", "http://img/broken.png"]
+    assert images == {"http://img/a.png": b"remote", _data_url(png): png}
+
+
+@pytest.mark.asyncio
+async def test_export_pptx_reuses_prefetched_image(tmp_path):
+    """测试多页共用同一图片时均能正确嵌入"""
+    image_url = _data_url(_png_bytes())
+    presentation = SimpleNamespace(id=uuid.uuid4(), slides=[
+        {"type": "title", "content": {"title": "封面", "image_url": image_url}},
+        {"type": "image-text", "content": {"title": "图文", "text": "说明", "image_url": image_url}},
+    ])
+
+    output = await ExportService().export_pptx(presentation, str(tmp_path / "out.pptx"))
+
+    prs = PPTXPresentation(output)
+    pictures = [shape for slide in prs.slides for shape in slide.shapes if shape.shape_type == 13]
+    assert len(pictures) == 3
+
+
+def _export_in_child(output_path: str, result) -> None:
+    presentation = SimpleNamespace(id=uuid.uuid4(), slides=[{"type": "title", "content": {"title": "封面"}}])
+    try:
+        asyncio.run(ExportService().export_pptx(presentation, output_path))
+        result.put(None)
+    except BaseException as e:
+        result.put(repr(e))
+
+
+def test_export_pptx_in_daemon_process(tmp_path):
+    """测试在 daemon 进程（Celery prefork 子进程）中导出不创建渲染子进程"""
+    context = multiprocessing.get_context("fork")
+    result = context.Queue()
+    output = tmp_path / "daemon.pptx"
+    child = context.Process(target=_export_in_child, args=(str(output), result), daemon=True)
+    child.start()
+    error = result.get(timeout=60)
+    child.join(timeout=10)
+
+    assert error is None
+    assert len(PPTXPresentation(str(output)).slides) == 1
+
+
+@pytest.mark.asyncio
+async def test_export_pptx_stores_identical_images_once(tmp_path):
+    """测试相同图片在导出包中只存储一份（python-pptx 按 SHA1 复用图片部件）"""
+    red, blue = _data_url(_png_bytes((255, 0, 0))), _data_url(_png_bytes((0, 0, 255)))
+    presentation = SimpleNamespace(id=uuid.uuid4(), slides=[
+        {"type": "section", "content": {"title": f"第{i}节", "image_url": url}}
+        for i, url in enumerate([red, blue, red, red, blue])
+    ])
+
+    output = await ExportService().export_pptx(presentation, str(tmp_path / "out.pptx"))
+
+    with zipfile.ZipFile(output) as package:
+        media = [name for name in package.namelist() if name.startswith("ppt/media/")]
+    assert len(media) == 2
+
+
+def test_parse_slide_range():
+    """测试页面范围解析（从 1 开始，超出部分忽略）"""
+    assert parse_slide_range(None, 3) == [0, 1, 2]
+    assert parse_slide_range("all", 3) == [0, 1, 2]
+    assert parse_slide_range("2", 3) == [1]
+    assert parse_slide_range("1,3-5,2", 10) == [0, 1, 2, 3, 4]
+    assert parse_slide_range("2-99", 4) == [1, 2, 3]
+
+    for invalid in ("0", "3-1", "a-b", "5-6"):
+        with pytest.raises(ValueError):
+            parse_slide_range(invalid, 4)
+
+
+@pytest.mark.asyncio
+async def test_export_pptx_slide_range(monkeypatch, tmp_path):
+    """测试按页面范围导出时只获取和渲染所选页面"""
+    requested = []
+    prefetch = ImageHelper.prefetch_images
+
+    async def tracking_prefetch(urls):
+        urls = list(urls)
+        requested.extend(url for url in urls if url)
+        return await prefetch(urls)
+
+    monkeypatch.setattr(ImageHelper, "prefetch_images", staticmethod(tracking_prefetch))
+    images = [_data_url(_png_bytes((i * 40, 0, 0))) for i in range(5)]
+    presentation = SimpleNamespace(id=uuid.uuid4(), slides=[
+        {"type": "section", "content": {"title": f"第{i + 1}节", "image_url": url}}
+        for i, url in enumerate(images)
+    ])
+
+    output = await ExportService().export_pptx(presentation, str(tmp_path / "out.pptx"), slide_range="2-3")
+
+    titles = [slide.shapes[-1].text_frame.text for slide in PPTXPresentation(output).slides]
+    assert titles == ["第2节", "第3节"]
+    assert requested == images[1:3]
+
+
+@pytest.mark.asyncio
+async def test_reexport_reuses_unchanged_slides(monkeypatch, tmp_path):
+    """测试重新导出时未修改的页面直接复用缓存，只重新渲染修改过的页面"""
+    requested = []
+    prefetch = ImageHelper.prefetch_images
+
+    async def tracking_prefetch(urls):
+        urls = [url for url in urls if url]
+        requested.append(urls)
+        return await prefetch(urls)
+
+    monkeypatch.setattr(ImageHelper, "prefetch_images", staticmethod(tracking_prefetch))
+    images = [_data_url(_png_bytes((i * 40, 0, 0))) for i in range(3)]
+    slides = [
+        {"id": f"s{i}", "type": "image-text", "content": {"title": f"第{i + 1}页", "text": "说明", "image_url": url}}
+        for i, url in enumerate(images)
+    ]
+    presentation = SimpleNamespace(id=uuid.uuid4(), slides=slides)
+    service = ExportService()
+
+    first = await service.export_pptx(presentation, str(tmp_path / "first.pptx"))
+    slides[1] = {**slides[1], "content": {**slides[1]["content"], "title": "已修改"}}
+    second = await service.export_pptx(presentation, str(tmp_path / "second.pptx"))
+
+    assert requested == [images, [images[1]]]
+
+    def describe(path):
+        return [
+            [(shape.shape_type, shape.text_frame.text if shape.has_text_frame else shape.image.sha1)
+             for shape in slide.shapes]
+            for slide in PPTXPresentation(path).slides
+        ]
+
+    before, after = describe(first), describe(second)
+    assert after[0] == before[0] and after[2] == before[2]
+    assert after[1][1][1] == "已修改"
+    with zipfile.ZipFile(second) as package:
+        assert len([name for name in package.namelist() if name.startswith("ppt/media/")]) == 3
+
+
+def test_slide_cache_key_tracks_content_and_theme():
+    """测试缓存键随页面内容、主题和导出质量变化"""
+    from app.services.slide_cache import slide_cache_key
+
+    slide = {"id": "s1", "type": "content", "content": {"title": "A"}, "style": {"theme": {"primary_color": "#111"}}}
+
+    key = slide_cache_key(slide, "standard")
+    assert slide_cache_key(dict(slide), "standard") == key
+    assert slide_cache_key(slide, "high") != key
+    assert slide_cache_key({**slide, "content": {"title": "B"}}, "standard") != key
+    assert slide_cache_key({**slide, "style": {"theme": {"primary_color": "#222"}}}, "standard") != key
+
+
+@pytest.mark.asyncio
+async def test_export_images_archive_streams_pages(monkeypatch, tmp_path):
+    """测试多页图片导出逐页写入 zip，单页直接返回图片"""
+    from app.services import export_service as module
+
+    async def fake_export_pdf(self, presentation, output_path=None, quality="standard", slide_range=None):
+        path = tmp_path / f"{uuid.uuid4().hex}.pdf"
+        path.write_bytes(b"%PDF")
+        return str(path)
+
+    def fake_pdftoppm(cmd, **kwargs):
+        page = cmd[cmd.index("-f") + 1]
+        with open(f"{cmd[-1]}.png", "wb") as f:
+            f.write(f"page {page}".encode())
+
+    monkeypatch.setattr(ExportService, "export_pdf", fake_export_pdf)
+    monkeypatch.setattr(module.subprocess, "run", fake_pdftoppm)
+    presentation = SimpleNamespace(id=uuid.uuid4(), slides=[{"type": "content"}] * 4)
+    service = ExportService()
+
+    archive = await service.export_images_archive(presentation, "png", slide_range="2-4")
+
+    with zipfile.ZipFile(archive) as result:
+        assert sorted(result.namelist()) == ["slide_001.png", "slide_002.png", "slide_003.png"]
+        assert result.read("slide_003.png") == b"page 3"
+    assert list(service.storage_path.glob("*.png")) == []
+    assert list(tmp_path.glob("*.pdf")) == []
+
+    single = await service.export_images_archive(presentation, "png", slide_range="2")
+    assert single.endswith(".png")
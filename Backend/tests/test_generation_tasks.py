@@ -0,0 +1,96 @@
+"""
+生成任务流水线测试（不依赖数据库和真实 AI 调用）
+"""
+
+from app.tasks import generation_tasks
+from app.tasks.generation_tasks import (
+    _apply_enrichment,
+    _build_slides,
+    _is_thin_slide,
+    _load_checkpoint_images,
+    _markdown_lines,
+    _store_checkpoint_image,
+    process_generation_task,
+)
+
+
+def test_is_thin_slide():
+    """测试内容单薄页面的判定"""
+    assert _is_thin_slide("content", {"title": "A", "text": "短"})
+    assert not _is_thin_slide("content", {"title": "A", "text": "长" * 200})
+    assert not _is_thin_slide("content", {"title": "A", "bullets": ["1", "2"]})
+    assert not _is_thin_slide("title", {"title": "A"})
+
+
+def test_enrichment_rendered_as_plain_text():
+    """测试扩写内容去除 Markdown，并写入布局实际绘制的字段"""
+    lines = _markdown_lines("## 要点\n\n- **增长** 30%\n2. 见[报告](http://x)\n---\n`结论`")
+    assert lines == ["要点", "增长 30%", "见报告", "结论"]
+
+    # content 布局有 bullets 时不绘制 text，扩写内容需替换 bullets
+    content = {"type": "content", "content": {"title": "A", "bullets": ["一点"], "text": "短"}}
+    _apply_enrichment(content, lines)
+    assert content["content"]["bullets"] == lines
+    assert content["content"]["text"] == ""
+
+    image_text = {"type": "image-text", "content": {"title": "A", "text": "短"}}
+    _apply_enrichment(image_text, lines)
+    assert image_text["content"]["text"] == "要点\n增长 30%\n见报告\n结论"
+
+
+def test_build_slides_plans_jobs(monkeypatch):
+    """测试从大纲构建页面并规划配图与扩写任务"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "AI_MAX_IMAGES", 1)
+
+    outline = {
+        "theme": {"primary": "#000"},
+        "slides": [
+            {"type": "title", "title": "封面", "image_prompt": "cover"},
+            {"type": "content", "title": "要点", "points": ["1"], "image_prompt": "chart"},
+            {"type": "content", "title": "充实", "points": ["1", "2", "3"]},
+        ]
+    }
+
+    slides, image_jobs, enrich_jobs = _build_slides(outline, {"enrich_content": True})
+
+    assert [s["type"] for s in slides] == ["title", "content", "content"]
+    assert slides[0]["style"]["theme"] == {"primary": "#000"}
+    assert image_jobs == [(0, "cover")]
+    assert enrich_jobs == [1]
+
+
+def test_dispatch_chord(monkeypatch):
+    """测试大纲阶段后以 chord 分发单页子任务"""
+    def fake_plan(task_id):
+        return [(0, "cover")], [(2, ("标题", "content", "上下文", "zh"))]
+
+    dispatched = {}
+
+    def fake_chord(header):
+        dispatched["header"] = header
+        return lambda body: dispatched.setdefault("body", body)
+
+    monkeypatch.setattr(generation_tasks, "_plan_generation", fake_plan)
+    monkeypatch.setattr(generation_tasks, "chord", fake_chord)
+
+    process_generation_task.run("task-1")
+
+    assert [sig.task for sig in dispatched["header"]] == [
+        "app.tasks.generation_tasks.generate_slide_image",
+        "app.tasks.generation_tasks.enrich_slide",
+    ]
+    assert dispatched["header"][1].args == ("task-1", 2, "标题", "content", "上下文", "zh")
+    assert dispatched["body"].task == "app.tasks.generation_tasks.assemble_generation"
+    assert dispatched["body"].args == ("task-1",)
+
+
+def test_checkpoint_images_roundtrip(monkeypatch, tmp_path):
+    """测试断点图片写入存储后可恢复，缺失的文件被跳过"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "STORAGE_LOCAL_PATH", str(tmp_path))
+
+    ref = _store_checkpoint_image("task-1", 3, "data:image/png;base64,AAAA")
+    checkpoint = {"images": {"3": ref, "5": str(tmp_path / "missing.txt")}}
+
+    assert _load_checkpoint_images(checkpoint) == {3: "data:image/png;base64,AAAA"}
@@ -0,0 +1,59 @@
+"""
+导出图片压缩测试
+"""
+
+from io import BytesIO
+
+from PIL import Image
+
+from app.utils.image_processing import normalize_image
+
+
+def _encode(image: Image.Image, format: str = "PNG") -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def _noise(size, mode="RGB") -> Image.Image:
+    """带噪点的图片，避免被 PNG 高效压缩"""
+    return Image.effect_noise(size, 64).convert(mode)
+
+
+def test_downscale_to_box_as_jpeg():
+    """测试大尺寸不透明图片按目标 DPI 缩小并转为 JPEG"""
+    data = _encode(_noise((3000, 1500)))
+
+    result = normalize_image(data, (5.0, 2.0), "standard")
+
+    image = Image.open(BytesIO(result))
+    assert image.format == "JPEG"
+    assert image.size == (750, 375)
+    assert len(result) < len(data)
+
+
+def test_high_quality_keeps_more_pixels():
+    """测试高质量导出保留更高分辨率"""
+    data = _encode(_noise((3000, 1500)))
+
+    standard = Image.open(BytesIO(normalize_image(data, (5.0, 2.0), "standard")))
+    high = Image.open(BytesIO(normalize_image(data, (5.0, 2.0), "high")))
+
+    assert high.width > standard.width
+
+
+def test_transparent_image_stays_png():
+    """测试透明图片保持 PNG"""
+    image = _noise((2000, 2000), "RGBA")
+    image.putalpha(128)
+
+    result = normalize_image(_encode(image), (2.0, 2.0), "standard")
+
+    assert Image.open(BytesIO(result)).format == "PNG"
+
+
+def test_small_jpeg_unchanged():
+    """测试无需缩小的 JPEG 原样返回"""
+    data = _encode(_noise((200, 100)), "JPEG")
+
+    assert normalize_image(data, (13.333, 7.5), "high") is data
@@ -0,0 +1,71 @@
+"""
+LLM JSON 容错解析测试
+"""
+
+import pytest
+
+from app.utils.json_repair import repair_json, robust_json_parse, salvage_json_parse
+
+
+def test_parse_fenced_with_prose():
+    """测试代码块与前后说明文字"""
+    content = '好的，大纲如下：\n```json\n{"title": "AI", "slides": []}\n```\n如需修改请告诉我'
+
+    assert robust_json_parse(content) == {"title": "AI", "slides": []}
+
+
+def test_parse_comments_and_trailing_commas():
+    """测试注释与多余逗号，字符串内的 // 不受影响"""
+    content = '{"url": "https://example.com", // 注释\n "items": [1, 2,],}'
+
+    assert robust_json_parse(content) == {"url": "https://example.com", "items": [1, 2]}
+
+
+@pytest.mark.parametrize("content, expected", [
+    ('{"slides": [{"title": "半截标题', {"slides": [{"title": "半截标题"}]}),
+    ('{"slides": [{"title": "A", "subt', {"slides": [{"title": "A"}]}),
+    ('{"slides": [{"title": "A", "n": 12', {"slides": [{"title": "A", "n": 12}]}),
+    ('{"slides": [{"title": "A"},', {"slides": [{"title": "A"}]}),
+    ('{"slides": [{"title": "A\\u00', {"slides": [{"title": "A"}]}),
+])
+def test_repair_truncated(content, expected):
+    """测试截断输出的修复"""
+    repaired, truncated = repair_json(content)
+
+    assert truncated is True
+    assert robust_json_parse(content) == expected
+
+
+def test_complete_document_not_truncated():
+    """测试完整文档不标记为截断"""
+    _, truncated = repair_json('```json\n{"a": {"b": [1]}}\n```')
+
+    assert truncated is False
+
+
+def test_unparseable_raises():
+    """测试无法解析时抛出 ValueError"""
+    with pytest.raises(ValueError):
+        robust_json_parse("抱歉，我无法生成该内容")
+
+
+def test_salvage_drops_partial_trailing_slide():
+    """测试截断时丢弃不完整的最后一页"""
+    content = (
+        '```json\n{"title": "AI", "slides": ['
+        '{"type": "title", "title": "封面"}, '
+        '{"type": "content", "title": "第二页", "bullets": ["要点1", "要'
+    )
+
+    data, truncated = salvage_json_parse(content)
+
+    assert truncated is True
+    assert data == {"title": "AI", "slides": [{"type": "title", "title": "封面"}]}
+
+
+def test_salvage_complete_document():
+    """测试完整文档不触发截断标记"""
+    data, truncated = salvage_json_parse('{"slides": [{"title": "A"}]}')
+
+    assert truncated is False
+    assert data == {"slides": [{"title": "A"}]}
@@ -0,0 +1,83 @@
+"""
+出站 AI 限流器测试
+"""
+
+import pytest
+
+from app.services import rate_limiter
+from app.services.rate_limiter import RateLimiter
+from app.utils import redis_client
+
+
+class FakeRedis:
+    """记录 EVAL 调用的伪造 Redis"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def eval(self, script, numkeys, key, *args):
+        self.calls.append((script, key, args))
+        return "0"
+
+
+class FakeStatusError(Exception):
+    status_code = 429
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(redis_client, "get_redis", lambda: client)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_bucket_key_does_not_contain_api_key(fake_redis):
+    """测试令牌桶按提供商 + Key 摘要区分，不泄露原始 Key"""
+    limiter = RateLimiter("yunwu", "sk-secret")
+
+    async with limiter.call():
+        pass
+
+    assert limiter.bucket_key.startswith("ai_rate:yunwu:")
+    assert "sk-secret" not in limiter.bucket_key
+    assert all(key == limiter.bucket_key for _, key, _ in fake_redis.calls)
+
+
+@pytest.mark.asyncio
+async def test_feedback_success_and_throttled(fake_redis):
+    """测试成功加速、429/5xx 减速"""
+    limiter = RateLimiter("yunwu", "sk-test")
+
+    async with limiter.call() as outcome:
+        outcome.status_code = 200
+    async with limiter.call() as outcome:
+        outcome.status_code = 503
+
+    feedback = [args[0] for script, _, args in fake_redis.calls if script == rate_limiter._FEEDBACK_SCRIPT]
+    assert feedback == ["1", "0"]
+
+
+@pytest.mark.asyncio
+async def test_feedback_from_exception_status(fake_redis):
+    """测试 SDK 异常携带的状态码也会触发减速"""
+    limiter = RateLimiter("yunwu", "sk-test")
+
+    with pytest.raises(FakeStatusError):
+        async with limiter.call():
+            raise FakeStatusError()
+
+    feedback = [args[0] for script, _, args in fake_redis.calls if script == rate_limiter._FEEDBACK_SCRIPT]
+    assert feedback == ["0"]
+
+
+@pytest.mark.asyncio
+async def test_redis_unavailable_does_not_block(monkeypatch):
+    """测试 Redis 不可用时不阻塞调用"""
+    monkeypatch.setattr(rate_limiter.settings, "REDIS_URL", "redis://127.0.0.1:1/0")
+    monkeypatch.setattr(redis_client, "_down_until", 0.0)
+
+    async with RateLimiter("yunwu", "sk-test").call() as outcome:
+        outcome.status_code = 200
+
+    assert redis_client._down_until > 0
@@ -0,0 +1,123 @@
+"""
+声明式幻灯片渲染计划测试
+"""
+
+from pptx import Presentation
+from pptx.oxml.ns import qn
+from pptx.util import Inches
+
+from app.services.render_plans import LAYOUTS, compile_plan, render_slide, resolve_theme
+
+PRIMARY = (26, 54, 93)
+THEME = resolve_theme({"primary_color": "#1a365d", "text_color": "#1a202c"})
+
+
+def _slide():
+    prs = Presentation()
+    prs.slide_width = Inches(13.333)
+    prs.slide_height = Inches(7.5)
+    return prs.slides.add_slide(prs.slide_layouts[6])
+
+
+def _texts(slide):
+    return [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame and shape.text_frame.text]
+
+
+def test_plan_compiled_once_per_theme():
+    """测试同一主题的渲染计划只编译一次"""
+    compile_plan.cache_clear()
+
+    first = compile_plan("timeline", THEME, False)
+    second = compile_plan("timeline", resolve_theme({"text_color": "#1a202c", "primary_color": "#1a365d"}), False)
+    other = compile_plan("timeline", resolve_theme({"primary_color": "#000"}), False)
+
+    assert first is second
+    assert other is not first
+    assert compile_plan.cache_info().misses == 2
+
+
+def test_every_layout_renders():
+    """测试所有布局在空内容下都能渲染"""
+    for layout in LAYOUTS:
+        render_slide(_slide(), layout, {}, THEME)
+
+
+def test_process_layout():
+    """测试流程布局按步骤数均分并只在步骤之间画箭头"""
+    slide = _slide()
+
+    render_slide(slide, "process", {"title": "流程", "steps": ["A", "B", "C"]}, THEME)
+
+    assert _texts(slide) == [
+        "流程",
+        "A", "Step 1", "→",
+        "B", "Step 2", "→",
+        "C", "Step 3",
+    ]
+    boxes = [shape for shape in slide.shapes if shape.text_frame.text in ("A", "B")]
+    assert boxes[1].left - boxes[0].left == Inches(4)
+    assert boxes[0].width == Inches(4) - Inches(0.3)
+
+
+def test_content_text_only_without_bullets():
+    """测试有要点时不渲染正文"""
+    slide = _slide()
+
+    render_slide(slide, "content", {"title": "T", "bullets": ["x", "y"], "text": "正文"}, THEME)
+
+    assert _texts(slide) == ["T", "• x", "• y"]
+    assert slide.shapes[2].top - slide.shapes[1].top == Inches(0.7)
+
+
+def test_title_overlay_only_with_image():
+    """测试标题页仅在有背景图时添加半透明遮罩并使用白色文字"""
+    plain, with_image = _slide(), _slide()
+
+    render_slide(plain, "title", {"title": "T"}, THEME)
+    render_slide(with_image, "title", {"title": "T"}, THEME, has_image=True)
+
+    assert len(plain.shapes) == 1
+    assert plain.shapes[0].text_frame.paragraphs[0].runs[0].font.color.rgb == PRIMARY
+
+    overlay, title = with_image.shapes
+    assert overlay.fill._xPr.find(qn("a:solidFill"))[0].find(qn("a:alpha")).get("val") == "60000"
+    assert title.text_frame.paragraphs[0].runs[0].font.color.rgb == (255, 255, 255)
+
+
+def test_unknown_layout_falls_back_to_content():
+    """测试未知布局按内容页渲染"""
+    slide = _slide()
+
+    render_slide(slide, "unknown", {"title": "T", "text": "正文"}, THEME)
+
+    assert _texts(slide) == ["T", "正文"]
+
+
+def test_theme_resolved_once_per_content():
+    """测试主题按内容哈希只解析一次"""
+    theme = resolve_theme({"primary_color": "#abc", "background": "#000000", "font_family": "Arial"})
+
+    assert resolve_theme({"font_family": "Arial", "background": "#000000", "primary_color": "#abc"}) is theme
+    assert theme.primary == (0xAA, 0xBB, 0xCC)
+    assert theme.background == (0, 0, 0)
+    assert theme.font == "Arial"
+
+
+def test_invalid_theme_colors_fall_back_to_defaults():
+    """测试非法颜色回退为默认主题色"""
+    theme = resolve_theme({"primary_color": "blue", "text_color": None})
+
+    assert theme.primary == (0x1A, 0x36, 0x5D)
+    assert theme.text == (0x1A, 0x20, 0x2C)
+    assert theme.background == (255, 255, 255)
+
+
+def test_theme_font_applied_to_latin_and_east_asian_text():
+    """测试主题字体同时设置西文和东亚字体"""
+    slide = _slide()
+
+    render_slide(slide, "title", {"title": "标题"}, resolve_theme({"font_family": "Microsoft YaHei"}))
+
+    r_pr = slide.shapes[0].text_frame.paragraphs[0].runs[0]._r.rPr
+    assert r_pr.find(qn("a:latin")).get("typeface") == "Microsoft YaHei"
+    assert r_pr.find(qn("a:ea")).get("typeface") == "Microsoft YaHei"
@@ -2,8 +2,102 @@
 模板系统测试
 """
 
+import uuid
+
 import pytest
+import pytest_asyncio
 from httpx import AsyncClient
+from sqlalchemy import delete
+
+from app.models.template import Template
+from app.services import template_cache
+from app.services.template_usage import flush_usage
+from app.utils import redis_client
+from tests.conftest import TestingSessionLocal
+
+
+@pytest_asyncio.fixture
+async def local_cache(monkeypatch):
+    """仅使用进程内缓存，每个测试从空缓存开始"""
+    monkeypatch.setattr(redis_client, "get_redis", lambda: None)
+    await template_cache.invalidate()
+
+
+class FakeRedis:
+    """模拟 Redis 哈希，供多进程共享缓存测试"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def hincrby(self, key, field, amount):
+        fields = self.data.setdefault(key, {})
+        fields[field] = fields.get(field, 0) + amount
+        return fields[field]
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def rename(self, src, dst):
+        self.data[dst] = self.data.pop(src)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def hset(self, key, field, value):
+                redis.data.setdefault(key, {})[field] = value
+
+            def expire(self, key, seconds):
+                pass
+
+            async def execute(self):
+                pass
+
+        return Pipeline()
+
+
+async def _clear_category(category: str) -> None:
+    """删除分类下的模板，缓存测试从空分类开始"""
+    async with TestingSessionLocal() as db:
+        await db.execute(delete(Template).where(Template.category == category))
+        await db.commit()
+
+
+async def _add_template(name: str, category: str = "general", usage_count: int = 0) -> str:
+    """绕过服务层直接写库（不触发缓存失效）"""
+    async with TestingSessionLocal() as db:
+        template = Template(name=name, category=category, content={}, usage_count=usage_count)
+        db.add(template)
+        await db.commit()
+        return str(template.id)
 
 
 @pytest.mark.asyncio
@@ -38,3 +132,190 @@ async def test_filter_templates_by_category(client: AsyncClient):
     
     for template in data["templates"]:
         assert template["category"] == "business"
+
+
+@pytest.mark.asyncio
+async def test_catalog_served_from_cache_with_etag(client: AsyncClient, local_cache):
+    """测试模板列表命中缓存，ETag 未变化时返回 304"""
+    category = "creative"
+    await _clear_category(category)
+    await _add_template("模板一", category)
+    url = f"/api/v1/templates?category={category}"
+
+    response = await client.get(url)
+    assert response.status_code == 200
+    assert [t["name"] for t in response.json()["templates"]] == ["模板一"]
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    etag = response.headers["etag"]
+
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # 未经服务层的写入在缓存有效期内不可见
+    await _add_template("模板二", category)
+    assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 304
+    assert (await client.get(url)).json()["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_usage_fallback_keeps_cache(client: AsyncClient, auth_headers, local_cache):
+    """测试 Redis 不可用时使用次数直接落库，且不使列表与详情缓存失效"""
+    category = "minimal"
+    await _clear_category(category)
+    await _add_template("模板一", category, usage_count=5)
+    second = await _add_template("模板二", category, usage_count=4)
+    url = f"/api/v1/templates?category={category}"
+    etag = (await client.get(url)).headers["etag"]
+    assert (await client.get(f"/api/v1/templates/{second}")).json()["usage_count"] == 4
+
+    for _ in range(2):
+        response = await client.post(f"/api/v1/templates/{second}/use", headers=auth_headers)
+        assert response.status_code == 200
+
+    assert await _usage_count(second) == 6
+    assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 304
+    assert (await client.get(f"/api/v1/templates/{second}")).json()["usage_count"] == 4
+
+    # 缓存过期后列表按新的使用次数排序
+    template_cache._local.clear()
+    response = await client.get(url)
+    assert [t["name"] for t in response.json()["templates"]] == ["模板二", "模板一"]
+
+
+@pytest.mark.asyncio
+async def test_template_detail_cached_and_missing(client: AsyncClient, local_cache):
+    """测试模板详情带 ETag，不存在的模板返回 404 且不缓存"""
+    template_id = await _add_template("详情")
+
+    response = await client.get(f"/api/v1/templates/{template_id}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "详情"
+    response = await client.get(
+        f"/api/v1/templates/{template_id}", headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert response.status_code == 304
+
+    response = await client.get(f"/api/v1/templates/{uuid.uuid4()}")
+    assert response.status_code == 404
+    assert response.json()["code"] == "NOT_FOUND"
+
+
+@pytest.mark.asyncio
+async def test_catalog_shared_through_redis(client: AsyncClient, monkeypatch):
+    """测试进程内缓存过期后从 Redis 共享缓存读取，任一进程失效后一并失效"""
+    redis = FakeRedis()
+    monkeypatch.setattr(redis_client, "get_redis", lambda: redis)
+    await template_cache.invalidate()
+    category = "education"
+    await _clear_category(category)
+    await _add_template("模板一", category)
+    url = f"/api/v1/templates?category={category}"
+
+    etag = (await client.get(url)).headers["etag"]
+    assert redis.data["templates:catalog:1"]
+
+    # 模拟另一个 API 进程：本地缓存为空，从 Redis 读取，看不到未经服务层的写入
+    template_cache._local.clear()
+    await _add_template("模板二", category)
+    response = await client.get(url)
+    assert response.headers["etag"] == etag
+    assert response.json()["total"] == 1
+
+    # 另一个进程失效缓存：只递增 Redis 中的代数，本进程的代数不变
+    await redis.incr("templates:catalog:generation")
+    template_cache._local.clear()
+    assert (await client.get(url)).json()["total"] == 2
+    assert redis.data["templates:catalog:2"]
+
+
+@pytest.mark.asyncio
+async def test_catalog_load_racing_invalidate_not_shared(monkeypatch):
+    """测试加载期间其他进程失效缓存时，旧结果不会写入新一代共享缓存"""
+    redis = FakeRedis()
+    monkeypatch.setattr(redis_client, "get_redis", lambda: redis)
+    await template_cache.invalidate()
+
+    async def stale_loader():
+        await redis.incr("templates:catalog:generation")
+        return b"stale"
+
+    await template_cache.get_or_load("race", stale_loader)
+    template_cache._local.clear()
+
+    async def fresh_loader():
+        return b"fresh"
+
+    assert (await template_cache.get_or_load("race", fresh_loader)).body == b"fresh"
+
+
+@pytest.mark.asyncio
+async def test_catalog_query_bounds(client: AsyncClient, monkeypatch):
+    """测试 limit 超出上限被拒绝，未知分类不写入缓存"""
+    redis = FakeRedis()
+    monkeypatch.setattr(redis_client, "get_redis", lambda: redis)
+    await template_cache.invalidate()
+
+    assert (await client.get("/api/v1/templates?limit=100000")).status_code == 422
+    assert (await client.get("/api/v1/templates?limit=0")).status_code == 422
+
+    response = await client.get(f"/api/v1/templates?category=unknown-{uuid.uuid4().hex[:8]}")
+    assert response.status_code == 200
+    assert response.json()["total"] == 0
+    assert "templates:catalog:1" not in redis.data
+    assert not template_cache._local
+
+
+async def _usage_count(template_id: str) -> int:
+    async with TestingSessionLocal() as db:
+        return (await db.get(Template, uuid.UUID(template_id))).usage_count
+
+
+@pytest.mark.asyncio
+async def test_usage_counted_in_redis_and_flushed_in_batch(client: AsyncClient, auth_headers, monkeypatch):
+    """测试使用次数先累加到 Redis，定时批量以原子 UPDATE 落库"""
+    redis = FakeRedis()
+    monkeypatch.setattr(redis_client, "get_redis", lambda: redis)
+    await template_cache.invalidate()
+    popular = await _add_template("热门", usage_count=10)
+    other = await _add_template("普通")
+
+    for template_id in (popular, popular, popular, other):
+        response = await client.post(f"/api/v1/templates/{template_id}/use", headers=auth_headers)
+        assert response.status_code == 200
+
+    assert await _usage_count(popular) == 10
+    assert redis.data["templates:usage"] == {popular: 3, other: 1}
+    await client.get("/api/v1/templates")
+    assert "templates:catalog:1" in redis.data
+
+    async with TestingSessionLocal() as db:
+        assert await flush_usage(db) == 4
+
+    assert await _usage_count(popular) == 13
+    assert await _usage_count(other) == 1
+    assert not [key for key in redis.data if key.startswith("templates:usage")]
+    # 使用次数不使模板缓存失效
+    assert redis.data["templates:catalog:generation"] == 1
+
+    async with TestingSessionLocal() as db:
+        assert await flush_usage(db) == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_retries_unfinished_batch_first(monkeypatch):
+    """测试上次未提交的批次先于新计数写入，且同一时间只有一个批量写入"""
+    redis = FakeRedis()
+    monkeypatch.setattr(redis_client, "get_redis", lambda: redis)
+    template_id = await _add_template("重试")
+    redis.data["templates:usage:flushing"] = {template_id.encode(): b"2"}
+    redis.data["templates:usage"] = {template_id: 5}
+
+    redis.data["templates:usage:lock"] = "1"
+    async with TestingSessionLocal() as db:
+        assert await flush_usage(db) == 0
+    del redis.data["templates:usage:lock"]
+
+    async with TestingSessionLocal() as db:
+        assert await flush_usage(db) == 2
+        assert await flush_usage(db) == 5
+    assert await _usage_count(template_id) == 7
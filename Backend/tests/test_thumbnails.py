@@ -0,0 +1,188 @@
+"""
+幻灯片缩略图测试
+"""
+
+import base64
+import os
+import uuid
+from io import BytesIO
+
+import pytest
+from httpx import AsyncClient
+from PIL import Image
+
+from app.config import settings
+from app.services.render_plans import LAYOUTS
+from app.services.thumbnail_service import ThumbnailService, render_thumbnail, thumbnail_key
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture(autouse=True)
+def storage(monkeypatch, tmp_path):
+    """缩略图写入临时目录"""
+    monkeypatch.setattr(settings, "STORAGE_LOCAL_PATH", str(tmp_path))
+    return tmp_path
+
+
+def _png_data_url(color) -> str:
+    buffer = BytesIO()
+    Image.new("RGB", (64, 36), color).save(buffer, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def _open(data: bytes) -> Image.Image:
+    image = Image.open(BytesIO(data))
+    assert image.format == "WEBP"
+    return image.convert("RGB")
+
+
+def test_every_layout_renders_thumbnail():
+    """测试所有布局都能渲染为缩略图"""
+    for layout in LAYOUTS:
+        slide = {"type": layout, "content": {"title": "标题", "text": "正文", "steps": ["A", "B"]}}
+
+        image = _open(render_thumbnail(slide, {}))
+
+        assert image.size == (settings.THUMBNAIL_WIDTH, 270)
+
+
+def test_thumbnail_uses_theme_and_background_image():
+    """测试缩略图使用主题背景色，有背景图时铺满整页"""
+    plain = {"type": "content", "content": {}, "style": {"theme": {"background": "#003366"}}}
+    image_url = _png_data_url((200, 30, 30))
+    with_image = {"type": "content", "content": {"image_url": image_url}}
+
+    corner = _open(render_thumbnail(plain, {})).getpixel((2, 268))
+    assert all(abs(a - b) <= 8 for a, b in zip(corner, (0, 0x33, 0x66)))
+
+    images = {image_url: base64.b64decode(image_url.split(",")[1])}
+    corner = _open(render_thumbnail(with_image, images)).getpixel((2, 268))
+    assert corner[0] > 150 and corner[1] < 80
+
+
+def test_thumbnail_skipped_when_image_missing():
+    """测试配图获取失败时不生成缩略图，留待下次重试"""
+    slide = {"type": "title", "content": {"title": "T", "image_url": "https://example.invalid/a.png"}}
+
+    assert render_thumbnail(slide, {}) is None
+
+
+def test_thumbnail_key_ignores_id_and_notes():
+    """测试缩略图按渲染内容寻址，与页面 ID 和备注无关"""
+    slide = {"id": "a", "type": "content", "content": {"title": "T"}, "notes": "x"}
+
+    assert thumbnail_key(slide) == thumbnail_key({**slide, "id": "b", "notes": "y"})
+    assert thumbnail_key(slide) != thumbnail_key({**slide, "content": {"title": "T2"}})
+
+
+@pytest.mark.asyncio
+async def test_generate_renders_only_missing():
+    """测试只渲染缺失的缩略图，相同内容的页面只渲染一次"""
+    service = ThumbnailService()
+    slides = [
+        {"id": "1", "type": "title", "content": {"title": "封面"}},
+        {"id": "2", "type": "title", "content": {"title": "封面"}},
+        {"id": "3", "type": "content", "content": {"title": "要点", "bullets": ["a"]}},
+    ]
+
+    written, keys = await service.generate(slides)
+    assert written == 2
+    assert keys["1"] == keys["2"] == thumbnail_key(slides[0])
+    assert service.slide_urls(keys, slides[1:2]) == [f"/api/v1/thumbnails/{keys['2']}.webp"]
+    assert (await service.generate(slides))[0] == 0
+
+    slides[2]["content"]["bullets"].append("b")
+    written, updated = await service.generate(slides)
+    assert written == 1 and updated["3"] != keys["3"]
+
+
+@pytest.mark.asyncio
+async def test_thumbnail_urls_in_responses_and_served_cacheable(client: AsyncClient, auth_headers, monkeypatch):
+    """测试 PPT 接口按存储的缩略图键返回 URL，编辑后失效，缩略图以长期缓存头发送"""
+    from app import database
+    from app.tasks.thumbnail_tasks import _generate_thumbnails_async
+
+    monkeypatch.setattr(database, "AsyncSessionLocal", TestingSessionLocal)
+    ppt = (await client.post("/api/v1/ppt", json={"title": "缩略图"}, headers=auth_headers)).json()
+    await client.post(
+        f"/api/v1/ppt/{ppt['id']}/slides",
+        json={"type": "title", "content": {"title": "封面"}},
+        headers=auth_headers
+    )
+    await client.post(
+        f"/api/v1/ppt/{ppt['id']}/slides",
+        json={"type": "content", "content": {"title": "正文"}},
+        headers=auth_headers
+    )
+
+    detail = (await client.get(f"/api/v1/ppt/{ppt['id']}", headers=auth_headers)).json()
+    assert detail["slide_thumbnails"] == [None, None]
+    assert detail["thumbnail_url"] is None
+
+    # 后台任务生成并写回缩略图键后，接口即返回 URL
+    assert await _generate_thumbnails_async(ppt["id"]) == 2
+    detail = (await client.get(f"/api/v1/ppt/{ppt['id']}", headers=auth_headers)).json()
+    url, second = detail["slide_thumbnails"]
+    assert url and second and detail["thumbnail_url"] == url
+    listed = (await client.get("/api/v1/ppt", headers=auth_headers)).json()
+    assert [p["thumbnail_url"] for p in listed if p["id"] == ppt["id"]] == [url]
+
+    # 编辑的页面缩略图失效，未修改的页面保留
+    slide_id = detail["slides"][1]["id"]
+    await client.patch(
+        f"/api/v1/ppt/{ppt['id']}/slides/{slide_id}",
+        json={"content": {"title": "新正文"}},
+        headers=auth_headers
+    )
+    detail = (await client.get(f"/api/v1/ppt/{ppt['id']}", headers=auth_headers)).json()
+    assert detail["slide_thumbnails"] == [url, None]
+
+    service = ThumbnailService()
+    path = service.path(url.rsplit("/", 1)[1].removesuffix(".webp"))
+    long_ago = 1_000_000_000
+    os.utime(path, (long_ago, long_ago))
+
+    response = await client.get(url)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    _open(response.content)
+
+    # 访问只刷新访问时间：修改时间（ETag）不变，清理任务不删除刚访问过的缩略图
+    assert path.stat().st_mtime == long_ago
+    assert service.prune(1) == 0 and path.exists()
+
+    response = await client.get(url, headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_unknown_thumbnail_not_found(client: AsyncClient):
+    """测试不存在或非法的缩略图名返回 404"""
+    for name in ("0" * 64 + ".webp", "../secret.webp", "abc.png"):
+        response = await client.get(f"/api/v1/thumbnails/{name}")
+        assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_thumbnail_keys_skipped_when_deck_edited_during_render(client: AsyncClient, auth_headers):
+    """测试渲染期间 PPT 被编辑（版本号变化）时不写入旧内容的缩略图键"""
+    from types import SimpleNamespace
+
+    from app.tasks.thumbnail_tasks import _render_and_store
+
+    ppt = (await client.post("/api/v1/ppt", json={"title": "并发编辑"}, headers=auth_headers)).json()
+    ppt = (await client.post(
+        f"/api/v1/ppt/{ppt['id']}/slides",
+        json={"type": "title", "content": {"title": "封面"}},
+        headers=auth_headers
+    )).json()
+
+    stale = SimpleNamespace(
+        id=uuid.UUID(ppt["id"]), slides=ppt["slides"], version=ppt["version"] - 1, thumbnail_keys=None
+    )
+    async with TestingSessionLocal() as db:
+        assert await _render_and_store(db, stale) == 1
+
+    detail = (await client.get(f"/api/v1/ppt/{ppt['id']}", headers=auth_headers)).json()
+    assert detail["slide_thumbnails"] == [None]
@@ -0,0 +1,92 @@
+"""
+流式 zip 写入测试
+"""
+
+import asyncio
+import threading
+import time
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from app.utils.zip_stream import ZipStream, follow_file, partial_path
+
+
+class PipeSink:
+    """只能追加写入的输出（如 HTTP 响应）"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+
+def test_zip_stream_to_unseekable_sink(tmp_path):
+    """测试向不可 seek 的输出写入 zip，重名条目自动追加序号"""
+    source = tmp_path / "slide.png"
+    source.write_bytes(b"image" * 1000)
+    sink = PipeSink()
+
+    with ZipStream(sink, compression=zipfile.ZIP_DEFLATED) as archive:
+        names = [archive.add_file(source, "slide.png"), archive.add_file(source, "slide.png")]
+        names.append(archive.add_bytes("README", b"hello"))
+
+    assert names == ["slide.png", "slide (2).png", "README"]
+    with zipfile.ZipFile(BytesIO(b"".join(sink.chunks))) as result:
+        assert result.testzip() is None
+        assert result.read("slide (2).png") == b"image" * 1000
+        assert result.read("README") == b"hello"
+
+
+@pytest.mark.asyncio
+async def test_follow_file_streams_archive_while_building(tmp_path):
+    """测试 zip 仍在写入时即可开始读取，完成后得到完整文件"""
+    final = tmp_path / "bulk.zip"
+    part = partial_path(final)
+    first_chunk = threading.Event()
+
+    def build():
+        with open(part, "wb") as sink:
+            archive = ZipStream(sink)
+            for i in range(3):
+                archive.add_bytes(f"deck{i}.pptx", bytes([i]) * 50000)
+                if i == 0:
+                    first_chunk.set()
+                time.sleep(0.05)
+            archive.close()
+        part.replace(final)
+
+    writer = threading.Thread(target=build)
+    writer.start()
+    await asyncio.to_thread(first_chunk.wait)
+
+    received = []
+    async for chunk in follow_file(part, final, poll_interval=0.01):
+        received.append(chunk)
+    writer.join()
+
+    data = b"".join(received)
+    assert data == final.read_bytes()
+    with zipfile.ZipFile(BytesIO(data)) as result:
+        assert result.namelist() == ["deck0.pptx", "deck1.pptx", "deck2.pptx"]
+
+
+@pytest.mark.asyncio
+async def test_follow_file_fails_when_writer_aborts(tmp_path):
+    """测试写入方失败删除 .part 时下载中止"""
+    final = tmp_path / "bulk.zip"
+    part = partial_path(final)
+    part.write_bytes(b"PK")
+
+    async def consume():
+        return [chunk async for chunk in follow_file(part, final, poll_interval=0.01)]
+
+    reader = asyncio.create_task(consume())
+    await asyncio.sleep(0.05)
+    part.unlink()
+
+    with pytest.raises(RuntimeError):
+        await reader
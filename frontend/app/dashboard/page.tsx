@@ -16,12 +16,29 @@ import {
 import Link from "next/link";
 import { useRouter } from "next/navigation";
 import { usePPTList } from "@/hooks/usePPT";
+import { API_BASE_URL } from "@/lib/api";
 import { useAuthGuard } from "@/components/AuthGuard";
 import Navbar from "@/components/Navbar";
 import FloatingShapes from "@/components/FloatingShapes";
 
-// PPT 缩略图组件 - 显示完整首页预览
-function PPTThumbnail({ slide }: { slide: any }) {
+// PPT 缩略图组件 - 优先使用服务端渲染的首页缩略图，尚未生成或加载失败时在前端绘制预览
+function PPTThumbnail({ slide, thumbnailUrl }: { slide: any; thumbnailUrl?: string | null }) {
+  const [thumbnailFailed, setThumbnailFailed] = useState(false);
+
+  if (thumbnailUrl && !thumbnailFailed) {
+    return (
+      <div className="aspect-video rounded-xl bg-white/5 mb-4 overflow-hidden">
+        <img
+          src={new URL(thumbnailUrl, API_BASE_URL).toString()}
+          alt=""
+          loading="lazy"
+          onError={() => setThumbnailFailed(true)}
+          className="w-full h-full object-cover"
+        />
+      </div>
+    );
+  }
+
   if (!slide) {
     return (
       <div className="aspect-video rounded-xl bg-gradient-to-br from-white/10 to-white/5 mb-4 flex items-center justify-center">
@@ -253,7 +270,7 @@ export default function DashboardPage() {
                   >
                     <Link href={`/editor/${ppt.id}`}>
                       {/* 缩略图 - 显示完整首页预览 */}
-                      <PPTThumbnail slide={firstSlide} />
+                      <PPTThumbnail slide={firstSlide} thumbnailUrl={ppt.thumbnail_url} />
                       
                       <h3 className="font-semibold text-lg mb-1 truncate">{ppt.title}</h3>
                       <p className="text-white/50 text-sm mb-3">
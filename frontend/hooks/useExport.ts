@@ -1,7 +1,7 @@
 "use client";
 
 import { useState, useEffect, useCallback } from 'react';
-import { exportAPI } from '@/lib/api';
+import { API_BASE_URL, exportAPI } from '@/lib/api';
 
 // 导出任务 Hook
 export function useExport(pptId: string | null) {
@@ -54,7 +54,8 @@ export function useExport(pptId: string | null) {
     setProgress(0);
     
     try {
-      const response = await exportAPI.export(pptId, { format, quality }) as typeof exportTask;
+      // 每次导出操作一个幂等键，重试不会创建重复任务
+      const response = await exportAPI.export(pptId, { format, quality }, crypto.randomUUID()) as typeof exportTask;
       setExportTask(response);
       return response;
     } catch (err: any) {
@@ -67,7 +68,8 @@ export function useExport(pptId: string | null) {
   // 下载文件
   const downloadFile = useCallback(() => {
     if (exportTask?.download_url) {
-      window.open(exportTask.download_url, '_blank');
+      // 预签名链接可能是相对 API 服务器的路径
+      window.open(new URL(exportTask.download_url, API_BASE_URL).toString(), '_blank');
     }
   }, [exportTask?.download_url]);
 
@@ -28,6 +28,7 @@ interface PPT {
   created_at: string;
   updated_at: string;
   slide_count: number;
+  thumbnail_url?: string | null;
   slides?: Slide[];
 }
 
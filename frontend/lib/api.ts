@@ -1,5 +1,5 @@
 // API 配置
-const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1';
+export const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1';
 
 // 类型定义
 interface User {
@@ -233,11 +233,12 @@ export const generationAPI = {
 
 // ==================== 导出 API ====================
 export const exportAPI = {
-  // 提交导出任务
-  export: (ppt_id: string, data: { format: 'pptx' | 'pdf' | 'png' | 'jpg'; quality?: 'high' | 'medium' | 'low' }) =>
+  // 提交导出任务（相同幂等键的重试返回同一任务）
+  export: (ppt_id: string, data: { format: 'pptx' | 'pdf' | 'png' | 'jpg'; quality?: 'high' | 'medium' | 'low' }, idempotencyKey?: string) =>
     fetchAPI<{ export_task_id: string; status: string; download_url: string | null; expires_at: string | null }>(`/ppt/${ppt_id}/export`, {
       method: 'POST',
       body: JSON.stringify(data),
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : undefined,
     }),
   
   // 查询导出状态